@@ -1,13 +1,94 @@
-from flask import Flask, render_template, request
+from flask import Flask, render_template, request, jsonify, g, Response
 from src.model import WaitlistPredictor
-from src.database import get_db_connection
+from src.cache import get_train
+from src.jobs import ScrapeJobs, JOB_PENDING, JOB_FAILED
+from src.sweep import sweep, parse_date
+from src.travel_calendar import get_calendar
+from src.routes import search_routes, DEFAULT_LIMIT
+from src.migrations import migrate_database, SchemaError
+from src.metrics import registry, timed, request_seconds, SlowRequestProfiler, CONTENT_TYPE
 import os
+import time
 
 app = Flask(__name__)
 
 # Initialize predictor
 # In a production app, you might want to load the model once at startup
-predictor = WaitlistPredictor()
+# WL_USE_GRID=1 answers in-range queries from the precomputed probability grid
+predictor = WaitlistPredictor(use_grid=os.environ.get('WL_USE_GRID') == '1')
+# Follow `main.py activate/rollback` and new training runs without a restart
+predictor.watch_registry()
+
+# Holiday/peak-season flags for the model, loaded once here rather than
+# on the first request
+travel_calendar = get_calendar()
+
+# On-demand scrapes run here so /predict never waits on erail.in
+scrape_jobs = ScrapeJobs(workers=2)
+
+# RAILPREDICT_PROFILE_SLOW_MS=500 dumps a cProfile of every request slower
+# than that to RAILPREDICT_PROFILE_DIR (default profiles/)
+slow_profiler = SlowRequestProfiler()
+
+DEFAULT_TRAIN_IMAGE = 'https://upload.wikimedia.org/wikipedia/commons/thumb/0/07/Indian_Railways_WAP-4_locomotive.jpg/640px-Indian_Railways_WAP-4_locomotive.jpg'
+
+def train_is_complete(train):
+    # If avg_speed is None, it means it's an old record or incomplete
+    return train is not None and train['avg_speed'] is not None
+
+def train_details_for(train, pending=False):
+    if train:
+        return {
+            'name': train['train_name'],
+            'source': train['source'],
+            'dest': train['destination'],
+            'speed': train['avg_speed'] if 'avg_speed' in train.keys() else 'N/A',
+            'composition': train['coach_composition'] if 'coach_composition' in train.keys() else 'N/A',
+            'image': train['image_url'] if 'image_url' in train.keys() else DEFAULT_TRAIN_IMAGE,
+            'pending': pending
+        }
+    return {
+        'name': 'Fetching train details...' if pending else 'Unknown Train',
+        'source': 'N/A',
+        'dest': 'N/A',
+        'speed': 'N/A',
+        'composition': 'N/A',
+        'image': '',
+        'pending': pending
+    }
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    predictor.reload_if_changed()
+    g.profile = slow_profiler.start()
+
+@app.after_request
+def record_request_latency(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        seconds = time.perf_counter() - started
+        request_seconds.observe(seconds, request.endpoint or 'unmatched', response.status_code)
+        path = slow_profiler.finish(g.pop('profile', None), seconds, request.path)
+        if path:
+            print(f"Slow request {request.path} took {seconds * 1000:.0f} ms, profile written to {path}")
+    return response
+
+@app.teardown_request
+def stop_profiler(exc):
+    # after_request is skipped on unhandled errors, don't leave it running
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profile.disable()
+
+@registry.collector
+def model_version_metrics():
+    name = 'railpredict_model_info'
+    return [
+        f"# HELP {name} Model registry version served by this process",
+        f"# TYPE {name} gauge",
+        f'{name}{{version="{predictor.version or "unversioned"}"}} 1',
+    ]
 
 @app.route('/', methods=['GET'])
 def index():
@@ -34,46 +115,23 @@ def predict():
         if not os.path.exists('wl_prediction_model.pkl'):
             predictor.train()
             
-        prob, reasons = predictor.predict(days_to_journey, wl_status)
+        is_weekend, is_holiday = travel_calendar.features(journey_date)
+        prob, reasons = predictor.predict(days_to_journey, wl_status, is_weekend, is_holiday)
         percentage = round(prob * 100, 1)
         
-        # Fetch Train Details
-        conn = get_db_connection()
-        train = conn.execute('SELECT * FROM trains WHERE train_number = ?', (train_no,)).fetchone()
+        # Fetch Train Details (cached, backed by this thread's pooled connection)
+        train = get_train(train_no)
         
-        # Check if train exists AND has the new details (speed/image)
-        # If avg_speed is None, it means it's an old record or incomplete
-        if not train or train['avg_speed'] is None:
-            print(f"Train {train_no} missing or incomplete. Scraping...")
-            # Trigger on-demand scrape
-            from src.scraper import RailwayScraper
-            scraper = RailwayScraper()
-            scraper.scrape_train_schedule(train_no)
-            scraper.close()
-            # Fetch again
-            train = conn.execute('SELECT * FROM trains WHERE train_number = ?', (train_no,)).fetchone()
-            
-        conn.close()
+        # Check if train exists AND has the new details (speed/image).
+        # If not, scrape in the background (deduplicated per train) and let
+        # the page poll /train/<no>/status for the details.
+        pending = False
+        if not train_is_complete(train):
+            print(f"Train {train_no} missing or incomplete. Queueing scrape...")
+            scrape_jobs.submit(train_no)
+            pending = True
         
-        train_details = {}
-        if train:
-            train_details = {
-                'name': train['train_name'],
-                'source': train['source'],
-                'dest': train['destination'],
-                'speed': train['avg_speed'] if 'avg_speed' in train.keys() else 'N/A',
-                'composition': train['coach_composition'] if 'coach_composition' in train.keys() else 'N/A',
-                'image': train['image_url'] if 'image_url' in train.keys() else 'https://upload.wikimedia.org/wikipedia/commons/thumb/0/07/Indian_Railways_WAP-4_locomotive.jpg/640px-Indian_Railways_WAP-4_locomotive.jpg'
-            }
-        else:
-            train_details = {
-                'name': 'Unknown Train',
-                'source': 'N/A',
-                'dest': 'N/A',
-                'speed': 'N/A',
-                'composition': 'N/A',
-                'image': ''
-            }
+        train_details = train_details_for(train, pending=pending)
         
         # Chart Status Logic
         chart_status = "Not Prepared"
@@ -85,17 +143,87 @@ def predict():
             chart_status = "Chart Prepared / In Progress"
             chart_color = "#188038" # Green
             
-        return render_template('result.html', 
-                               train_no=train_no, 
-                               wl_status=wl_status, 
-                               days=days_to_journey, 
-                               probability=percentage,
-                               factors=reasons, 
-                               train=train_details,
-                               chart_status=chart_status,
-                               chart_color=chart_color)
+        with timed('render_template'):
+            return render_template('result.html', 
+                                   train_no=train_no, 
+                                   wl_status=wl_status, 
+                                   days=days_to_journey, 
+                                   probability=percentage,
+                                   factors=reasons, 
+                                   train=train_details,
+                                   chart_status=chart_status,
+                                   chart_color=chart_color)
     except Exception as e:
         return render_template('index.html', error=str(e))
 
+@app.route('/train/<train_no>/status', methods=['GET'])
+def train_status(train_no):
+    """
+    Lightweight poll target for pages rendered while a scrape was pending.
+    """
+    train = get_train(train_no)
+    if train_is_complete(train):
+        return jsonify(status='ready', train=train_details_for(train))
+
+    state, error = scrape_jobs.status(train_no)
+    if state == JOB_FAILED:
+        return jsonify(status='failed', error=error, train=train_details_for(train))
+    return jsonify(status='pending' if state == JOB_PENDING else 'missing', train=train_details_for(train, pending=True))
+
+@app.route('/sweep', methods=['GET'])
+def journey_sweep():
+    """
+    Confirmation probability for one WL across a range of journey dates,
+    e.g. /sweep?train_no=12301&wl=40&start=2026-11-01&end=2026-11-30
+    Train details are looked up once and the dates scored in one model call.
+    """
+    train_no = request.args.get('train_no', '').strip()
+    if not train_no:
+        return jsonify(error="train_no is required"), 400
+    try:
+        wl_status = int(request.args.get('wl', ''))
+        start = parse_date(request.args.get('start'), 'start')
+        end = parse_date(request.args['end'], 'end') if request.args.get('end') else None
+        if not os.path.exists('wl_prediction_model.pkl'):
+            predictor.train()
+        result = sweep(predictor, wl_status, start, end)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    train = get_train(train_no)
+    pending = False
+    if not train_is_complete(train):
+        scrape_jobs.submit(train_no)
+        pending = True
+    return jsonify(train_no=train_no, train=train_details_for(train, pending=pending), **result)
+
+@app.route('/routes', methods=['GET'])
+def route_search():
+    """
+    Trains stopping at one station and later at another,
+    e.g. /routes?from=NDLS&to=HWH&limit=20
+    """
+    from_station = request.args.get('from', '').strip()
+    to_station = request.args.get('to', '').strip()
+    if not from_station or not to_station:
+        return jsonify(error="from and to station codes are required"), 400
+    try:
+        limit = int(request.args.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        return jsonify(error="limit must be a number"), 400
+    try:
+        return jsonify(search_routes(from_station, to_station, limit=max(limit, 0)))
+    except SchemaError as e:
+        return jsonify(error=str(e)), 503
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Prometheus text exposition of this process's latency histograms and counters.
+    """
+    return Response(registry.render(), content_type=CONTENT_TYPE)
+
 if __name__ == '__main__':
+    # Under gunicorn this happens in gunicorn.conf.py
+    migrate_database()
     app.run(debug=True, host='0.0.0.0', port=5001)
@@ -0,0 +1,80 @@
+"""
+Checks that the fast head-only parser agrees with the full soup parse on
+every saved erail.in page, then times both.
+
+    python -m benchmarks.bench_parsers
+    python -m benchmarks.bench_parsers --repeat 200 --stub-pages 50
+
+Exits 1 if any page parses differently.
+"""
+import os
+import sys
+import time
+import argparse
+from src.parsers import PARSERS, extract_train_details
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'erail')
+
+
+def load_fixtures(fixture_dir=FIXTURE_DIR):
+    """
+    Returns [(name, train_number, body bytes)], file names start with the
+    train number.
+    """
+    pages = []
+    for name in sorted(os.listdir(fixture_dir)):
+        if name.endswith('.html'):
+            with open(os.path.join(fixture_dir, name), 'rb') as f:
+                pages.append((name, name.split('_', 1)[0].lstrip('0') or '0', f.read()))
+    return pages
+
+
+def stub_pages(count):
+    from tools.stub_erail import render_page
+    numbers = [str(12000 + i) for i in range(count)]
+    return [(f"stub {n}", n, render_page(n).encode()) for n in numbers]
+
+
+def check_equivalence(pages):
+    mismatches = 0
+    for name, train_number, body in pages:
+        fast = extract_train_details(body, train_number, parser='fast')
+        soup = extract_train_details(body, train_number, parser='soup')
+        # Whether the head alone was enough or the soup fallback kicked in
+        head_only = PARSERS['fast'](body) is not None
+        status = "ok" if fast == soup else "MISMATCH"
+        if fast != soup:
+            mismatches += 1
+        print(f"{status:8} {name:28} head_only={head_only!s:5} {fast}")
+        if fast != soup:
+            print(f"         soup gave {soup}")
+    return mismatches
+
+
+def time_parser(pages, parser, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for _, train_number, body in pages:
+            extract_train_details(body, train_number, parser=parser)
+    return (time.perf_counter() - start) / (repeat * len(pages))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fast vs soup train page parsing")
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--stub-pages', type=int, default=0, help="Also check N pages rendered by tools.stub_erail")
+    args = parser.parse_args()
+
+    pages = load_fixtures()
+    if args.stub_pages:
+        pages += stub_pages(args.stub_pages)
+
+    mismatches = check_equivalence(pages)
+    print(f"\n{len(pages)} pages, {mismatches} mismatches")
+
+    timings = {name: time_parser(pages, name, args.repeat) for name in ('fast', 'soup')}
+    for name, seconds in timings.items():
+        print(f"{name:5} {seconds * 1e6:9.1f} us/page")
+    print(f"speedup {timings['soup'] / timings['fast']:.1f}x")
+
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,425 @@
+"""
+Offline microbenchmark suite. Everything runs in a scratch directory
+against a fixed-seed model, temp SQLite DB and the saved erail.in pages,
+so runs only differ by the code under test.
+
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --quick --only model,parser
+    python -m benchmarks.run --compare baseline.json --threshold 0.2
+    python -m benchmarks.run --compare baseline.json --current bench.json
+
+Compare mode flags every benchmark whose median got slower than the
+baseline by more than threshold (a fraction) and exits 1 if any did.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import contextlib
+import statistics
+import subprocess
+from datetime import date, timedelta
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_THRESHOLD = 0.2
+
+# Model the model/parser benchmarks are run against
+BENCH_SEED = 42
+BENCH_TRAIN_ROWS = 20000
+
+
+def measure(fn, repeat=5, number=1, warmup=1):
+    """
+    Calls fn number times per sample, repeat samples. Returns per-call
+    timings in ms.
+    """
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) * 1000 / number)
+    return {
+        'median_ms': round(statistics.median(samples), 4),
+        'min_ms': round(min(samples), 4),
+        'repeat': repeat,
+        'number': number,
+    }
+
+
+def quiet():
+    # The code under test prints progress, keep the report readable
+    return contextlib.redirect_stdout(open(os.devnull, 'w'))
+
+
+def scratch_registry():
+    """
+    train() publishes and activates a registry version. The benchmarks'
+    go to a registry in the scratch directory, never the one
+    RAILPREDICT_REGISTRY may point serving at.
+    """
+    from src.registry import ModelRegistry
+    return ModelRegistry(os.path.join(os.getcwd(), 'model_registry'))
+
+
+def bench_model(quick):
+    from src.model import WaitlistPredictor
+    results = {}
+    registry = scratch_registry()
+    with quiet():
+        # A fixed-seed model, so tree shapes only change when the code does
+        WaitlistPredictor(use_compiled=False, registry=registry).train(num_samples=BENCH_TRAIN_ROWS, seed=BENCH_SEED)
+        predictor = WaitlistPredictor(registry=registry)
+        grid_predictor = WaitlistPredictor(use_grid=True, registry=registry)
+        sklearn_predictor = WaitlistPredictor(use_compiled=False, registry=registry)
+
+    rng = np.random.default_rng(BENCH_SEED)
+    results['model.predict_single'] = measure(lambda: predictor.predict(12, 45), repeat=7, number=200)
+    results['model.predict_single_sklearn'] = measure(lambda: sklearn_predictor.predict(12, 45), repeat=5, number=20)
+    for n in (1000,) if quick else (1000, 10000, 100000):
+        days = rng.integers(0, 130, n)
+        wl = rng.integers(1, 450, n)
+        results[f'model.predict_batch_{n}'] = measure(lambda: predictor.predict_batch(days, wl), repeat=5)
+        results[f'model.predict_batch_{n}_no_factors'] = measure(
+            lambda: predictor.predict_batch(days, wl, with_factors=False), repeat=5)
+        results[f'model.predict_batch_{n}_grid'] = measure(
+            lambda: grid_predictor.predict_batch(days, wl, with_factors=False), repeat=5)
+        features = np.column_stack([days, wl, np.zeros((n, 2), dtype=np.int64)])
+        results[f'model.explain_{n}'] = measure(lambda: predictor.explainer.contributions(features), repeat=5)
+        leaves = predictor.explainer.forest.apply(features)
+        results[f'model.explain_{n}_from_leaves'] = measure(lambda: predictor.explainer.from_leaves(leaves), repeat=5)
+    return results
+
+
+def bench_training(quick):
+    from src import synthetic
+    from src.model import WaitlistPredictor
+    results = {}
+    with quiet():
+        predictor = WaitlistPredictor(use_compiled=False, registry=scratch_registry())
+    try:
+        import pandas  # noqa: F401, generate_synthetic_data() needs it
+        has_pandas = True
+    except ImportError:
+        has_pandas = False
+
+    for n in (1000, 10000) if quick else (1000, 10000, 100000):
+        # The array generator is what train() uses, the DataFrame wrapper is optional
+        results[f'synthetic.generate_arrays_{n}'] = measure(
+            lambda: synthetic.generate_arrays(n, np.random.default_rng(BENCH_SEED)), repeat=5)
+        if has_pandas:
+            results[f'synthetic.generate_dataframe_{n}'] = measure(
+                lambda: predictor.generate_synthetic_data(num_samples=n, seed=BENCH_SEED), repeat=3)
+    for n in (1000,) if quick else (1000, 10000, 50000):
+        def train():
+            with quiet():
+                predictor.train(num_samples=n, seed=BENCH_SEED)
+        results[f'model.train_{n}'] = measure(train, repeat=2 if n > 10000 else 3, warmup=0)
+    return results
+
+
+def bench_parser(quick):
+    from src.parsers import extract_train_details
+    from benchmarks.bench_parsers import load_fixtures
+    pages = load_fixtures()
+    results = {}
+    for parser in ('fast', 'soup'):
+        def parse_all():
+            for _, train_number, body in pages:
+                extract_train_details(body, train_number, parser=parser)
+        timing = measure(parse_all, repeat=5, number=2 if quick else 10)
+        results[f'parser.{parser}_per_page'] = {k: round(v / len(pages), 4) if k.endswith('_ms') else v
+                                                for k, v in timing.items()}
+    return results
+
+
+def summarize(samples, **extra):
+    return dict({
+        'median_ms': round(statistics.median(samples), 4),
+        'min_ms': round(min(samples), 4),
+        'repeat': len(samples),
+        'number': 1,
+    }, **extra)
+
+
+def bench_database(quick):
+    from src import database
+    from src.scraper import RailwayScraper
+    from src.cache import get_train, train_cache
+    from src.history import stream_availability
+
+    n_trains = 200 if quick else 2000
+    days = 30
+    rnd = random.Random(BENCH_SEED)
+
+    def fresh_scraper(i):
+        db_path = os.path.abspath(f'bench_{i}.db')
+        database.DB_PATH = db_path
+        with quiet():
+            database.init_db()
+            return RailwayScraper(db_path=db_path, cache_dir=None)
+
+    scraper = fresh_scraper(0)
+    train_numbers = [str(10000 + i) for i in range(n_trains)]
+    trains, schedules = [], []
+    for number in train_numbers:
+        train_row, schedule_rows = scraper.build_train_rows(number, f"EXP {number}", "Howrah", "New Delhi")
+        trains.append(train_row)
+        schedules.extend(schedule_rows)
+    start = date(2026, 1, 1)
+    availability = [
+        (number, (start + timedelta(days=d)).isoformat(), '3A', 'GN', f"WL{rnd.randint(1, 200)}", "WL")
+        for number in train_numbers for d in range(days)
+    ]
+
+    # Writes are timed once per fresh DB, so every sample sees the same state
+    upserts, inserts = [], []
+    for i in range(3):
+        if i:
+            with quiet():
+                scraper.close()
+            scraper = fresh_scraper(i)
+        t = time.perf_counter()
+        scraper.write_batch(trains=trains, schedules=schedules)
+        upserts.append((time.perf_counter() - t) * 1000)
+        t = time.perf_counter()
+        scraper.write_batch(availability=availability)
+        inserts.append((time.perf_counter() - t) * 1000)
+
+    results = {
+        'db.upsert_trains_schedules': summarize(upserts, rows=len(trains) + len(schedules)),
+        'db.insert_availability': summarize(inserts, rows=len(availability),
+                                            rows_per_s=round(len(availability) * 1000 / statistics.median(inserts))),
+    }
+
+    lookups = [rnd.choice(train_numbers) for _ in range(1000)]
+    database.pool.close_all()
+
+    def per_lookup(timing, n):
+        return dict(timing, median_ms=round(timing['median_ms'] / n, 4), min_ms=round(timing['min_ms'] / n, 4))
+
+    def uncached_lookups():
+        for number in lookups:
+            train_cache.invalidate(number)
+            get_train(number)
+    results['db.train_lookup_uncached'] = per_lookup(measure(uncached_lookups, repeat=5), len(lookups))
+
+    def cached_lookups():
+        for number in lookups:
+            get_train(number)
+    results['db.train_lookup_cached'] = per_lookup(measure(cached_lookups, repeat=5), len(lookups))
+
+    conn = scraper.conn
+
+    def schedule_lookups():
+        for number in lookups:
+            conn.execute('SELECT * FROM schedules WHERE train_number = ? ORDER BY distance_km', (number,)).fetchall()
+    results['db.schedule_lookup'] = per_lookup(measure(schedule_lookups, repeat=5), len(lookups))
+
+    results['db.stream_availability'] = measure(lambda: sum(1 for _ in stream_availability(conn)), repeat=3)
+
+    with quiet():
+        scraper.close()
+    database.pool.close_all()
+    train_cache.clear()
+    return results
+
+
+def synthetic_network(n_trains, rng, n_stations=7000, n_corridors=200, corridor_length=150):
+    """
+    Schedules rows for a nationwide-size network: trains run over a
+    contiguous stretch of one of n_corridors station sequences (express
+    trains skip stops), corridors share stations, and about half run the
+    other way.
+    """
+    corridors = [rng.choice(n_stations, corridor_length, replace=False) for _ in range(n_corridors)]
+    rows = []
+    for t in range(n_trains):
+        corridor = corridors[rng.integers(n_corridors)]
+        length = int(rng.integers(10, 90))
+        start = int(rng.integers(0, corridor_length - length))
+        stops = corridor[start:start + length:int(rng.integers(1, 4))]
+        if rng.random() < 0.5:
+            stops = stops[::-1]
+        distances = np.cumsum(np.r_[0, rng.integers(8, 60, len(stops) - 1)])
+        number = f"{10000 + t:05d}"
+        for station, km in zip(stops.tolist(), distances.tolist()):
+            rows.append((number, f"S{station:04d}", f"Station {station}", "10:00", "10:05", f"{km} km", 1 + km // 800))
+    return rows
+
+
+def bench_routes(quick):
+    from src import database
+    from src.scraper import RailwayScraper
+    from src.routes import RouteIndex
+
+    n_trains = 2000 if quick else 13000
+    rng = np.random.default_rng(BENCH_SEED)
+    rows = synthetic_network(n_trains, rng)
+
+    db_path = os.path.abspath('bench_routes.db')
+    database.DB_PATH = db_path
+    with quiet():
+        database.init_db()
+        scraper = RailwayScraper(db_path=db_path, cache_dir=None)
+    scraper.write_batch(schedules=rows)
+    conn = scraper.conn
+    results = {}
+
+    index = RouteIndex()
+    timing = measure(lambda: index.build(conn), repeat=3, warmup=0)
+    results['routes.build_index'] = dict(timing, rows=len(rows), trains=n_trains)
+
+    # Pairs that share at least one train, plus random (mostly empty) ones
+    stations = sorted(index.stations)
+    busy = sorted(stations, key=lambda code: -len(index.stations[code][0]))[:50]
+    pairs = [(busy[i], busy[j]) for i in range(10) for j in range(10) if i != j]
+    random_pairs = [tuple(rng.choice(stations, 2, replace=False).tolist()) for _ in range(200)]
+
+    def search(pair_list):
+        def run():
+            for a, b in pair_list:
+                index.search(a, b)
+        return run
+
+    def per_query(timing, n):
+        return dict(timing, median_ms=round(timing['median_ms'] / n, 4), min_ms=round(timing['min_ms'] / n, 4))
+
+    results['routes.search_busy_pair'] = per_query(measure(search(pairs), repeat=5), len(pairs))
+    results['routes.search_random_pair'] = per_query(measure(search(random_pairs), repeat=5), len(random_pairs))
+
+    # What a query costs without the index
+    sql = '''
+    SELECT a.train_number FROM schedules a JOIN schedules b ON a.train_number = b.train_number
+    WHERE a.station_code = ? AND b.station_code = ? AND b.distance_km > a.distance_km
+    '''
+    results['routes.search_sql_join'] = per_query(
+        measure(lambda: [conn.execute(sql, pair).fetchall() for pair in pairs[:10]], repeat=3), 10)
+
+    number = rows[0][0]
+    route = [r for r in rows if r[0] == number]
+    results['routes.update_train'] = measure(lambda: index.update_schedules(route), repeat=5, number=20)
+
+    with quiet():
+        scraper.close()
+    database.pool.close_all()
+    return results
+
+
+BENCHMARKS = {
+    'model': bench_model,
+    'training': bench_training,
+    'parser': bench_parser,
+    'database': bench_database,
+    'routes': bench_routes,
+}
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    try:
+        import sklearn
+        sklearn_version = sklearn.__version__
+    except ImportError:
+        sklearn_version = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'sklearn': sklearn_version,
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def run(names, quick):
+    """
+    Runs the named groups in a scratch directory (train() and the DB
+    benchmarks write files relative to the working directory).
+    """
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='railpredict-bench-') as scratch:
+        os.chdir(scratch)
+        try:
+            for name in names:
+                print(f"Running {name} benchmarks...", file=sys.stderr)
+                results.update(BENCHMARKS[name](quick))
+        finally:
+            os.chdir(cwd)
+    return {'environment': environment(), 'quick': quick, 'results': results}
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Returns [(name, baseline_ms, current_ms, ratio, regressed)] for the
+    benchmarks present in both reports.
+    """
+    rows = []
+    for name, base in sorted(baseline['results'].items()):
+        cur = current['results'].get(name)
+        if cur is None or not base.get('median_ms'):
+            continue
+        ratio = cur['median_ms'] / base['median_ms']
+        rows.append((name, base['median_ms'], cur['median_ms'], ratio, ratio > 1 + threshold))
+    return rows
+
+
+def print_results(report):
+    for name, r in report['results'].items():
+        extra = f"  ({r['rows_per_s']} rows/s)" if 'rows_per_s' in r else ''
+        print(f"{name:42} {r['median_ms']:12.4f} ms{extra}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RailPredict microbenchmarks")
+    parser.add_argument('--only', type=str, help=f"Comma separated groups: {', '.join(BENCHMARKS)}")
+    parser.add_argument('--quick', action='store_true', help="Smaller sizes and fewer repeats")
+    parser.add_argument('--output', type=str, help="Write results as JSON")
+    parser.add_argument('--compare', type=str, metavar='BASELINE', help="Baseline JSON to check for regressions")
+    parser.add_argument('--current', type=str, help="Compare this results file instead of running the suite")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="Allowed slowdown as a fraction (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPO_ROOT)
+    if args.current:
+        with open(args.current) as f:
+            report = json.load(f)
+    else:
+        names = [n.strip() for n in args.only.split(',')] if args.only else list(BENCHMARKS)
+        unknown = [n for n in names if n not in BENCHMARKS]
+        if unknown:
+            parser.error(f"unknown benchmark group(s): {', '.join(unknown)}")
+        report = run(names, args.quick)
+        print_results(report)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows = compare(baseline, report, args.threshold)
+        print(f"\n{'benchmark':42} {'baseline':>10} {'current':>10} {'ratio':>7}")
+        for name, base_ms, cur_ms, ratio, regressed in rows:
+            flag = '  REGRESSION' if regressed else ''
+            print(f"{name:42} {base_ms:10.4f} {cur_ms:10.4f} {ratio:7.2f}{flag}")
+        regressions = [r for r in rows if r[4]]
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%} out of {len(rows)} compared")
+        sys.exit(1 if regressions else 0)
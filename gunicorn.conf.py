@@ -0,0 +1,48 @@
+"""
+Gunicorn settings, read automatically when gunicorn starts in this directory.
+
+With preload_app the master imports app.py, and so loads the model, once
+before forking; workers share those pages copy-on-write instead of each
+unpickling its own copy. GUNICORN_PRELOAD=0 restores per-worker loading.
+"""
+import gc
+import os
+import time
+from src.procstats import format_memory
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+started = time.perf_counter()
+
+
+def on_starting(server):
+    # Schema changes run once in the master, before any worker exists,
+    # so no request ever migrates and workers can't race each other
+    from src.migrations import migrate_database
+    applied = migrate_database()
+    if applied:
+        server.log.info("Applied migrations %s", applied)
+
+
+def when_ready(server):
+    if preload_app:
+        # Move everything the preload created out of the collector's view,
+        # otherwise the first GC in each worker writes to (and so copies)
+        # every shared page holding a tracked object
+        gc.freeze()
+    server.log.info("Master ready in %.2fs (preload=%s), %s",
+                    time.perf_counter() - started, preload_app, format_memory())
+
+
+def post_fork(server, worker):
+    # SQLite connections must not cross the fork
+    from src.database import pool
+    pool.after_fork()
+    worker.forked_at = time.perf_counter()
+
+
+def post_worker_init(worker):
+    worker.log.info("Worker %s ready in %.2fs, %s",
+                    worker.pid, time.perf_counter() - worker.forked_at, format_memory(worker.pid))
@@ -1,15 +1,58 @@
 import argparse
+import contextlib
+import json
+import os
+import sys
 from src.database import init_db
-from src.scraper import RailwayScraper
-from src.model import WaitlistPredictor
+from src.scraper import RailwayScraper, ERAIL_BASE_URL, HTTP_CACHE_DIR
+from src.model import WaitlistPredictor, MODEL_PATH
+from src import synthetic, tuning, local_server, batch_io, archive, sweep, travel_calendar
+from src.registry import ModelRegistry, RegistryError
+from src.migrations import SchemaError
+from src import routes
+from src.database import get_db_connection
 from datetime import datetime, timedelta
 
+# Synthetic rows for generate/train when --rows isn't given
+DEFAULT_ROWS = 1000
+
 def main():
     parser = argparse.ArgumentParser(description="Indian Railway Scraper & Predictor")
-    parser.add_argument('action', choices=['setup', 'scrape', 'train', 'predict'], help="Action to perform")
-    parser.add_argument('--train-no', type=str, help="Train Number (for scrape/predict)")
-    parser.add_argument('--wl', type=int, help="Current Waitlist Number (for predict)")
-    parser.add_argument('--days', type=int, help="Days to journey (for predict)")
+    parser.add_argument('action', choices=['setup', 'scrape', 'generate', 'train', 'train-history', 'tune', 'export', 'predict', 'predict-batch', 'serve-local', 'compact-history', 'wl-curve', 'sweep', 'models', 'activate', 'rollback', 'routes'], help="Action to perform")
+    parser.add_argument('--train-no', type=str, help="Train Number, comma separated for bulk scrape (for scrape/predict)")
+    parser.add_argument('--train-file', type=str, help="File with one train number per line (for bulk scrape)")
+    parser.add_argument('--workers', type=int, default=8, help="Concurrent fetches (for bulk scrape)")
+    parser.add_argument('--rate', type=float, default=5.0, help="Requests per second per host (for scrape)")
+    parser.add_argument('--base-url', type=str, default=ERAIL_BASE_URL, help="erail.in base URL, e.g. a local stub (for scrape)")
+    parser.add_argument('--cache-dir', type=str, default=HTTP_CACHE_DIR, help="HTTP response cache directory, '' disables it (for scrape)")
+    parser.add_argument('--offline', action='store_true', help="Serve pages from the HTTP cache only (for scrape)")
+    parser.add_argument('--wl', type=int, help="Current Waitlist Number (for predict/sweep)")
+    parser.add_argument('--days', type=int, help="Days to journey, or pass --date (for predict)")
+    parser.add_argument('--rows', type=int, help="Synthetic rows to generate (for generate/train, default 1000; for tune, default 20000)")
+    parser.add_argument('--seed', type=int, help="Random seed for synthetic data (for generate/train)")
+    parser.add_argument('--data-dir', type=str, help="Directory of spilled .npy synthetic data (for generate/train)")
+    parser.add_argument('--results', type=str, default='tuning_results.json', help="Where to write sweep results (for tune)")
+    parser.add_argument('--max-row-ms', type=float, help="Single-row latency budget for promotion (for tune)")
+    parser.add_argument('--max-batch-ms', type=float, help="1k-row batch latency budget for promotion (for tune)")
+    parser.add_argument('--max-size-mb', type=float, help="Pickle size budget for promotion (for tune)")
+    parser.add_argument('--promote', action='store_true', help="Install the best candidate as the served model (for tune)")
+    parser.add_argument('--batch-json', type=str, help="JSON file of records to score in one batch, '-' for stdin (for predict)")
+    parser.add_argument('--input', type=str, help="CSV/JSONL rows to score, '-' for stdin (for predict-batch)")
+    parser.add_argument('--output', type=str, default='-', help="Where to write scored rows, '-' for stdout (for predict-batch)")
+    parser.add_argument('--format', choices=batch_io.FORMATS, help="Input format if the extension doesn't say (for predict-batch)")
+    parser.add_argument('--chunk-size', type=int, default=batch_io.DEFAULT_CHUNK_SIZE, help="Rows per model call (for predict-batch)")
+    parser.add_argument('--factors', action='store_true', help="Include the factor breakdown (for predict-batch)")
+    parser.add_argument('--grid', action='store_true', help="Score in-range rows from the probability grid (for predict-batch)")
+    parser.add_argument('--date', type=str, help="Journey date YYYY-MM-DD (for predict/wl-curve), first date (for sweep)")
+    parser.add_argument('--end-date', type=str, help="Last journey date YYYY-MM-DD, default --date (for sweep)")
+    parser.add_argument('--class-code', type=str, default='3A', help="Travel class (for wl-curve)")
+    parser.add_argument('--before', type=str, help="Archive journeys before this date, default 30 days ago (for compact-history)")
+    parser.add_argument('--archive-dir', type=str, default=archive.ARCHIVE_DIR, help="Columnar availability archive (for compact-history/wl-curve)")
+    parser.add_argument('--from-station', type=str, help="Boarding station code (for routes)")
+    parser.add_argument('--to-station', type=str, help="Destination station code (for routes)")
+    parser.add_argument('--limit', type=int, default=routes.DEFAULT_LIMIT, help="Trains to list (for routes)")
+    parser.add_argument('--model-version', type=str, help="Registry version to make current (for activate)")
+    parser.add_argument('--socket', type=str, default=local_server.DEFAULT_SOCKET, help="Unix socket path (for serve-local)")
     
     args = parser.parse_args()
     
@@ -17,37 +60,223 @@ def main():
         init_db()
         
     elif args.action == 'scrape':
-        if not args.train_no:
-            print("Please provide --train-no")
+        train_numbers = []
+        if args.train_file:
+            with open(args.train_file) as f:
+                train_numbers = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+        elif args.train_no:
+            train_numbers = [t.strip() for t in args.train_no.split(',') if t.strip()]
+        if not train_numbers:
+            print("Please provide --train-no or --train-file")
+            return
+        scraper = RailwayScraper(base_url=args.base_url, rate_per_host=args.rate,
+                                 cache_dir=args.cache_dir or None, offline=args.offline)
+
+        if len(train_numbers) > 1:
+            # Bulk mode: concurrent fetches, summary at the end
+            scraper.scrape_many(train_numbers, workers=args.workers)
+            scraper.close()
             return
-        scraper = RailwayScraper()
-        scraper.scrape_train_schedule(args.train_no)
+
+        train_no = train_numbers[0]
+        scraper.scrape_train_schedule(train_no)
         
         # Scrape availability for next 7 days
         today = datetime.now()
         for i in range(1, 8):
             journey_date = (today + timedelta(days=i)).strftime("%Y-%m-%d")
-            scraper.scrape_availability(args.train_no, journey_date)
+            scraper.scrape_availability(train_no, journey_date)
             
         scraper.close()
         
+    elif args.action == 'generate':
+        if not args.data_dir:
+            print("Please provide --data-dir")
+            return
+        synthetic.spill_to_disk(args.data_dir, args.rows or DEFAULT_ROWS, seed=args.seed)
+
     elif args.action == 'train':
         predictor = WaitlistPredictor()
-        predictor.train()
+        predictor.train(num_samples=args.rows or DEFAULT_ROWS, seed=args.seed, data_dir=args.data_dir)
         
+    elif args.action == 'train-history':
+        # Warm-start extra trees on scraped availability newer than the checkpoint
+        predictor = WaitlistPredictor(use_compiled=False)
+        predictor.train_incremental()
+
+    elif args.action == 'tune':
+        rows = args.rows or tuning.DEFAULT_SWEEP_ROWS
+        results = tuning.run_sweep(num_samples=rows, seed=args.seed if args.seed is not None else 42)
+        max_bytes = args.max_size_mb * 1e6 if args.max_size_mb else None
+        best = tuning.pick_best(results, args.max_row_ms, args.max_batch_ms, max_bytes)
+        tuning.save_results(results, args.results, best)
+
+        if best is None:
+            print("No candidate fits the latency/size budgets.")
+        else:
+            print(f"Best candidate: {best['params']} (accuracy {best['accuracy']:.3f})")
+            if args.promote:
+                tuning.promote(best, MODEL_PATH)
+                WaitlistPredictor(use_compiled=False).export({
+                    'trained_at': datetime.now().isoformat(timespec='seconds'),
+                    'source': 'tune',
+                    'rows': rows,
+                    'accuracy': best['accuracy'],
+                    'train_seconds': round(best['fit_seconds'], 3),
+                    'params': best['params'],
+                })
+
+    elif args.action == 'export':
+        # Flatten the saved forest into NumPy arrays for sklearn-free serving
+        predictor = WaitlistPredictor(use_compiled=False)
+        predictor.export()
+
+    elif args.action == 'predict' and args.batch_json:
+        # Input: [{"days_to_journey": 10, "current_wl": 40, "is_weekend": 0, "is_holiday": 0}, ...]
+        # or {"journey_date": "2026-11-08", "current_wl": 40} to derive the rest
+        if args.batch_json == '-':
+            records = json.load(sys.stdin)
+        else:
+            with open(args.batch_json) as f:
+                records = json.load(f)
+        # Keep stdout clean for the JSON output
+        with contextlib.redirect_stdout(sys.stderr):
+            predictor = WaitlistPredictor()
+        try:
+            travel_calendar.add_date_features(records)
+            probs, factors = predictor.predict_batch(records)
+        except ValueError as e:
+            print(f"Batch prediction failed: {e}", file=sys.stderr)
+            sys.exit(1)
+
+        results = []
+        for record, prob, row_factors in zip(records, probs.tolist(), factors):
+            results.append(dict(record, probability=prob, factors=row_factors))
+        print(json.dumps(results, indent=2))
+
     elif args.action == 'predict':
-        if not args.wl or not args.days:
-            print("Please provide --wl and --days")
+        if args.wl is None or (args.days is None and not args.date):
+            print("Please provide --wl and --days or --date")
             return
-        
+        if not os.path.exists(MODEL_PATH):
+            print(f"No saved model at {MODEL_PATH}, run `python main.py train` first")
+            return
+
+        today = datetime.now().date()
+        if args.date:
+            journey_date = sweep.parse_date(args.date, '--date')
+            days = (journey_date - today).days
+        else:
+            days = args.days
+            journey_date = today + timedelta(days=days)
+        is_weekend, is_holiday = travel_calendar.get_calendar().features(journey_date)
+
         predictor = WaitlistPredictor()
-        # Load model logic would go here, but for now we retrain quickly or assume loaded
-        # For this demo script, let's just train-then-predict to ensure it works without file IO issues
-        predictor.train() 
-        
-        prob = predictor.predict(args.days, args.wl)
-        print(f"\nPrediction for WL{args.wl} with {args.days} days left:")
+        prob, factors = predictor.predict(days, args.wl, is_weekend, is_holiday)
+        print(f"\nPrediction for WL{args.wl} on {journey_date} ({days} days left):")
         print(f"Confirmation Probability: {prob*100:.1f}%")
+        for factor in factors:
+            contribution = f", {factor['contribution']:+.1f} pts" if 'contribution' in factor else ''
+            print(f"  {factor['name']}: {factor['value']} ({factor['impact']}{contribution})")
+
+    elif args.action == 'predict-batch':
+        if not args.input:
+            print("Please provide --input")
+            return
+        # Keep stdout clean in case the results go there
+        with contextlib.redirect_stdout(sys.stderr):
+            predictor = WaitlistPredictor(use_grid=args.grid)
+        try:
+            batch_io.predict_file(predictor, args.input, args.output, in_format=args.format,
+                                  chunk_size=args.chunk_size, with_factors=args.factors)
+        except ValueError as e:
+            print(f"Batch prediction failed: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    elif args.action == 'compact-history':
+        # Move finished journeys' snapshots from SQLite into the columnar archive
+        conn = get_db_connection()
+        archived = archive.compact(conn, archive.AvailabilityArchive(args.archive_dir), before=args.before)
+        conn.close()
+        print(f"Archived {sum(archived.values())} snapshots across {len(archived)} months")
+
+    elif args.action == 'wl-curve':
+        if not args.train_no or not args.date:
+            print("Please provide --train-no and --date")
+            return
+        conn = get_db_connection()
+        curve = archive.wl_curve(args.train_no, args.date, args.class_code, conn=conn,
+                                 archive=archive.AvailabilityArchive(args.archive_dir))
+        conn.close()
+        print(json.dumps([{'scraped_at': t, 'kind': kind, 'position': position} for t, kind, position in curve], indent=2))
+
+    elif args.action == 'sweep':
+        if args.wl is None or not args.date:
+            print("Please provide --wl and --date")
+            return
+        if not os.path.exists(MODEL_PATH):
+            print(f"No saved model at {MODEL_PATH}, run `python main.py train` first")
+            return
+        with contextlib.redirect_stdout(sys.stderr):
+            predictor = WaitlistPredictor()
+        try:
+            start = sweep.parse_date(args.date, '--date')
+            end = sweep.parse_date(args.end_date, '--end-date') if args.end_date else None
+            result = sweep.sweep(predictor, args.wl, start, end)
+        except ValueError as e:
+            print(f"Sweep failed: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps(result))
+
+    elif args.action == 'models':
+        registry = ModelRegistry()
+        current = registry.current()
+        versions = registry.versions()
+        if not versions:
+            print(f"No model versions in {registry.registry_dir}, run `python main.py train` or `export`")
+        for version in versions:
+            meta = registry.meta(version)
+            accuracy = f"{meta['accuracy']:.3f}" if meta.get('accuracy') is not None else '-'
+            print(f"{'*' if version == current else ' '} {version}  source={meta.get('source', '-')}  "
+                  f"rows={meta.get('rows', '-')}  accuracy={accuracy}  row={meta.get('predict_row_ms', '-')}ms  "
+                  f"1k={meta.get('predict_1k_ms', '-')}ms")
+
+    elif args.action in ('activate', 'rollback'):
+        # Serving processes pick the change up on their next registry poll
+        registry = ModelRegistry()
+        try:
+            if args.action == 'rollback':
+                registry.rollback()
+            elif not args.model_version:
+                print("Please provide --model-version")
+                return
+            else:
+                registry.activate(args.model_version)
+        except RegistryError as e:
+            print(f"{args.action.capitalize()} failed: {e}")
+            sys.exit(1)
+
+    elif args.action == 'routes':
+        if not args.from_station or not args.to_station:
+            print("Please provide --from-station and --to-station")
+            return
+        # Keep stdout clean for the JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            result = routes.search_routes(args.from_station, args.to_station, limit=args.limit)
+        print(json.dumps(result, indent=2))
+
+    elif args.action == 'serve-local':
+        # Keeps the model loaded so scripts get answers without process startup
+        if not os.path.exists(MODEL_PATH):
+            print(f"No saved model at {MODEL_PATH}, run `python main.py train` first")
+            return
+        predictor = WaitlistPredictor()
+        predictor.watch_registry()
+        local_server.serve(predictor, args.socket)
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    except SchemaError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
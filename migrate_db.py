@@ -1,31 +1,26 @@
-import sqlite3
+import sys
+from src.database import get_db_connection
+from src.migrations import migrate, schema_version, check_query_plans, LATEST_VERSION
 
-DB_PATH = "railway_data.db"
+def migrate_db(check=False):
+    conn = get_db_connection()
+
+    applied = migrate(conn)
+    if applied:
+        print(f"Applied migrations {applied}, schema is at version {schema_version(conn)}.")
+    else:
+        print(f"Schema already at version {LATEST_VERSION}.")
+
+    ok = True
+    if check:
+        # Prove the hot lookups are index-backed
+        for name, plan, plan_ok in check_query_plans(conn):
+            print(f"[{'OK' if plan_ok else 'FAIL'}] {name}: {plan}")
+            ok = ok and plan_ok
 
-def migrate_db():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    try:
-        cursor.execute("ALTER TABLE trains ADD COLUMN avg_speed TEXT")
-        print("Added avg_speed column.")
-    except sqlite3.OperationalError:
-        print("avg_speed column already exists.")
-        
-    try:
-        cursor.execute("ALTER TABLE trains ADD COLUMN coach_composition TEXT")
-        print("Added coach_composition column.")
-    except sqlite3.OperationalError:
-        print("coach_composition column already exists.")
-        
-    try:
-        cursor.execute("ALTER TABLE trains ADD COLUMN image_url TEXT")
-        print("Added image_url column.")
-    except sqlite3.OperationalError:
-        print("image_url column already exists.")
-        
-    conn.commit()
     conn.close()
+    return ok
 
 if __name__ == "__main__":
-    migrate_db()
+    if not migrate_db(check='--check' in sys.argv):
+        sys.exit(1)
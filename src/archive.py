@@ -0,0 +1,285 @@
+"""
+Columnar archive of old availability snapshots.
+
+Snapshots for journeys that are over rarely change and are only ever read
+as whole WL curves, so compact() moves them out of SQLite into one
+directory per journey month:
+
+    availability_archive/2025-11/
+        meta.json       trains, classes, row count
+        key.npy         int64 (train, day of month, class), sorted
+        scraped_at.npy  int64 unix seconds, sorted within each key
+        kind.npy        int8 STATUS_KIND_CODES
+        position.npy    int32 WL/RAC number, -1 if none
+        id.npy          int64 availability row id the snapshot came from
+
+Columns are memory-mapped on read, so a curve lookup is two binary
+searches on key.npy plus a slice, whatever the archive size.
+"""
+import os
+import json
+import shutil
+from datetime import date, datetime, timezone
+import numpy as np
+from .history import STATUS_KIND_CODES
+from .migrations import require_schema, status_columns
+
+ARCHIVE_DIR = "availability_archive"
+
+# Journeys this many days in the past are compacted by default
+DEFAULT_MIN_AGE_DAYS = 30
+
+COLUMNS = {
+    'key': np.int64,
+    'scraped_at': np.int64,
+    'kind': np.int8,
+    'position': np.int32,
+    'id': np.int64,
+}
+
+NO_POSITION = -1
+
+KIND_NAMES = {code: kind for kind, code in STATUS_KIND_CODES.items()}
+
+# key = (train index * 32 + day of month) * CLASS_SLOTS + class index
+CLASS_SLOTS = 256
+
+
+def make_key(train_idx, day, class_idx):
+    return (np.asarray(train_idx, dtype=np.int64) * 32 + day) * CLASS_SLOTS + class_idx
+
+
+def month_bounds(month):
+    """
+    "2025-11" -> ("2025-11-01", "2025-12-01")
+    """
+    year, mon = (int(p) for p in month.split('-'))
+    end = date(year + mon // 12, mon % 12 + 1, 1)
+    return f"{month}-01", end.isoformat()
+
+
+class Partition:
+    """
+    One month of archived snapshots, columns memory-mapped read-only.
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.trains = np.array(self.meta['trains'])
+        self.class_index = {c: i for i, c in enumerate(self.meta['classes'])}
+        self.columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in COLUMNS}
+
+    def rows_for(self, train_number, journey_date, class_code):
+        """
+        Returns the [start, end) row range of one trajectory.
+        """
+        i = np.searchsorted(self.trains, train_number)
+        if i == len(self.trains) or self.trains[i] != train_number or class_code not in self.class_index:
+            return 0, 0
+        key = make_key(i, int(journey_date[8:10]), self.class_index[class_code])
+        keys = self.columns['key']
+        return int(np.searchsorted(keys, key, 'left')), int(np.searchsorted(keys, key, 'right'))
+
+    def load(self):
+        """
+        Returns the partition's rows as in-memory arrays, decoded back to
+        the columns fetch_columns() produces, for merging.
+        """
+        key = np.asarray(self.columns['key'])
+        train_idx = key // CLASS_SLOTS // 32
+        classes = np.array(self.meta['classes'])
+        return {
+            'train_number': self.trains[train_idx] if len(key) else np.array([], dtype=str),
+            'day': (key // CLASS_SLOTS) % 32,
+            'class_code': classes[key % CLASS_SLOTS] if len(key) else np.array([], dtype=str),
+            'scraped_at': np.asarray(self.columns['scraped_at']),
+            'kind': np.asarray(self.columns['kind']),
+            'position': np.asarray(self.columns['position']),
+            'id': np.asarray(self.columns['id']),
+        }
+
+
+class AvailabilityArchive:
+    def __init__(self, archive_dir=ARCHIVE_DIR):
+        self.archive_dir = archive_dir
+        self.partitions = {}
+
+    def partition_path(self, month):
+        return os.path.join(self.archive_dir, month)
+
+    def months(self):
+        if not os.path.isdir(self.archive_dir):
+            return []
+        return sorted(name for name in os.listdir(self.archive_dir)
+                      if len(name) == 7 and os.path.exists(os.path.join(self.archive_dir, name, 'meta.json')))
+
+    def partition(self, month):
+        """
+        Opens (and caches) a month, None if nothing is archived for it.
+        """
+        path = self.partition_path(month)
+        meta_path = os.path.join(path, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        cached = self.partitions.get(month)
+        # Reopen if compact() has rewritten the month since
+        mtime = os.path.getmtime(meta_path)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, Partition(path))
+            self.partitions[month] = cached
+        return cached[1]
+
+    def wl_curve(self, train_number, journey_date, class_code):
+        """
+        Returns (scraped_at unix seconds, kind codes, positions) arrays for
+        one trajectory, oldest first.
+        """
+        part = self.partition(journey_date[:7])
+        if part is None:
+            return empty_curve()
+        start, end = part.rows_for(str(train_number), journey_date, class_code)
+        return tuple(np.asarray(part.columns[name][start:end]) for name in ('scraped_at', 'kind', 'position'))
+
+    def write_partition(self, month, rows):
+        """
+        Writes a month from column arrays (see Partition.load) sorted into
+        key order. The new directory is swapped in by rename, so readers
+        see either the old month or the new one.
+        """
+        trains = np.unique(rows['train_number'])
+        classes = sorted(set(rows['class_code'].tolist()))
+        class_idx = np.searchsorted(np.array(classes), rows['class_code']) if len(classes) else np.array([], dtype=np.int64)
+        if len(classes) > CLASS_SLOTS:
+            raise ValueError(f"too many classes in {month}")
+        key = make_key(np.searchsorted(trains, rows['train_number']), rows['day'], class_idx)
+        order = np.lexsort((rows['scraped_at'], key))
+
+        path = self.partition_path(month)
+        tmp_path, old_path = path + '.new', path + '.old'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        columns = dict(rows, key=key)
+        for name, dtype in COLUMNS.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), np.asarray(columns[name], dtype=dtype)[order])
+        with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+            json.dump({'month': month, 'rows': int(len(key)), 'trains': trains.tolist(),
+                       'classes': classes}, f)
+
+        if os.path.exists(path):
+            shutil.rmtree(old_path, ignore_errors=True)
+            os.rename(path, old_path)
+        os.rename(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        self.partitions.pop(month, None)
+
+
+def empty_curve():
+    return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int8), np.empty(0, dtype=np.int32)
+
+
+# Typed columns straight out of SQLite; status_kind is NULL only for rows
+# written by something that skipped status_columns()
+SNAPSHOT_COLUMNS = '''
+    SELECT id, train_number, CAST(substr(journey_date, 9, 2) AS INTEGER), class_code,
+           CAST(strftime('%s', scrape_date) AS INTEGER), status_kind, status_position, current_status
+    FROM availability
+'''
+
+
+def fetch_columns(conn, where, params):
+    """
+    Returns column arrays for the availability rows matching where, or
+    None if there are none.
+    """
+    cursor = conn.cursor()
+    # Plain tuples, sqlite3.Row is the slow part at archive sizes
+    cursor.row_factory = None
+    rows = cursor.execute(SNAPSHOT_COLUMNS + where, params).fetchall()
+    if not rows:
+        return None
+    ids, trains, days, classes, scraped_at, kinds, positions, statuses = zip(*rows)
+    kinds, positions = list(kinds), list(positions)
+    for i in [i for i, kind in enumerate(kinds) if kind is None]:
+        kinds[i], positions[i] = status_columns(statuses[i])
+    return {
+        'id': np.array(ids, dtype=np.int64),
+        'train_number': np.array(trains, dtype=str),
+        'day': np.array(days, dtype=np.int64),
+        'class_code': np.array(classes, dtype=str),
+        'scraped_at': np.array(scraped_at, dtype=np.int64),
+        'kind': np.array(kinds, dtype=np.int8),
+        'position': np.array([NO_POSITION if p is None else p for p in positions], dtype=np.int32),
+    }
+
+
+def compact(conn, archive=None, before=None, min_age_days=DEFAULT_MIN_AGE_DAYS):
+    """
+    Moves snapshots of journeys before `before` (default: min_age_days ago)
+    from SQLite into the archive, one journey month at a time, merging with
+    what is already archived. Only the ids a month's partition holds are
+    deleted from SQLite, after the partition has been written; rows whose
+    id is already archived (a run that died before its DELETE) aren't
+    archived again.
+    Returns {month: rows archived}.
+    """
+    archive = archive or AvailabilityArchive()
+    # Needs the typed status columns
+    require_schema(conn)
+    if before is None:
+        before = date.fromordinal(date.today().toordinal() - min_age_days).isoformat()
+
+    months = [r[0] for r in conn.execute(
+        "SELECT DISTINCT substr(journey_date, 1, 7) FROM availability WHERE journey_date < ? ORDER BY 1", (before,))]
+    archived = {}
+    for month in months:
+        start, end = month_bounds(month)
+        rows = fetch_columns(conn, "WHERE journey_date >= ? AND journey_date < ?", (start, min(end, before)))
+        if rows is None:
+            continue
+        existing = archive.partition(month)
+        old = existing.load() if existing is not None else None
+        new = rows
+        if old is not None:
+            fresh = ~np.isin(rows['id'], old['id'])
+            new = {name: column[fresh] for name, column in rows.items()}
+        count = len(new['id'])
+        if count:
+            merged = new if old is None else {name: np.concatenate([old[name], new[name]]) for name in new}
+            archive.write_partition(month, merged)
+
+        # Exactly the ids fetched above, all of which are archived now
+        with conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS archived_ids (id INTEGER PRIMARY KEY)")
+            conn.execute("DELETE FROM archived_ids")
+            conn.executemany("INSERT INTO archived_ids VALUES (?)", ((i,) for i in rows['id'].tolist()))
+            conn.execute("DELETE FROM availability WHERE id IN (SELECT id FROM archived_ids)")
+            conn.execute("DELETE FROM archived_ids")
+        archived[month] = count
+        print(f"Archived {count} snapshots for {month}")
+    return archived
+
+
+def wl_curve(train_number, journey_date, class_code, conn=None, archive=None):
+    """
+    Full WL-over-time curve for a trajectory: archived snapshots plus any
+    still in SQLite. Returns [(scraped_at ISO, kind, position)], oldest
+    first; position is None for statuses without one.
+    """
+    archive = archive or AvailabilityArchive()
+    scraped_at, kind, position = archive.wl_curve(train_number, journey_date, class_code)
+    points = [(int(t), int(k), int(p)) for t, k, p in zip(scraped_at, kind, position)]
+
+    if conn is not None:
+        require_schema(conn)
+        live = fetch_columns(conn, "WHERE train_number = ? AND journey_date = ? AND class_code = ?",
+                                (str(train_number), journey_date, class_code))
+        if live is not None:
+            points.extend(zip(live['scraped_at'].tolist(), live['kind'].tolist(), live['position'].tolist()))
+            points.sort()
+
+    return [
+        (datetime.fromtimestamp(t, timezone.utc).strftime('%Y-%m-%d %H:%M:%S'), KIND_NAMES.get(k),
+         None if p == NO_POSITION else p)
+        for t, k, p in points
+    ]
@@ -0,0 +1,183 @@
+"""
+Streaming batch scoring of CSV/JSONL files. Rows are read lazily, scored in
+fixed-size chunks (one model call per chunk) and written out as each chunk
+finishes, so memory stays flat whatever the file size.
+"""
+import io
+import sys
+import csv
+import json
+import time
+import itertools
+from .model import FEATURE_COLUMNS, REQUIRED_FEATURES, feature_number
+from .travel_calendar import add_date_features
+
+FORMATS = ('csv', 'jsonl')
+DEFAULT_CHUNK_SIZE = 10000
+
+# Columns every input row must have, the other features default to 0.
+# A journey_date column fills in days_to_journey, is_weekend and is_holiday.
+REQUIRED_COLUMNS = REQUIRED_FEATURES
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    if path.endswith('.csv'):
+        return 'csv'
+    if path.endswith('.jsonl') or path.endswith('.ndjson'):
+        return 'jsonl'
+    raise ValueError(f"Can't tell the format of {path}, pass --format csv|jsonl")
+
+
+def open_text(path, mode):
+    """
+    Returns (file, owned). '-' wraps stdin/stdout, which the caller must
+    not close.
+    """
+    if path == '-':
+        stream = sys.stdin if 'r' in mode else sys.stdout
+        return io.TextIOWrapper(stream.buffer, newline='', encoding='utf-8', write_through=True), False
+    return open(path, mode, newline='', encoding='utf-8'), True
+
+
+def read_rows(f, fmt):
+    """
+    Yields row dicts from an open CSV or JSONL file.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(f)
+        for row in reader:
+            # DictReader files surplus fields under None
+            if None in row:
+                raise ValueError(f"Line {reader.line_num}: more fields than the header")
+            yield row
+    else:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"Line {line_number}: {e}")
+            if not isinstance(row, dict):
+                raise ValueError(f"Line {line_number}: expected a JSON object, got {type(row).__name__}")
+            yield row
+
+
+def feature_records(rows, first_row_number):
+    """
+    Validates a chunk and returns its feature columns as numbers.
+    """
+    add_date_features(rows)
+    records = []
+    for i, row in enumerate(rows, start=first_row_number):
+        try:
+            records.append({name: feature_number(row[name]) if row.get(name) not in (None, '') else 0
+                            for name in FEATURE_COLUMNS})
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Row {i}: {e}")
+        missing = [name for name in REQUIRED_COLUMNS if row.get(name) in (None, '')]
+        if missing:
+            raise ValueError(f"Row {i}: missing {', '.join(missing)}")
+    return records
+
+
+def chunked(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def score_chunks(predictor, chunks, with_factors=False):
+    """
+    Yields each chunk's rows with a probability (and factors) column added.
+    """
+    row_number = 1
+    for chunk in chunks:
+        probs, factors = predictor.predict_batch(feature_records(chunk, row_number), with_factors=with_factors)
+        for row, prob in zip(chunk, probs.tolist()):
+            row['probability'] = prob
+        if with_factors:
+            for row, row_factors in zip(chunk, factors):
+                row['factors'] = row_factors
+        row_number += len(chunk)
+        yield chunk
+
+
+class ChunkWriter:
+    """
+    Appends scored chunks to a CSV or JSONL file. The CSV header is every
+    column of the first chunk plus the feature columns scoring may fill in;
+    a later row with a column outside it is an error rather than silently
+    dropped. Factors are written as a JSON string column.
+    """
+
+    def __init__(self, f, fmt):
+        self.f = f
+        self.fmt = fmt
+        self.writer = None
+        self.rows = 0
+
+    def write(self, chunk):
+        if self.fmt == 'jsonl':
+            self.f.write(''.join(json.dumps(row) + '\n' for row in chunk))
+        else:
+            if self.writer is None:
+                fieldnames = {}
+                for row in chunk:
+                    fieldnames.update(dict.fromkeys(row))
+                fieldnames.update(dict.fromkeys(FEATURE_COLUMNS))
+                self.writer = csv.DictWriter(self.f, fieldnames=list(fieldnames))
+                self.writer.writeheader()
+            header = set(self.writer.fieldnames)
+            for i, row in enumerate(chunk, start=self.rows + 1):
+                extra = [name for name in row if name not in header]
+                if extra:
+                    raise ValueError(f"Row {i}: {', '.join(extra)} not in the CSV header taken from "
+                                     f"the first chunk, write JSONL instead")
+                if 'factors' in row:
+                    row['factors'] = json.dumps(row['factors'])
+            self.writer.writerows(chunk)
+        self.rows += len(chunk)
+        self.f.flush()
+
+
+def predict_file(predictor, input_path, output_path, in_format=None, out_format=None,
+                 chunk_size=DEFAULT_CHUNK_SIZE, with_factors=False, progress_every=2.0, log=None):
+    """
+    Scores input_path into output_path ('-' for stdin/stdout) and returns
+    (rows, seconds). Progress lines go to log (stderr by default).
+    """
+    log = log or sys.stderr
+    in_format = detect_format(input_path, in_format)
+    out_format = out_format or (in_format if output_path == '-' else detect_format(output_path))
+
+    fin, close_in = open_text(input_path, 'r')
+    fout, close_out = open_text(output_path, 'w')
+    start = last_report = time.perf_counter()
+    rows = 0
+    try:
+        writer = ChunkWriter(fout, out_format)
+        chunks = chunked(read_rows(fin, in_format), chunk_size)
+        for chunk in score_chunks(predictor, chunks, with_factors):
+            writer.write(chunk)
+            rows += len(chunk)
+            now = time.perf_counter()
+            if now - last_report >= progress_every:
+                print(f"{rows} rows, {rows / (now - start):.0f} rows/s", file=log)
+                last_report = now
+    finally:
+        # Wrappers around stdin/stdout are detached rather than closed
+        for f, owned in ((fin, close_in), (fout, close_out)):
+            if owned:
+                f.close()
+            else:
+                f.detach()
+
+    seconds = time.perf_counter() - start
+    print(f"Scored {rows} rows in {seconds:.2f}s ({rows / seconds if seconds else 0:.0f} rows/s)", file=log)
+    return rows, seconds
@@ -0,0 +1,84 @@
+import time
+import threading
+from collections import OrderedDict
+from .database import get_pooled_connection
+from .metrics import registry
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache whose entries also expire after ttl seconds.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires > time.monotonic():
+                    self.data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self.lock:
+            self.data[key] = (value, time.monotonic() + self.ttl)
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def invalidate(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+# Train details by train number. The scraper invalidates entries it writes
+# in this process; the TTL bounds staleness from scrapes run elsewhere.
+train_cache = LRUCache(maxsize=2048, ttl=600)
+
+
+@registry.collector
+def train_cache_metrics():
+    name = 'railpredict_train_cache_total'
+    return [
+        f"# HELP {name} Train detail cache lookups",
+        f"# TYPE {name} counter",
+        f'{name}{{result="hit"}} {train_cache.hits}',
+        f'{name}{{result="miss"}} {train_cache.misses}',
+    ]
+
+
+def get_train(train_number):
+    """
+    Read-through lookup of a train row as a dict, None if it isn't stored.
+    Misses aren't cached, so a train shows up as soon as it is scraped.
+    Neither are rows still missing their scraped details (no avg_speed):
+    callers queue a scrape for those, which may run in another worker whose
+    invalidation never reaches this process's cache.
+    """
+    train = train_cache.get(train_number)
+    if train is not None:
+        return train
+
+    row = get_pooled_connection().execute('SELECT * FROM trains WHERE train_number = ?', (train_number,)).fetchone()
+    if row is None:
+        return None
+    train = dict(row)
+    if train.get('avg_speed') is not None:
+        train_cache.set(train_number, train)
+    return train
@@ -0,0 +1,299 @@
+import os
+import json
+import hashlib
+from bisect import bisect_left
+from collections import deque
+import numpy as np
+
+# Flattened copy of the pickled forest, written next to it by export_forest()
+FOREST_DIR = "wl_prediction_model_forest"
+
+# sklearn marks leaves with left == right == -1
+TREE_LEAF = -1
+
+ARRAY_NAMES = ['feature', 'threshold', 'left', 'right', 'value', 'roots']
+
+# Entries in one tree's lookup table; deeper trees get a table for their
+# top levels and are walked from there
+MAX_TREE_CELLS = 1 << 14
+
+# Forests splitting on more distinct thresholds than this (continuous
+# features) aren't tabled, the per-tree bin offsets would be too big
+MAX_TABLE_EDGES = 1 << 14
+
+# Rows scored per pass, keeps the (n_trees, rows) temporaries in cache
+CHUNK_ROWS = 1024
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def flatten_forest(model):
+    """
+    Flattens a fitted RandomForestClassifier into contiguous node arrays.
+    Every tree's nodes are appended to one table, child indices are rewritten
+    to global offsets and leaf values are normalized to class probabilities,
+    so scoring needs nothing but NumPy.
+    """
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        roots.append(offset)
+        features.append(tree.feature.astype(np.int32))
+        thresholds.append(tree.threshold.astype(np.float64))
+
+        left = tree.children_left.astype(np.int32)
+        right = tree.children_right.astype(np.int32)
+        lefts.append(np.where(left == TREE_LEAF, TREE_LEAF, left + offset))
+        rights.append(np.where(right == TREE_LEAF, TREE_LEAF, right + offset))
+
+        # Same normalization as DecisionTreeClassifier.predict_proba
+        value = tree.value[:, 0, :].astype(np.float64)
+        normalizer = value.sum(axis=1, keepdims=True)
+        normalizer[normalizer == 0.0] = 1.0
+        values.append(value / normalizer)
+
+        offset += tree.node_count
+
+    return {
+        'feature': np.concatenate(features),
+        'threshold': np.concatenate(thresholds),
+        'left': np.concatenate(lefts).astype(np.int32),
+        'right': np.concatenate(rights).astype(np.int32),
+        'value': np.ascontiguousarray(np.concatenate(values)),
+        'roots': np.asarray(roots, dtype=np.int32),
+    }
+
+
+def forest_meta(model, arrays, source_path=None):
+    return {
+        'n_trees': len(arrays['roots']),
+        'n_nodes': len(arrays['feature']),
+        'n_features': int(model.n_features_in_),
+        'classes': [int(c) for c in model.classes_],
+        'source_sha256': file_sha256(source_path) if source_path else None,
+    }
+
+
+def export_forest(model, out_dir=FOREST_DIR, source_path=None):
+    """
+    Writes flatten_forest()'s arrays and a meta.json to out_dir.
+    """
+    arrays = flatten_forest(model)
+    os.makedirs(out_dir, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(out_dir, f"{name}.npy"), array)
+
+    meta = forest_meta(model, arrays, source_path)
+    with open(os.path.join(out_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    print(f"Exported {meta['n_trees']} trees ({meta['n_nodes']} nodes) to {out_dir}")
+    return meta
+
+
+def build_top_table(arrays, n_features, max_tree_cells=MAX_TREE_CELLS, max_edges=MAX_TABLE_EDGES):
+    """
+    Precomputes, for every combination of threshold intervals, the node a
+    row leaves each tree's top levels at, so apply() skips those levels
+    with a few gathers. A tree's top region grows breadth first while its
+    table stays within max_tree_cells entries; trees that fit whole map
+    straight to their leaves.
+
+    A feature value is binned once against the sorted thresholds the whole
+    forest uses for that feature (edges). weights[f][tree, bin] is that
+    bin's offset into the tree's block of table, so a row's exit node in
+    tree t is table[sum over f of weights[f][t, bin_f]].
+    Returns (edges, weights, table), or None if the forest splits on more
+    than max_edges distinct thresholds.
+    """
+    feature, threshold = arrays['feature'], arrays['threshold']
+    inner = arrays['left'] != TREE_LEAF
+    edges = [np.unique(threshold[inner & (feature == f)]) for f in range(n_features)]
+    if sum(len(e) for e in edges) > max_edges:
+        return None
+
+    # A row goes left at a node iff its bin is <= the node's threshold rank
+    rank = np.zeros(len(feature), dtype=np.int64)
+    for f in range(n_features):
+        split = inner & (feature == f)
+        rank[split] = np.searchsorted(edges[f], threshold[split])
+    rank, feature = rank.tolist(), feature.tolist()
+    left, right, inner = arrays['left'].tolist(), arrays['right'].tolist(), inner.tolist()
+
+    roots = [int(r) for r in arrays['roots']]
+    weights = [np.zeros((len(roots), len(e) + 1), dtype=np.int64) for e in edges]
+    blocks = []
+    offset = 0
+    for t, root in enumerate(roots):
+        # Nodes whose threshold would overflow the table are where the walk
+        # resumes, and so is everything below them
+        ranks = [set() for _ in range(n_features)]
+        region = set()
+        size = 1
+        queue = deque([root])
+        while queue:
+            node = queue.popleft()
+            if not inner[node]:
+                continue
+            f = feature[node]
+            used = len(ranks[f]) + 1
+            grown = size if rank[node] in ranks[f] else size // used * (used + 1)
+            if grown > max_tree_cells:
+                continue
+            ranks[f].add(rank[node])
+            size = grown
+            region.add(node)
+            queue.extend((left[node], right[node]))
+
+        ranks = [sorted(r) for r in ranks]
+        shape = tuple(len(r) + 1 for r in ranks)
+        strides = np.cumprod((shape[1:] + (1,))[::-1])[::-1]
+        for f in range(n_features):
+            weights[f][t] = np.searchsorted(ranks[f], np.arange(len(edges[f]) + 1)) * strides[f]
+        weights[0][t] += offset
+
+        # Fill each exit node's box of (tree-local) bins, splitting boxes at
+        # every node of the region
+        block = np.empty(shape, dtype=np.int32)
+        stack = [(root, (0,) * n_features, shape)]
+        while stack:
+            node, lo, hi = stack.pop()
+            if node not in region:
+                block[tuple(slice(a, b) for a, b in zip(lo, hi))] = node
+                continue
+            f = feature[node]
+            k = bisect_left(ranks[f], rank[node]) + 1
+            stack.append((left[node], lo, hi[:f] + (min(hi[f], k),) + hi[f + 1:]))
+            stack.append((right[node], lo[:f] + (max(lo[f], k),) + lo[f + 1:], hi))
+        blocks.append(block.ravel())
+        offset += size
+
+    return edges, weights, np.concatenate(blocks)
+
+
+class CompiledForest:
+    """
+    Pure-NumPy stand-in for the pickled RandomForestClassifier.
+    Arrays are memory-mapped read-only, so forked workers share the pages.
+    """
+
+    def __init__(self, forest_dir=FOREST_DIR, mmap_mode='r', arrays=None, meta=None):
+        if arrays is None:
+            with open(os.path.join(forest_dir, 'meta.json')) as f:
+                meta = json.load(f)
+            arrays = {name: np.load(os.path.join(forest_dir, f"{name}.npy"), mmap_mode=mmap_mode)
+                      for name in ARRAY_NAMES}
+        self.meta = meta
+        for name in ARRAY_NAMES:
+            setattr(self, name, arrays[name])
+        self.classes_ = np.asarray(self.meta['classes'])
+        self.n_features_in_ = self.meta['n_features']
+        self.top_table = build_top_table(arrays, self.n_features_in_)
+
+        # walk() steps to children[2 * node + go_right]; thresholds rounded
+        # down to float32, so x > threshold32 exactly when sklearn's float32
+        # x > float64 threshold, without converting x
+        self.is_leaf = np.asarray(self.left) == TREE_LEAF
+        self.children = np.column_stack([self.left, self.right]).astype(np.int64).ravel()
+        threshold32 = np.asarray(self.threshold, dtype=np.float32)
+        rounded_up = threshold32 > self.threshold
+        threshold32[rounded_up] = np.nextafter(threshold32[rounded_up], np.float32(-np.inf))
+        self.threshold32 = threshold32
+
+    @classmethod
+    def from_model(cls, model):
+        """
+        In-memory compiled copy of a fitted forest, nothing written to disk.
+        """
+        arrays = flatten_forest(model)
+        return cls(arrays=arrays, meta=forest_meta(model, arrays))
+
+    @classmethod
+    def load_if_fresh(cls, forest_dir=FOREST_DIR, source_path=None):
+        """
+        Returns the compiled forest, or None if it is missing or was exported
+        from a different pickle than the one at source_path.
+        """
+        if not os.path.exists(os.path.join(forest_dir, 'meta.json')):
+            return None
+        forest = cls(forest_dir)
+        if source_path and os.path.exists(source_path):
+            if forest.meta.get('source_sha256') != file_sha256(source_path):
+                print(f"Compiled forest in {forest_dir} is stale, ignoring it.")
+                return None
+        return forest
+
+    def apply(self, X):
+        """
+        Returns the leaf node reached in every tree, shape (n_trees, n_samples).
+        CHUNK_ROWS rows at a time, each row's walk starts from where
+        top_table says it leaves the tree's top levels.
+        """
+        # sklearn compares float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        leaves = np.empty((len(self.roots), len(X)), dtype=np.int64)
+        for i in range(0, len(X), CHUNK_ROWS):
+            chunk = X[i:i + CHUNK_ROWS]
+            start = self.lookup(chunk) if self.top_table is not None else None
+            leaves[:, i:i + len(chunk)] = self.walk(chunk, start)
+        return leaves
+
+    def lookup(self, X):
+        """
+        Exit node of every tree's top levels: bin each feature, sum the
+        per-tree offsets, one gather.
+        """
+        edges, weights, table = self.top_table
+        index = weights[0].take(np.searchsorted(edges[0], X[:, 0]), axis=1)
+        for f in range(1, len(edges)):
+            index += weights[f].take(np.searchsorted(edges[f], X[:, f]), axis=1)
+        return table.take(index)
+
+    def walk(self, X, start=None):
+        """
+        Walks the rest of the way from start (n_trees, n_samples), or from
+        the roots. All (tree, row) pairs still inside the trees advance one
+        level per iteration; pairs that hit a leaf drop out of the active
+        set.
+        """
+        n, n_features = X.shape
+        flat_X = X.ravel()
+        n_trees = len(self.roots)
+
+        if start is None:
+            node = np.repeat(np.asarray(self.roots, dtype=np.int64), n)
+        else:
+            node = start.astype(np.int64).ravel()
+        row_offset = np.tile(np.arange(n, dtype=np.int64) * n_features, n_trees)
+        active = np.flatnonzero(~self.is_leaf.take(node))
+
+        while active.size:
+            current = node.take(active)
+            x = flat_X.take(row_offset.take(active) + self.feature.take(current))
+            current = self.children.take(2 * current + (x > self.threshold32.take(current)))
+            node[active] = current
+            active = active[~self.is_leaf.take(current)]
+
+        return node.reshape(n_trees, n)
+
+    def predict_proba(self, X):
+        return self.proba_from_leaves(self.apply(X))
+
+    def proba_from_leaves(self, leaves):
+        # Accumulate tree by tree, in the same order as sklearn, so the
+        # averaged probabilities match predict_proba bit for bit.
+        proba = np.zeros((leaves.shape[1], self.value.shape[1]))
+        for tree_leaves in leaves:
+            proba += self.value.take(tree_leaves, axis=0)
+        proba /= len(leaves)
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
@@ -1,13 +1,118 @@
 import sqlite3
 import os
+import threading
+from .metrics import timed
 
-DB_PATH = "railway_data.db"
+# RAILPREDICT_DB points the app at another database, e.g. a load-test copy
+DB_PATH = os.environ.get("RAILPREDICT_DB", "railway_data.db")
 
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+SCHEDULE_UNIQUE_INDEX = "ux_schedules_train_station"
+
+def configure_connection(conn):
+    # WAL lets app.py keep reading while a scrape writes; NORMAL sync is
+    # safe under WAL and avoids an fsync per commit
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
     return conn
 
+class TimedConnection(sqlite3.Connection):
+    """
+    Connection whose execute/executemany calls are recorded under the
+    db_query stage of the latency histogram.
+    """
+
+    def execute(self, *args):
+        with timed('db_query'):
+            return super().execute(*args)
+
+    def executemany(self, *args):
+        with timed('db_query'):
+            return super().executemany(*args)
+
+def get_db_connection(db_path=None, check_same_thread=True):
+    conn = sqlite3.connect(db_path or DB_PATH, factory=TimedConnection, check_same_thread=check_same_thread)
+    conn.row_factory = sqlite3.Row
+    return configure_connection(conn)
+
+class ConnectionPool:
+    """
+    One long-lived connection per thread, opened on first use with the
+    standard pragmas and sqlite3.Row rows. Request handlers reuse it
+    instead of paying a connect per request.
+
+    Threads may be short-lived (werkzeug's threaded server starts one per
+    request), so connections of threads that have exited are closed
+    whenever another thread opens one.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.connections = {}
+
+    def connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            # DB_PATH is read at first use so callers can repoint it. Each
+            # connection is only used by its thread, but may be closed from
+            # another by prune() or close_all()
+            conn = get_db_connection(self.db_path, check_same_thread=False)
+            self.local.conn = conn
+            with self.lock:
+                self.prune()
+                self.connections[threading.current_thread()] = conn
+        return conn
+
+    def prune(self):
+        # Called with lock held
+        for thread in [t for t in self.connections if not t.is_alive()]:
+            self.connections.pop(thread).close()
+
+    def close_all(self):
+        with self.lock:
+            for conn in self.connections.values():
+                conn.close()
+            self.connections = {}
+        self.local = threading.local()
+
+    def after_fork(self):
+        """
+        Starts a forked worker with an empty pool. SQLite connections must
+        not cross a fork, so any inherited from the parent are neither used
+        nor closed here, just kept referenced until exit.
+        """
+        self.inherited = list(self.connections.values())
+        self.connections = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+pool = ConnectionPool()
+
+def get_pooled_connection():
+    return pool.connection()
+
+def ensure_schedule_constraints(conn):
+    """
+    Adds the (train_number, station_code) unique index the scraper upserts
+    against, dropping duplicate stops left by older scrapes first.
+    """
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?",
+                          (SCHEDULE_UNIQUE_INDEX,)).fetchone()
+    if exists:
+        return False
+    with conn:
+        # Keep the most recent row of every duplicated stop
+        removed = conn.execute('''
+        DELETE FROM schedules WHERE id NOT IN (
+            SELECT MAX(id) FROM schedules GROUP BY train_number, station_code
+        )
+        ''').rowcount
+        conn.execute(f"CREATE UNIQUE INDEX {SCHEDULE_UNIQUE_INDEX} ON schedules (train_number, station_code)")
+    print(f"Removed {removed} duplicate schedule rows and added {SCHEDULE_UNIQUE_INDEX}.")
+    return True
+
 def init_db():
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -56,6 +161,10 @@ def init_db():
     ''')
     
     conn.commit()
+
+    # Bring the schema (indexes, typed columns) up to the latest version
+    from .migrations import migrate
+    migrate(conn)
     conn.close()
     print(f"Database initialized at {DB_PATH}")
 
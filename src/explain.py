@@ -0,0 +1,64 @@
+"""
+Per-prediction feature attributions for the forest (Saabas' method).
+
+Walking a row down a tree, every split moves the node's class-1 value
+from the parent's to the child's; that change is credited to the feature
+the split tested. Averaged over trees, the confirmation probability is
+
+    bias (mean root value) + sum of the per-feature contributions
+
+exactly, so the contributions say how far each feature moved this
+prediction away from the training base rate.
+"""
+import numpy as np
+from .compiled_model import TREE_LEAF
+
+
+def path_contributions(forest, node_value):
+    """
+    For every node, the per-feature sum of value changes on the path from
+    its tree's root, shape (n_nodes, n_features). A row's contributions in
+    a tree are just this row of its leaf.
+    """
+    left, right, feature = forest.left, forest.right, forest.feature
+    paths = np.zeros((len(left), forest.n_features_in_))
+    # Breadth first, every tree at once; parents are filled before children
+    frontier = np.asarray(forest.roots, dtype=np.int64)
+    while frontier.size:
+        frontier = frontier[left.take(frontier) != TREE_LEAF]
+        split = feature.take(frontier)
+        for children in (left.take(frontier), right.take(frontier)):
+            paths[children] = paths[frontier]
+            paths[children, split] += node_value.take(children) - node_value.take(frontier)
+        frontier = np.concatenate([left.take(frontier), right.take(frontier)]).astype(np.int64)
+    return paths
+
+
+class TreeExplainer:
+    """
+    Attributions over a CompiledForest's node arrays. Every node's path
+    contributions are precomputed, so attributing a batch only needs the
+    leaves CompiledForest.apply() reached, and callers that already have
+    them for the probabilities don't walk the trees again.
+    """
+
+    def __init__(self, forest, class_index=1):
+        self.forest = forest
+        node_value = np.ascontiguousarray(forest.value[:, class_index])
+        self.bias = float(node_value.take(np.asarray(forest.roots, dtype=np.int64)).mean())
+        self.paths = path_contributions(forest, node_value)
+
+    def from_leaves(self, leaves):
+        """
+        Contributions, shape (n_samples, n_features), from apply()'s leaves.
+        """
+        contributions = np.zeros((leaves.shape[1], self.paths.shape[1]))
+        for tree_leaves in leaves:
+            contributions += self.paths.take(tree_leaves, axis=0)
+        return contributions / len(leaves)
+
+    def contributions(self, features):
+        """
+        Contributions for an (n, n_features) feature matrix.
+        """
+        return self.from_leaves(self.forest.apply(features))
@@ -0,0 +1,125 @@
+import re
+import itertools
+from datetime import datetime, date
+from .travel_calendar import get_calendar
+
+# Status kinds parsed out of the free-text availability strings
+STATUS_WL = "WL"
+STATUS_RAC = "RAC"
+STATUS_AVAILABLE = "AVAILABLE"
+STATUS_CNF = "CNF"
+STATUS_DEPARTED = "DEPARTED"
+STATUS_UNKNOWN = "UNKNOWN"
+
+# Integer codes stored in availability.status_kind, never renumber
+STATUS_KIND_CODES = {
+    STATUS_UNKNOWN: 0,
+    STATUS_WL: 1,
+    STATUS_RAC: 2,
+    STATUS_AVAILABLE: 3,
+    STATUS_CNF: 4,
+    STATUS_DEPARTED: 5,
+}
+
+# A waitlisted ticket counts as confirmed once it reaches any of these,
+# RAC included since it already allows boarding
+CONFIRMED_KINDS = (STATUS_RAC, STATUS_AVAILABLE, STATUS_CNF)
+
+# "WL123", "GNWL45/WL12", "RLWL 5", "RAC5", "AVAILABLE-0123", "CNF/B1/32"
+POSITION_RE = re.compile(r'(RAC|WL)\s*(\d+)')
+
+
+def parse_status(status):
+    """
+    Returns (kind, position) for a raw status string. Position is the
+    WL/RAC number, or None for statuses without one.
+    For "booking/current" pairs only the current part is used.
+    """
+    if not status:
+        return STATUS_UNKNOWN, None
+    text = status.strip().upper()
+
+    # "GNWL45/WL12": the last part carrying a position is the current one
+    for part in reversed(text.split('/')):
+        match = POSITION_RE.search(part)
+        if match:
+            return match.group(1), int(match.group(2))
+
+    if 'DEPARTED' in text:
+        return STATUS_DEPARTED, None
+    if text.startswith('AVAILABLE') or text.startswith('AVL'):
+        return STATUS_AVAILABLE, None
+    if text.startswith('CNF') or 'CONFIRM' in text:
+        return STATUS_CNF, None
+    return STATUS_UNKNOWN, None
+
+
+def stream_availability(conn, after_journey_date=None, before_journey_date=None, chunk_size=5000):
+    """
+    Yields availability rows one at a time, ordered by trajectory
+    (train, journey date, class) and then by scrape time, fetching
+    chunk_size rows per round trip so memory stays flat.
+    """
+    # The unary + keeps SQLite off ix_availability_journey_date, walking the
+    # trajectory index in order beats a range scan plus a sort
+    query = '''
+    SELECT train_number, journey_date, class_code, current_status, scrape_date
+    FROM availability
+    WHERE +journey_date > ? AND +journey_date < ?
+    ORDER BY train_number, journey_date, class_code, scrape_date
+    '''
+    cursor = conn.execute(query, (after_journey_date or '', before_journey_date or '9999-12-31'))
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield from rows
+
+
+def trajectory_examples(rows):
+    """
+    Turns one (train, date, class) trajectory into labelled training rows.
+    Every WL snapshot becomes an example, labelled by whether the last
+    known status of the trajectory is a confirmed kind.
+    """
+    snapshots = []
+    for row in rows:
+        kind, position = parse_status(row['current_status'])
+        if kind in (STATUS_DEPARTED, STATUS_UNKNOWN):
+            continue
+        snapshots.append((row, kind, position))
+    if not snapshots:
+        return []
+
+    final_kind = snapshots[-1][1]
+    label = 1 if final_kind in CONFIRMED_KINDS else 0
+
+    calendar = get_calendar()
+    examples = []
+    for row, kind, position in snapshots:
+        if kind != STATUS_WL:
+            continue
+        journey = datetime.strptime(row['journey_date'], "%Y-%m-%d").date()
+        scraped = datetime.strptime(row['scrape_date'][:10], "%Y-%m-%d").date()
+        days_to_journey = (journey - scraped).days
+        if days_to_journey < 0:
+            continue
+        # Same lookup serving uses, so both sides agree on is_holiday
+        is_weekend, is_holiday = calendar.features(journey)
+        examples.append(([days_to_journey, position, is_weekend, is_holiday], label))
+    return examples
+
+
+def iter_examples(conn, after_journey_date=None, before_journey_date=None, chunk_size=5000):
+    """
+    Streams labelled examples for completed trajectories, i.e. journey dates
+    strictly between the checkpoint and before_journey_date (default: today).
+    Yields (features, label, journey_date).
+    """
+    if before_journey_date is None:
+        before_journey_date = date.today().isoformat()
+    rows = stream_availability(conn, after_journey_date, before_journey_date, chunk_size)
+    key = lambda r: (r['train_number'], r['journey_date'], r['class_code'])
+    for (_, journey_date, _), trajectory in itertools.groupby(rows, key=key):
+        for features, label in trajectory_examples(trajectory):
+            yield features, label, journey_date
@@ -0,0 +1,223 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from .metrics import http_cache_events
+
+# Route pages barely change, a week-old copy is still fresh
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+EVICT_TO = 0.9
+
+# Unreferenced bodies younger than this at the start of an eviction are
+# kept, a store() may not have written the index entry for them yet
+BODY_GRACE_SECONDS = 60
+
+
+class OfflineCacheMiss(Exception):
+    """
+    Raised in offline replay mode when a URL was never cached.
+    """
+
+
+class CachedResponse:
+    """
+    The subset of requests.Response the scraper uses.
+    """
+
+    def __init__(self, status_code, content, headers, from_cache=False):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+
+class HttpCache:
+    """
+    On-disk response cache. Bodies are stored content-addressed under
+    bodies/<sha256 of body>, and index/<sha256 of url>.json maps a URL to
+    its body plus validators (ETag/Last-Modified) and fetch time.
+
+    Fresh entries (younger than ttl) are served without touching the
+    network, stale ones are revalidated with a conditional GET, and the
+    least recently used entries are evicted once bodies exceed max_bytes.
+    In offline mode only the cache is consulted, whatever the entry's age.
+    """
+
+    def __init__(self, cache_dir, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES, offline=False):
+        self.cache_dir = cache_dir
+        self.index_dir = os.path.join(cache_dir, 'index')
+        self.body_dir = os.path.join(cache_dir, 'bodies')
+        os.makedirs(self.index_dir, exist_ok=True)
+        os.makedirs(self.body_dir, exist_ok=True)
+
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'revalidated': 0, 'stored': 0, 'evicted': 0}
+        # Running total of body bytes, so eviction only scans when needed
+        self.total_bytes = sum(e.stat().st_size for e in os.scandir(self.body_dir) if e.is_file())
+
+    def index_path(self, url):
+        return os.path.join(self.index_dir, hashlib.sha256(url.encode()).hexdigest() + '.json')
+
+    def body_path(self, digest):
+        return os.path.join(self.body_dir, digest)
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+        http_cache_events.inc(key)
+
+    def lookup(self, url):
+        """
+        Returns (entry, body) or (None, None). Touches the index file so its
+        mtime tracks last use for LRU eviction.
+        """
+        path = self.index_path(url)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            with open(self.body_path(entry['body_sha256']), 'rb') as f:
+                body = f.read()
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            return None, None
+        return entry, body
+
+    def store(self, url, response):
+        body = response.content
+        digest = hashlib.sha256(body).hexdigest()
+        try:
+            # An existing body is touched so evict() sees it as in use until
+            # the index entry below points at it
+            os.utime(self.body_path(digest))
+        except FileNotFoundError:
+            atomic_write(self.body_path(digest), body)
+            with self.lock:
+                self.total_bytes += len(body)
+
+        entry = {
+            'url': url,
+            'status_code': response.status_code,
+            'body_sha256': digest,
+            'size': len(body),
+            'fetched_at': time.time(),
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_type': response.headers.get('Content-Type'),
+        }
+        atomic_write(self.index_path(url), json.dumps(entry).encode())
+        self.count('stored')
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+
+    def refresh(self, url, entry):
+        entry['fetched_at'] = time.time()
+        atomic_write(self.index_path(url), json.dumps(entry).encode())
+
+    def get(self, url, fetch):
+        """
+        Serves url from the cache when possible. fetch(headers) performs the
+        real GET with extra request headers and returns a response.
+        """
+        entry, body = self.lookup(url)
+
+        if entry is not None and (self.offline or time.time() - entry['fetched_at'] < self.ttl):
+            self.count('hits')
+            return cached_response(entry, body)
+
+        if self.offline:
+            self.count('misses')
+            raise OfflineCacheMiss(url)
+
+        headers = {}
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        response = fetch(headers)
+        if entry is not None and response.status_code == 304:
+            self.count('revalidated')
+            self.refresh(url, entry)
+            return cached_response(entry, body)
+
+        self.count('misses')
+        # Only successful pages are worth replaying
+        if response.status_code == 200:
+            self.store(url, response)
+        return response
+
+    def evict(self):
+        """
+        Drops least recently used index entries until the bodies they
+        reference fit in max_bytes, then deletes unreferenced bodies that
+        weren't written or touched shortly before the scan.
+        """
+        with self.lock:
+            recent = time.time() - BODY_GRACE_SECONDS
+            entries = []
+            for name in os.listdir(self.index_dir):
+                path = os.path.join(self.index_dir, name)
+                try:
+                    with open(path) as f:
+                        entry = json.load(f)
+                    entries.append((os.path.getmtime(path), path, entry))
+                except (OSError, ValueError):
+                    continue
+
+            sizes = {e['body_sha256']: e['size'] for _, _, e in entries}
+            total = sum(sizes.values())
+            entries.sort(key=lambda e: e[0])
+            # Evict down to a low watermark so the next store doesn't rescan
+            target = self.max_bytes * EVICT_TO
+            while total > target and entries:
+                _, path, entry = entries.pop(0)
+                os.remove(path)
+                self.stats['evicted'] += 1
+                http_cache_events.inc('evicted')
+                digest = entry['body_sha256']
+                if not any(e['body_sha256'] == digest for _, _, e in entries):
+                    total -= sizes.pop(digest)
+
+            referenced = {e['body_sha256'] for _, _, e in entries}
+            for body in os.scandir(self.body_dir):
+                if body.name in referenced or body.name.startswith('.'):
+                    continue
+                try:
+                    stat = body.stat()
+                    if stat.st_mtime >= recent:
+                        # Possibly mid-store in another thread or process,
+                        # left for a later eviction
+                        total += stat.st_size
+                        continue
+                    os.remove(body.path)
+                except OSError:
+                    pass
+            self.total_bytes = total
+
+
+def cached_response(entry, body):
+    headers = {}
+    for header, key in (('ETag', 'etag'), ('Last-Modified', 'last_modified'), ('Content-Type', 'content_type')):
+        if entry.get(key):
+            headers[header] = entry[key]
+    return CachedResponse(entry['status_code'], body, headers, from_cache=True)
+
+
+def atomic_write(path, data):
+    # Write to a temp file in the same directory, then rename over the
+    # target, so concurrent readers never see a partial file
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
@@ -0,0 +1,111 @@
+import time
+import random
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from .metrics import http_events
+
+# Responses worth retrying, everything else is returned to the caller as-is
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: refills at `rate` tokens per second up to
+    `capacity`, acquire() blocks until a token is available.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HttpClient:
+    """
+    Shared keep-alive session with per-host rate limiting and retries.
+    Safe to use from a thread pool.
+    """
+
+    def __init__(self, headers=None, rate_per_host=5.0, burst=5, max_retries=3,
+                 backoff=0.5, timeout=10, pool_size=16, cache=None):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if headers:
+            self.session.headers.update(headers)
+
+        self.rate_per_host = rate_per_host
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        # Optional HttpCache consulted before the network
+        self.cache = cache
+
+        self.buckets = {}
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'retries': 0, 'errors': 0}
+
+    def bucket_for(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate_per_host, self.burst)
+            return self.buckets[host]
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+        http_events.inc(key)
+
+    def get(self, url, **kwargs):
+        """
+        GETs url through the response cache if one is configured.
+        """
+        if self.cache is None:
+            return self.fetch(url, **kwargs)
+
+        def fetch(extra_headers):
+            return self.fetch(url, headers=extra_headers, **kwargs)
+        return self.cache.get(url, fetch)
+
+    def fetch(self, url, **kwargs):
+        """
+        GETs url, retrying connection errors and RETRY_STATUSES with
+        exponential backoff plus jitter. Raises after the last attempt.
+        """
+        bucket = self.bucket_for(url)
+        kwargs.setdefault('timeout', self.timeout)
+        for attempt in range(self.max_retries + 1):
+            bucket.acquire()
+            self.count('requests')
+            try:
+                response = self.session.get(url, **kwargs)
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    return response
+            except requests.RequestException:
+                if attempt == self.max_retries:
+                    self.count('errors')
+                    raise
+            self.count('retries')
+            time.sleep(self.backoff * (2 ** attempt) * (1 + random.random()))
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,80 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .database import get_pooled_connection
+
+# Finished job outcomes are kept this long for status polling
+RESULT_TTL = 600
+
+# Job states reported by ScrapeJobs.status()
+JOB_PENDING = "pending"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_UNKNOWN = "unknown"
+
+
+class ScrapeJobs:
+    """
+    Background on-demand scrapes with single-flight deduplication: while a
+    train's scrape is queued or running, further requests for it join the
+    same job instead of starting another one.
+    """
+
+    def __init__(self, workers=2, scraper_factory=None):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scrape')
+        self.lock = threading.Lock()
+        self.inflight = {}
+        # train_number -> (state, finished_at, error) for recent jobs
+        self.results = {}
+        self.scraper_factory = scraper_factory or default_scraper
+
+    def submit(self, train_number):
+        """
+        Queues a scrape unless one is already in flight. Returns its future.
+        """
+        with self.lock:
+            future = self.inflight.get(train_number)
+            if future is not None:
+                return future
+            future = self.pool.submit(self.run, train_number)
+            self.inflight[train_number] = future
+            self.results.pop(train_number, None)
+            return future
+
+    def run(self, train_number):
+        try:
+            scraper = self.scraper_factory()
+            try:
+                scraper.scrape_train_schedule(train_number)
+            finally:
+                scraper.close()
+            outcome = (JOB_DONE, time.time(), None)
+        except Exception as e:
+            print(f"Background scrape of {train_number} failed: {e}")
+            outcome = (JOB_FAILED, time.time(), str(e))
+        with self.lock:
+            self.inflight.pop(train_number, None)
+            self.results[train_number] = outcome
+            cutoff = time.time() - RESULT_TTL
+            for key in [k for k, (_, finished, _) in self.results.items() if finished < cutoff]:
+                del self.results[key]
+        return outcome[0]
+
+    def status(self, train_number):
+        with self.lock:
+            if train_number in self.inflight:
+                return JOB_PENDING, None
+            if train_number in self.results:
+                state, _, error = self.results[train_number]
+                return state, error
+        return JOB_UNKNOWN, None
+
+    def shutdown(self, wait=True):
+        self.pool.shutdown(wait=wait)
+
+
+def default_scraper():
+    # Imported lazily so serving doesn't load bs4/requests until a scrape runs
+    from .scraper import RailwayScraper
+    # Each worker thread writes through its own pooled connection
+    return RailwayScraper(conn=get_pooled_connection())
@@ -0,0 +1,127 @@
+"""
+Local prediction daemon: keeps the model resident and answers over a Unix
+socket, one JSON object per line in each direction.
+
+    python main.py serve-local --socket /tmp/railpredict.sock
+    echo '{"days_to_journey": 10, "current_wl": 40}' | nc -U /tmp/railpredict.sock
+
+Requests:
+    {"days_to_journey": 10, "current_wl": 40, "is_weekend": 0, "is_holiday": 0}
+        -> {"probability": 0.83, "factors": [...]}
+    {"journey_date": "2026-11-08", "current_wl": 40}
+        -> days_to_journey and the calendar flags are derived from the date
+    {"records": [{...}, {...}]}
+        -> {"results": [{"probability": ..., "factors": [...]}, ...]}
+    {"op": "ping"}
+        -> {"ok": true}
+Add "factors": false to skip the factor breakdown. Bad requests get
+{"error": "..."} and the connection stays open for the next line.
+"""
+import os
+import json
+import signal
+import socket
+import socketserver
+import threading
+from .travel_calendar import add_date_features
+
+DEFAULT_SOCKET = "/tmp/railpredict.sock"
+
+# Keys a record must have, the others default to 0
+REQUIRED_KEYS = ('days_to_journey', 'current_wl')
+
+
+class PredictionHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                response = self.server.answer(json.loads(line))
+            except (ValueError, TypeError) as e:
+                response = {'error': str(e)}
+            self.wfile.write(json.dumps(response).encode() + b'\n')
+            self.wfile.flush()
+
+
+class PredictionServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, predictor):
+        self.predictor = predictor
+        self.socket_path = socket_path
+        self.requests_served = 0
+        self.lock = threading.Lock()
+        remove_stale_socket(socket_path)
+        super().__init__(socket_path, PredictionHandler)
+        # Only this user (and group) may query the daemon
+        os.chmod(socket_path, 0o660)
+
+    def answer(self, request):
+        if not isinstance(request, dict):
+            raise ValueError("request must be a JSON object")
+        self.predictor.reload_if_changed()
+        if request.get('op') == 'ping':
+            return {'ok': True, 'served': self.requests_served, 'model_version': self.predictor.version}
+
+        batch = 'records' in request
+        records = request['records'] if batch else [request]
+        if not all(isinstance(record, dict) for record in records):
+            raise ValueError("records must be JSON objects")
+        add_date_features(records)
+        for record in records:
+            missing = [k for k in REQUIRED_KEYS if k not in record]
+            if missing:
+                raise ValueError(f"missing {', '.join(missing)}")
+
+        with_factors = request.get('factors', True)
+        probs, factors = self.predictor.predict_batch(records, with_factors=with_factors)
+        results = [{'probability': prob} for prob in probs.tolist()]
+        if with_factors:
+            for result, row_factors in zip(results, factors):
+                result['factors'] = row_factors
+
+        with self.lock:
+            self.requests_served += 1
+        return {'results': results} if batch else results[0]
+
+    def server_close(self):
+        super().server_close()
+        remove_stale_socket(self.socket_path)
+
+
+def remove_stale_socket(socket_path):
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+
+def serve(predictor, socket_path=DEFAULT_SOCKET):
+    """
+    Serves until SIGINT/SIGTERM, then removes the socket file.
+    """
+    server = PredictionServer(socket_path, predictor)
+
+    def stop(signum, frame):
+        # shutdown() blocks until serve_forever returns, so call it elsewhere
+        threading.Thread(target=server.shutdown).start()
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    print(f"Serving predictions on {socket_path}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        print("Prediction daemon stopped.")
+
+
+def query(request, socket_path=DEFAULT_SOCKET, timeout=5):
+    """
+    Sends one request to a running daemon and returns the decoded reply.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(request).encode() + b'\n')
+        reply = sock.makefile('rb').readline()
+    return json.loads(reply)
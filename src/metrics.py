@@ -0,0 +1,195 @@
+"""
+In-process latency histograms and counters, rendered in the Prometheus
+text format by app.py's /metrics. Metrics are per process: under gunicorn
+each worker reports its own, so scrape every worker or sum across them.
+
+    with timed('model_predict'):
+        ...
+
+    @timed('scrape_parse')
+    def parse(...):
+        ...
+"""
+import os
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+# Upper bounds in seconds, from sub-millisecond model calls to slow scrapes
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{n}="{escape_label(v)}"' for n, v in zip(names, values)) + '}'
+
+
+class Counter:
+    def __init__(self, name, help, label_names=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            items = sorted(self.values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{format_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram keyed by label values.
+    """
+
+    def __init__(self, name, help, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self.series.items())
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float('inf'),), counts):
+                cumulative += n
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                names = self.label_names + ('le',)
+                lines.append(f"{self.name}_bucket{format_labels(names, labels + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.label_names, labels)} {total}")
+            lines.append(f"{self.name}_count{format_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        # Callables returning extra exposition lines, for stats kept elsewhere
+        self.collectors = []
+
+    def counter(self, name, help, label_names=()):
+        metric = Counter(name, help, label_names)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, label_names=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help, label_names, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def collector(self, fn):
+        self.collectors.append(fn)
+        return fn
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for fn in self.collectors:
+            lines.extend(fn())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+stage_seconds = registry.histogram(
+    'railpredict_stage_seconds', 'Time spent per hot-path stage', ('stage',))
+request_seconds = registry.histogram(
+    'railpredict_request_seconds', 'HTTP request latency by endpoint', ('endpoint', 'status'))
+http_cache_events = registry.counter(
+    'railpredict_scrape_cache_total', 'erail.in response cache lookups and writes', ('result',))
+http_events = registry.counter(
+    'railpredict_scrape_http_total', 'erail.in requests, retries and failures', ('event',))
+scrape_errors = registry.counter(
+    'railpredict_scrape_errors_total', 'Train page fetches that fell back to placeholder details', ('stage',))
+
+
+@contextmanager
+def timed(stage):
+    """
+    Records the duration of the block (or decorated function) under stage.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_seconds.observe(time.perf_counter() - start, stage)
+
+
+class SlowRequestProfiler:
+    """
+    Opt-in cProfile capture: with RAILPREDICT_PROFILE_SLOW_MS set, every
+    request is profiled and those slower than the threshold are dumped to
+    RAILPREDICT_PROFILE_DIR as .prof files (open with pstats or snakeviz).
+    """
+
+    def __init__(self, threshold_ms=None, out_dir=None):
+        if threshold_ms is None:
+            threshold_ms = os.environ.get('RAILPREDICT_PROFILE_SLOW_MS')
+        self.threshold = float(threshold_ms) / 1000 if threshold_ms else None
+        self.out_dir = out_dir or os.environ.get('RAILPREDICT_PROFILE_DIR', 'profiles')
+        self.dumped = 0
+
+    @property
+    def enabled(self):
+        return self.threshold is not None
+
+    def start(self):
+        """
+        Returns a running profiler, or None if profiling is off or another
+        profiler is already active (only one may run at a time on 3.12+).
+        """
+        if not self.enabled:
+            return None
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return None
+        return profiler
+
+    def finish(self, profiler, seconds, name):
+        if profiler is None:
+            return None
+        profiler.disable()
+        if seconds < self.threshold:
+            return None
+        os.makedirs(self.out_dir, exist_ok=True)
+        safe_name = ''.join(c if c.isalnum() else '_' for c in name).strip('_') or 'request'
+        path = os.path.join(self.out_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self.dumped}-{safe_name}-{seconds * 1000:.0f}ms.prof")
+        profiler.dump_stats(path)
+        self.dumped += 1
+        return path
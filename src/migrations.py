@@ -0,0 +1,206 @@
+from .database import get_db_connection, ensure_schedule_constraints
+from .history import parse_status, STATUS_KIND_CODES
+
+# Rows updated per transaction when backfilling typed columns
+BACKFILL_BATCH = 5000
+
+
+class SchemaError(Exception):
+    pass
+
+
+def column_names(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def add_column(conn, table, column, ddl_type):
+    if column in column_names(conn, table):
+        return False
+    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}")
+    return True
+
+
+def backfill(conn, select_sql, update_sql, convert):
+    """
+    Fills a typed column in BACKFILL_BATCH sized transactions.
+    select_sql takes (last_id, limit) and must return (id, raw...) rows
+    ordered by id; convert maps one such row to the update parameters.
+    Paging by id means unparseable values can't be picked up twice.
+    """
+    total = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(select_sql, (last_id, BACKFILL_BATCH)).fetchall()
+        if not rows:
+            return total
+        with conn:
+            conn.executemany(update_sql, [convert(row) for row in rows])
+        total += len(rows)
+        last_id = rows[-1][0]
+
+
+def migration_train_spec_columns(conn):
+    # Formerly the whole of migrate_db.py
+    for column in ('avg_speed', 'coach_composition', 'image_url'):
+        if add_column(conn, 'trains', column, 'TEXT'):
+            print(f"Added {column} column.")
+
+
+def migration_schedule_unique_stop(conn):
+    ensure_schedule_constraints(conn)
+
+
+def migration_hot_path_indexes(conn):
+    # Latest status of a (train, date, class) and the trajectory ordering
+    # used by history.stream_availability(). current_status rides along so
+    # both are answered from the index alone.
+    conn.execute('''
+    CREATE INDEX IF NOT EXISTS ix_availability_trajectory
+    ON availability (train_number, journey_date, class_code, scrape_date, current_status)
+    ''')
+    # schedules(train_number) lookups are served by the leading column of
+    # ux_schedules_train_station, a separate index would only slow writes
+
+
+def migration_typed_schedule_distance(conn):
+    add_column(conn, 'schedules', 'distance_km', 'INTEGER')
+    filled = backfill(
+        conn,
+        "SELECT id, distance FROM schedules WHERE id > ? AND distance_km IS NULL ORDER BY id LIMIT ?",
+        "UPDATE schedules SET distance_km = ? WHERE id = ?",
+        lambda row: (parse_distance(row[1]), row[0]),
+    )
+    print(f"Backfilled distance_km for {filled} schedule rows.")
+
+
+def migration_typed_availability_status(conn):
+    add_column(conn, 'availability', 'status_kind', 'INTEGER')
+    add_column(conn, 'availability', 'status_position', 'INTEGER')
+    filled = backfill(
+        conn,
+        "SELECT id, current_status FROM availability WHERE id > ? AND status_kind IS NULL ORDER BY id LIMIT ?",
+        "UPDATE availability SET status_kind = ?, status_position = ? WHERE id = ?",
+        lambda row: status_columns(row[1]) + (row[0],),
+    )
+    print(f"Backfilled status_kind/status_position for {filled} availability rows.")
+
+
+def migration_journey_date_index(conn):
+    # archive.compact() selects and deletes whole journey months
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_availability_journey_date ON availability (journey_date, id)")
+
+
+# Applied in order, PRAGMA user_version records the last one applied.
+# Never reorder or edit a shipped entry, append a new one instead.
+MIGRATIONS = [
+    (1, "train spec columns", migration_train_spec_columns),
+    (2, "unique schedule stops", migration_schedule_unique_stop),
+    (3, "hot path indexes", migration_hot_path_indexes),
+    (4, "typed schedule distance", migration_typed_schedule_distance),
+    (5, "typed availability status", migration_typed_availability_status),
+    (6, "journey date index", migration_journey_date_index),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def parse_distance(distance):
+    """
+    "460", "460 km", 460 -> 460; anything else -> None.
+    """
+    if distance is None:
+        return None
+    digits = str(distance).strip().lower().replace('km', '').strip()
+    try:
+        return int(float(digits))
+    except ValueError:
+        return None
+
+
+def status_columns(status):
+    """
+    Returns (status_kind, status_position) for a raw status string.
+    """
+    kind, position = parse_status(status)
+    return STATUS_KIND_CODES[kind], position
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def require_schema(conn, version=None):
+    """
+    Raises SchemaError unless migrations are applied up to version (default
+    the latest). Read paths call this instead of migrate(): schema changes
+    run once, from `main.py setup`, migrate_db.py or server startup, never
+    from a request.
+    """
+    version = LATEST_VERSION if version is None else version
+    current = schema_version(conn)
+    if current < version:
+        raise SchemaError(f"database schema is at version {current}, needs {version}; run `python migrate_db.py`")
+
+
+def migrate_database(db_path=None):
+    """
+    Opens the database, applies pending migrations and closes it.
+    """
+    conn = get_db_connection(db_path)
+    try:
+        return migrate(conn)
+    finally:
+        conn.close()
+
+
+def migrate(conn, target=None):
+    """
+    Applies every migration newer than the database's user_version.
+    Returns the list of versions applied; a no-op costs one PRAGMA read.
+    """
+    target = LATEST_VERSION if target is None else target
+    current = schema_version(conn)
+    applied = []
+    for version, name, migration in MIGRATIONS:
+        if version <= current or version > target:
+            continue
+        print(f"Applying migration {version}: {name}")
+        migration(conn)
+        with conn:
+            conn.execute(f"PRAGMA user_version = {version}")
+        applied.append(version)
+    return applied
+
+
+# Hot lookups and the index each one must use
+HOT_QUERIES = [
+    ("train details", "SELECT * FROM trains WHERE train_number = ?", ('12951',),
+     "sqlite_autoindex_trains_1"),
+    ("train schedule", "SELECT * FROM schedules WHERE train_number = ?", ('12951',),
+     "ux_schedules_train_station"),
+    ("latest availability",
+     "SELECT current_status FROM availability WHERE train_number = ? AND journey_date = ? AND class_code = ? "
+     "ORDER BY scrape_date DESC LIMIT 1", ('12951', '2025-12-01', '3A'),
+     "ix_availability_trajectory"),
+    ("availability trajectories",
+     "SELECT train_number, journey_date, class_code, current_status, scrape_date FROM availability "
+     "WHERE +journey_date > ? AND +journey_date < ? ORDER BY train_number, journey_date, class_code, scrape_date",
+     ('', '9999-12-31'), "ix_availability_trajectory"),
+    ("archive month",
+     "SELECT id FROM availability WHERE journey_date >= ? AND journey_date < ?",
+     ('2025-11-01', '2025-12-01'), "ix_availability_journey_date"),
+]
+
+
+def check_query_plans(conn):
+    """
+    Runs EXPLAIN QUERY PLAN for every hot query.
+    Returns [(name, plan, ok)] where ok means the expected index is used
+    and no temporary sort is needed.
+    """
+    results = []
+    for name, sql, params, index in HOT_QUERIES:
+        plan = " | ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+        ok = index in plan and "TEMP B-TREE" not in plan
+        results.append((name, plan, ok))
+    return results
@@ -1,74 +1,189 @@
 import os
+import time
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report, accuracy_score
-import joblib
-import random
 from datetime import datetime, timedelta
+import json
+from . import synthetic, history
+from .database import get_db_connection
+from .compiled_model import CompiledForest, export_forest, FOREST_DIR, file_sha256
+from .explain import TreeExplainer
+from .prob_grid import ProbabilityGrid, build_grid, GRID_DIR
+from .metrics import timed
+from .registry import ModelRegistry, ModelWatcher
+
+MODEL_PATH = 'wl_prediction_model.pkl'
+
+# Last journey date folded into the model by train_incremental()
+CHECKPOINT_PATH = 'wl_prediction_model.checkpoint.json'
+
+# Feature order must match training
+FEATURE_COLUMNS = ['days_to_journey', 'current_wl', 'is_weekend', 'is_holiday']
+
+# Features a record must carry, the others default to 0
+REQUIRED_FEATURES = ('days_to_journey', 'current_wl')
 
 class WaitlistPredictor:
-    def __init__(self):
-        if os.path.exists('wl_prediction_model.pkl'):
-            self.model = joblib.load('wl_prediction_model.pkl')
+    def __init__(self, use_compiled=True, use_grid=False, registry=None):
+        self.use_compiled = use_compiled
+        self.use_grid = use_grid
+        # The registry's current version is served if there is one, the
+        # files train() writes in the working directory otherwise
+        self.registry = registry or ModelRegistry()
+        self.version = self.registry.current()
+        if self.version is not None:
+            self.model_path, forest_dir, grid_dir = self.registry.paths(self.version)
+        else:
+            self.model_path, forest_dir, grid_dir = MODEL_PATH, FOREST_DIR, GRID_DIR
+        # (model, grid) are swapped together by reload, see predict_batch
+        self.artifacts = self.load_artifacts(self.model_path, forest_dir, grid_dir)
+        if self.version is not None:
+            print(f"Serving model version {self.version}.")
+
+        # (model, TreeExplainer), rebuilt when self.model is replaced
+        self._explainer = (None, None)
+        self.watcher = None
+
+    def load_artifacts(self, model_path, forest_dir, grid_dir):
+        # The compiled forest scores with plain NumPy, so serving never has
+        # to import sklearn. It is only used if it matches the saved pickle.
+        compiled = CompiledForest.load_if_fresh(forest_dir, model_path) if self.use_compiled else None
+        if compiled is not None:
+            model = compiled
+            print("Loaded compiled model.")
+        elif os.path.exists(model_path):
+            import joblib
+            model = joblib.load(model_path)
             print("Loaded saved model.")
         else:
-            self.model = RandomForestClassifier(n_estimators=100, random_state=42)
+            model = self.new_model()
             print("Initialized new model (untrained).")
-        
-    def generate_synthetic_data(self, num_samples=1000):
+
+        # Optional precomputed lookup table, answers in-domain rows without
+        # touching the model (probabilities are stored as float16)
+        grid = ProbabilityGrid.load_if_fresh(grid_dir, model_path) if self.use_grid else None
+        if grid is not None:
+            print("Loaded probability grid.")
+        return model, grid
+
+    @property
+    def model(self):
+        return self.artifacts[0]
+
+    @model.setter
+    def model(self, model):
+        # A new estimator invalidates any grid built for the old one
+        self.artifacts = (model, None)
+
+    @property
+    def grid(self):
+        return self.artifacts[1]
+
+    def watch_registry(self, poll_seconds=None):
+        """
+        Makes reload_if_changed() follow the registry's CURRENT pointer.
+        """
+        def load(version):
+            return self.load_artifacts(*self.registry.paths(version))
+
+        def swap(artifacts, version):
+            self.artifacts = artifacts
+            self.version = version
+            self.model_path = self.registry.paths(version)[0]
+
+        kwargs = {'poll_seconds': poll_seconds} if poll_seconds is not None else {}
+        self.watcher = ModelWatcher(self.registry, load, swap, version=self.version, **kwargs)
+        return self.watcher
+
+    def reload_if_changed(self):
+        """
+        Cheap enough to call per request: starts a background reload when
+        another process has activated a new version.
+        """
+        return self.watcher.check() if self.watcher is not None else False
+
+    @property
+    def explainer(self):
+        """
+        Tree-path attributions for the current model, None while untrained.
+        """
+        return self.explainer_for(self.model)
+
+    def explainer_for(self, model):
+        if self._explainer[0] is not model:
+            if isinstance(model, CompiledForest):
+                forest = model
+            elif hasattr(model, 'estimators_'):
+                forest = CompiledForest.from_model(model)
+            else:
+                return None
+            self._explainer = (model, TreeExplainer(forest))
+        return self._explainer[1]
+
+    @staticmethod
+    def new_model():
+        from sklearn.ensemble import RandomForestClassifier
+        return RandomForestClassifier(n_estimators=100, random_state=42)
+
+    def export(self, metadata=None, activate=True):
+        """
+        Writes the NumPy node arrays and the probability grid for the pickle
+        at MODEL_PATH, then publishes all three as a registry version
+        (made current unless activate is False). Returns the version.
+        """
+        import joblib
+        model = joblib.load(MODEL_PATH)
+        export_forest(model, FOREST_DIR, source_path=MODEL_PATH)
+        build_grid(model, GRID_DIR, source_path=MODEL_PATH)
+
+        metadata = dict(metadata or {})
+        metadata.setdefault('params', {k: v for k, v in model.get_params().items()
+                                       if k in ('n_estimators', 'max_depth', 'min_samples_leaf', 'max_features')})
+        metadata.update(serving_latency(CompiledForest(FOREST_DIR)))
+        version = self.registry.publish(MODEL_PATH, FOREST_DIR, GRID_DIR, metadata)
+        if activate and self.registry.current() != version:
+            self.registry.activate(version, reason='export')
+        return version
+
+    def generate_synthetic_data(self, num_samples=1000, seed=None):
         """
         Generates synthetic historical data for training.
         """
         import pandas as pd # Import locally to avoid runtime dependency
         print(f"Generating {num_samples} synthetic records for training...")
-        
-        data = []
-        for _ in range(num_samples):
-            days_to_journey = random.randint(1, 120)
-            current_wl = random.randint(1, 400)
-            total_seats = 1000 # Assume constant for simplicity
-            is_weekend = random.choice([0, 1])
-            is_holiday = random.choice([0, 1])
-            
-            # Logic to determine if it eventually confirmed (Target)
-            # Probability decreases as WL increases and Days decrease
-            
-            # Base probability
-            prob = 1.0
-            
-            # Penalties
-            prob -= (current_wl / 200) # Higher WL -> Lower prob
-            prob += (days_to_journey / 100) # More time -> Higher prob
-            
-            if is_weekend: prob -= 0.1
-            if is_holiday: prob -= 0.2
-            
-            # Clamp
-            prob = max(0, min(1, prob))
-            
-            is_confirmed = 1 if random.random() < prob else 0
-            
-            data.append({
-                'days_to_journey': days_to_journey,
-                'current_wl': current_wl,
-                'is_weekend': is_weekend,
-                'is_holiday': is_holiday,
-                'is_confirmed': is_confirmed
-            })
-            
-        return pd.DataFrame(data)
 
-    def train(self):
-        df = self.generate_synthetic_data()
-        
-        X = df[['days_to_journey', 'current_wl', 'is_weekend', 'is_holiday']]
-        y = df['is_confirmed']
-        
+        X, y = synthetic.generate_arrays(num_samples, np.random.default_rng(seed))
+        df = pd.DataFrame(X, columns=FEATURE_COLUMNS)
+        df['is_confirmed'] = y
+        return df
+
+    def train(self, num_samples=1000, seed=None, data_dir=None):
+        """
+        Fits on synthetic data: either num_samples fresh rows, or a dataset
+        previously spilled to data_dir by synthetic.spill_to_disk().
+        """
+        # Training-only imports, kept out of module import so serving workers
+        # start without them
+        import joblib
+        from sklearn.model_selection import train_test_split
+        from sklearn.metrics import classification_report, accuracy_score
+
+        if data_dir:
+            X, y = synthetic.load_spilled(data_dir)
+            print(f"Loaded {len(y)} synthetic records from {data_dir}")
+        else:
+            print(f"Generating {num_samples} synthetic records for training...")
+            X, y = synthetic.generate_arrays(num_samples, np.random.default_rng(seed))
+
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
         
+        if isinstance(self.model, CompiledForest):
+            # Compiled forests are read-only, fit a fresh estimator
+            self.model = self.new_model()
+
         print("Training Random Forest Model...")
+        started = time.perf_counter()
         self.model.fit(X_train, y_train)
+        train_seconds = time.perf_counter() - started
         
         predictions = self.model.predict(X_test)
         accuracy = accuracy_score(y_test, predictions)
@@ -78,134 +193,350 @@ class WaitlistPredictor:
         print(classification_report(y_test, predictions))
         
         # Save model
-        joblib.dump(self.model, 'wl_prediction_model.pkl')
-        print("Model saved to wl_prediction_model.pkl")
+        save_model(self.model, MODEL_PATH)
+        print(f"Model saved to {MODEL_PATH}")
 
-    def predict(self, days_to_journey, current_wl, is_weekend=0, is_holiday=0):
-        # Use list of lists for prediction to avoid pandas dependency
-        # Feature order must match training: ['days_to_journey', 'current_wl', 'is_weekend', 'is_holiday']
-        features = [[days_to_journey, current_wl, is_weekend, is_holiday]]
-        
-        prob = self.model.predict_proba(features)[0][1]
-        
-        # Generate structured factors
-        factors = []
-        
-        # 1. Waitlist Factor
-        wl_impact = "Neutral"
-        wl_color = "gray"
-        if current_wl > 100:
-            wl_impact = "High Negative"
-            wl_color = "red"
-        elif current_wl > 50:
-            wl_impact = "Negative"
-            wl_color = "orange"
-        elif current_wl < 20:
-            wl_impact = "Positive"
-            wl_color = "green"
-            
-        factors.append({
-            "name": "Current Waitlist",
-            "value": str(current_wl),
-            "impact": wl_impact,
-            "color": wl_color
+        # Keep the compiled copy and the grid in sync with the pickle
+        self.export({
+            'trained_at': datetime.now().isoformat(timespec='seconds'),
+            'source': data_dir or 'synthetic',
+            'rows': int(len(y)),
+            'accuracy': float(accuracy),
+            'train_seconds': round(train_seconds, 3),
         })
-        
-        # 2. Time Factor
-        time_impact = "Neutral"
-        time_color = "gray"
-        if days_to_journey < 3:
-            time_impact = "High Negative"
-            time_color = "red"
-        elif days_to_journey < 10:
-            time_impact = "Negative"
-            time_color = "orange"
-        elif days_to_journey > 30:
-            time_impact = "Positive"
-            time_color = "green"
-            
-        factors.append({
-            "name": "Days to Journey",
-            "value": f"{days_to_journey} Days",
-            "impact": time_impact,
-            "color": time_color
+
+    def train_incremental(self, db_path=None, chunk_size=5000, block_size=50000, trees_per_block=10):
+        """
+        Adds trees fitted on real availability history the model hasn't seen.
+        Completed trajectories newer than the checkpoint are streamed from
+        SQLite, and every block_size labelled rows warm-start trees_per_block
+        extra trees, so a run costs time proportional to the new data only.
+        """
+        import joblib
+        model = self.model
+        if isinstance(model, CompiledForest):
+            model = joblib.load(self.model_path)
+        if not hasattr(model, 'estimators_'):
+            print("Model is untrained, run train() first.")
+            return None
+
+        checkpoint = load_checkpoint(self.model_path)
+        after = checkpoint.get('last_journey_date')
+        print(f"Streaming availability history after {after or 'the beginning'}...")
+
+        model.set_params(warm_start=True)
+        conn = get_db_connection(db_path)
+        features, labels, journey_dates = [], [], []
+        # Newest journey date among the rows actually fitted
+        last_journey_date = after
+        rows_used = 0
+        trees_added = 0
+
+        def fit_block():
+            nonlocal trees_added, rows_used, last_journey_date
+            model.set_params(n_estimators=len(model.estimators_) + trees_per_block)
+            model.fit(np.asarray(features), np.asarray(labels))
+            trees_added += trees_per_block
+            rows_used += len(labels)
+            last_journey_date = max([last_journey_date or ''] + journey_dates)
+            features.clear()
+            labels.clear()
+            journey_dates.clear()
+
+        for row, label, journey_date in history.iter_examples(conn, after, chunk_size=chunk_size):
+            features.append(row)
+            labels.append(label)
+            journey_dates.append(journey_date)
+            # A block with a single class would change classes_, keep growing it
+            if len(labels) >= block_size and len(set(labels)) > 1:
+                fit_block()
+        conn.close()
+
+        if len(set(labels)) > 1:
+            fit_block()
+        elif labels:
+            print(f"Skipping {len(labels)} trailing rows with a single label.")
+            # History streams by train, not date, so the skipped rows can be
+            # older than fitted ones; stop the checkpoint short of all of
+            # them (some fitted rows get fitted again next run)
+            first_skipped = datetime.strptime(min(journey_dates), '%Y-%m-%d') - timedelta(days=1)
+            if last_journey_date is not None:
+                last_journey_date = min(last_journey_date, first_skipped.strftime('%Y-%m-%d'))
+
+        model.set_params(warm_start=False)
+        if trees_added == 0:
+            print("No new labelled history to train on.")
+            return None
+
+        self.model = model
+        save_model(self.model, MODEL_PATH)
+        print(f"Added {trees_added} trees from {rows_used} rows, model saved to {MODEL_PATH}")
+        self.export({
+            'trained_at': datetime.now().isoformat(timespec='seconds'),
+            'source': 'history',
+            'rows': rows_used,
+            'trees_added': trees_added,
+            'base_version': self.version,
         })
-        
+
+        save_checkpoint({
+            'last_journey_date': last_journey_date,
+            # The registry copy of this pickle has the same checksum
+            'model_sha256': file_sha256(MODEL_PATH),
+            'rows': checkpoint.get('rows', 0) + rows_used,
+            'trees_added': checkpoint.get('trees_added', 0) + trees_added,
+        })
+        return rows_used
+
+    def predict(self, days_to_journey, current_wl, is_weekend=0, is_holiday=0):
+        # Single-row prediction is just a batch of one, so both paths share
+        # the same thresholds and always agree.
+        probs, factors = self.predict_batch([days_to_journey], [current_wl], [is_weekend], [is_holiday])
+        return probs[0], factors[0]
+
+    def explain_batch(self, days_to_journey, current_wl=None, is_weekend=0, is_holiday=0):
+        """
+        Returns (bias, contributions) where contributions[i, j] is how much
+        FEATURE_COLUMNS[j] moved row i's probability away from bias.
+        """
+        explainer = self.explainer
+        if explainer is None:
+            raise ValueError("model is untrained, nothing to explain")
+        features = build_feature_matrix(days_to_journey, current_wl, is_weekend, is_holiday)
+        return explainer.bias, explainer.contributions(features)
+
+    @timed('model_predict')
+    def predict_batch(self, days_to_journey, current_wl=None, is_weekend=0, is_holiday=0, with_factors=True):
+        """
+        Scores many rows with a single predict_proba call.
+        Accepts parallel arrays (scalars are broadcast) or a list of records
+        with the same keys as the training columns.
+        Returns (probabilities, factors) where factors[i] matches predict(),
+        factors is None if with_factors is False. Factors for the model's
+        inputs carry the forest's own attribution as 'contribution'.
+        """
+        features = build_feature_matrix(days_to_journey, current_wl, is_weekend, is_holiday)
+        if len(features) == 0:
+            return np.empty(0), [] if with_factors else None
+
+        # One read, so a concurrent reload can't pair a model with another
+        # version's grid
+        model, grid = self.artifacts
+        explainer = self.explainer_for(model) if with_factors else None
+        # Attributions need every row's leaves; the compiled forest scores
+        # from the same ones instead of walking the trees twice
+        leaves = explainer.forest.apply(features) if explainer is not None else None
+
+        def model_proba(rows):
+            if leaves is not None and explainer.forest is model:
+                return model.proba_from_leaves(leaves[:, rows])[:, 1]
+            return model.predict_proba(features[rows])[:, 1]
+
+        if grid is not None:
+            probs, in_grid = grid.lookup(features)
+            if not in_grid.all():
+                probs[~in_grid] = model_proba(~in_grid)
+        else:
+            probs = model_proba(slice(None))
+        if not with_factors:
+            return probs, None
+        with timed('model_explain'):
+            contributions = explainer.from_leaves(leaves) if explainer is not None else None
+        return probs, build_factors(features, contributions)
+
+
+def save_model(model, path):
+    """
+    Pickles to a temp file and renames it over path, so a reader never
+    sees a half-written model.
+    """
+    import joblib
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    joblib.dump(model, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def serving_latency(forest, repeats=50, batch_repeats=7):
+    """
+    Median single-row and best-of-batch_repeats 1k-row predict_proba
+    times of a compiled forest, in ms.
+    """
+    rng = np.random.default_rng(0)
+    batch = np.column_stack([rng.integers(0, 120, 1000), rng.integers(1, 400, 1000),
+                             rng.integers(0, 2, 1000), rng.integers(0, 2, 1000)])
+    row_times, batch_times = [], []
+    for i in range(repeats):
+        start = time.perf_counter()
+        forest.predict_proba(batch[i:i + 1])
+        row_times.append(time.perf_counter() - start)
+    for _ in range(batch_repeats):
+        start = time.perf_counter()
+        forest.predict_proba(batch)
+        batch_times.append(time.perf_counter() - start)
+    # The fastest batch run is the least disturbed by scheduling noise
+    return {'predict_row_ms': round(float(np.median(row_times)) * 1000, 4),
+            'predict_1k_ms': round(min(batch_times) * 1000, 4)}
+
+
+def load_checkpoint(model_path=MODEL_PATH):
+    """
+    Returns the incremental training checkpoint, or an empty one if it is
+    missing or wasn't written for the pickle at model_path (e.g. after a
+    registry rollback to an older version).
+    """
+    if not os.path.exists(CHECKPOINT_PATH) or not os.path.exists(model_path):
+        return {}
+    with open(CHECKPOINT_PATH) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get('model_sha256') != file_sha256(model_path):
+        print("Training checkpoint belongs to another model, starting from scratch.")
+        return {}
+    return checkpoint
+
+
+def save_checkpoint(checkpoint):
+    with open(CHECKPOINT_PATH, 'w') as f:
+        json.dump(checkpoint, f, indent=2)
+
+
+def build_feature_matrix(days_to_journey, current_wl=None, is_weekend=0, is_holiday=0):
+    """
+    Returns an (n, 4) feature matrix in training column order: int64, or
+    float64 if any value is fractional (10.5 is scored as is, never
+    truncated). Raises ValueError for a record without days_to_journey or
+    current_wl, or for a value that isn't a finite number.
+    """
+    if current_wl is None:
+        # List of records, e.g. [{'days_to_journey': 10, 'current_wl': 40}, ...]
+        records = list(days_to_journey)
+        for i, record in enumerate(records):
+            missing = [name for name in REQUIRED_FEATURES if record.get(name) in (None, '')]
+            if missing:
+                raise ValueError(f"Record {i}: missing {', '.join(missing)}")
+        columns = [[r[name] if r.get(name) not in (None, '') else 0 for r in records] for name in FEATURE_COLUMNS]
+        days_to_journey, current_wl, is_weekend, is_holiday = columns
+
+    days = np.atleast_1d(np.asarray(days_to_journey))
+    n = len(days)
+    columns = [days] + [np.broadcast_to(np.atleast_1d(np.asarray(c)), (n,)) for c in (current_wl, is_weekend, is_holiday)]
+    matrix = np.column_stack(columns)
+    if matrix.dtype.kind in 'biu':
+        return matrix.astype(np.int64)
+    # Floats and numeric strings; whole numbers still come back as int64
+    try:
+        values = matrix.astype(np.float64)
+    except (TypeError, ValueError):
+        raise ValueError("features must be numbers")
+    if not np.isfinite(values).all():
+        raise ValueError("features must be finite numbers")
+    if (values == np.round(values)).all():
+        return values.astype(np.int64)
+    return values
+
+
+def feature_number(value):
+    """
+    int(value) for ints, integral floats and numeric strings, float(value)
+    for other finite numbers; ValueError for anything else.
+    """
+    number = float(value)
+    if not np.isfinite(number):
+        raise ValueError(f"{value!r} is not a finite number")
+    return int(number) if number.is_integer() else number
+
+
+def plain_numbers(values):
+    # Whole values print as ints even in a float matrix, so one fractional
+    # row doesn't turn every other "40" into "40.0"
+    return [int(v) if float(v).is_integer() else v for v in values.tolist()]
+
+
+# (impact, color) levels indexed by the np.select result in build_factors.
+# Conditions are checked in order, first match wins, last entry is the default.
+WL_LEVELS = [("High Negative", "red"), ("Negative", "orange"), ("Positive", "green"), ("Neutral", "gray")]
+TIME_LEVELS = [("High Negative", "red"), ("Negative", "orange"), ("Positive", "green"), ("Neutral", "gray")]
+CNF_LEVELS = [("Impossible", "red"), ("Hard", "orange"), ("Low Difficulty", "green")]
+RAC_LEVELS = [("Hard", "red"), ("Moderate", "orange"), ("Low Difficulty", "green")]
+
+# Assumptions for cancellation estimation
+ASSUMED_TOTAL_SEATS = 1000
+ASSUMED_RAC_SEATS = 100
+
+
+def build_factors(features, contributions=None):
+    """
+    Builds the structured factor list for each row of a feature matrix.
+    Impact levels are picked with vectorized thresholding, only the final
+    dict assembly runs per row. With contributions (see explain.py) the
+    factor of each model input also gets its attribution in percentage
+    points of probability.
+    """
+    days, wl, weekend, holiday = features.T
+
+    # 1. Waitlist Factor
+    wl_level = np.select([wl > 100, wl > 50, wl < 20], [0, 1, 2], default=3)
+
+    # 2. Time Factor
+    time_level = np.select([days < 3, days < 10, days > 30], [0, 1, 2], default=3)
+
+    # 4. Cancellation Analysis
+    needed_cnf = wl
+    pct_cnf = (needed_cnf / ASSUMED_TOTAL_SEATS) * 100
+    cnf_level = np.select([pct_cnf > 15, pct_cnf > 5], [0, 1], default=2)
+
+    needed_rac = np.maximum(0, wl - ASSUMED_RAC_SEATS)
+    pct_rac = (needed_rac / ASSUMED_TOTAL_SEATS) * 100
+    rac_level = np.select([pct_rac > 10, pct_rac > 3], [0, 1], default=2)
+
+    rows = zip(plain_numbers(days), plain_numbers(wl), weekend.tolist(), holiday.tolist(),
+               wl_level.tolist(), time_level.tolist(), cnf_level.tolist(),
+               plain_numbers(needed_rac), pct_cnf.tolist(), pct_rac.tolist(), rac_level.tolist())
+
+    points = np.round(contributions * 100, 1).tolist() if contributions is not None else None
+
+    all_factors = []
+    for i, (d, w, wkd, hol, wl_i, time_i, cnf_i, n_rac, p_cnf, p_rac, rac_i) in enumerate(rows):
+        factors = [
+            {"name": "Current Waitlist", "value": str(w), "impact": WL_LEVELS[wl_i][0], "color": WL_LEVELS[wl_i][1]},
+            {"name": "Days to Journey", "value": f"{d} Days", "impact": TIME_LEVELS[time_i][0], "color": TIME_LEVELS[time_i][1]},
+        ]
+
         # 3. Timing Factor (Weekend/Holiday)
-        if is_weekend:
-            factors.append({
-                "name": "Travel Day",
-                "value": "Weekend",
-                "impact": "Negative",
-                "color": "orange"
-            })
+        if wkd:
+            factors.append({"name": "Travel Day", "value": "Weekend", "impact": "Negative", "color": "orange"})
         else:
-            factors.append({
-                "name": "Travel Day",
-                "value": "Weekday",
-                "impact": "Positive",
-                "color": "green"
-            })
-            
-        if is_holiday:
-            factors.append({
-                "name": "Season",
-                "value": "Holiday",
-                "impact": "High Negative",
-                "color": "red"
-            })
-            
-        # 4. Cancellation Analysis (New)
-        # Assumptions for estimation
-        assumed_total_seats = 1000
-        assumed_rac_seats = 100
-        
-        # For CNF
-        needed_cnf = current_wl
-        pct_cnf = (needed_cnf / assumed_total_seats) * 100
-        
-        cnf_impact = "Low Difficulty"
-        cnf_color = "green"
-        if pct_cnf > 15:
-            cnf_impact = "Impossible"
-            cnf_color = "red"
-        elif pct_cnf > 5:
-            cnf_impact = "Hard"
-            cnf_color = "orange"
-            
+            factors.append({"name": "Travel Day", "value": "Weekday", "impact": "Positive", "color": "green"})
+
+        if hol:
+            factors.append({"name": "Season", "value": "Holiday", "impact": "High Negative", "color": "red"})
+
+        if points is not None:
+            # Waitlist, days, travel day, season -> FEATURE_COLUMNS index
+            for factor, column in zip(factors, (1, 0, 2, 3)):
+                factor["contribution"] = points[i][column]
+
         factors.append({
             "name": "Cancellations for CNF",
-            "value": f"{needed_cnf} ({pct_cnf:.1f}% of train)",
-            "impact": cnf_impact,
-            "color": cnf_color
+            "value": f"{w} ({p_cnf:.1f}% of train)",
+            "impact": CNF_LEVELS[cnf_i][0],
+            "color": CNF_LEVELS[cnf_i][1]
         })
-        
-        # For RAC
-        needed_rac = max(0, current_wl - assumed_rac_seats)
-        if needed_rac > 0:
-            pct_rac = (needed_rac / assumed_total_seats) * 100
-            
-            rac_impact = "Low Difficulty"
-            rac_color = "green"
-            if pct_rac > 10:
-                rac_impact = "Hard"
-                rac_color = "red"
-            elif pct_rac > 3:
-                rac_impact = "Moderate"
-                rac_color = "orange"
-                
+
+        if n_rac > 0:
             factors.append({
                 "name": "Cancellations for RAC",
-                "value": f"{needed_rac} ({pct_rac:.1f}% of train)",
-                "impact": rac_impact,
-                "color": rac_color
+                "value": f"{n_rac} ({p_rac:.1f}% of train)",
+                "impact": RAC_LEVELS[rac_i][0],
+                "color": RAC_LEVELS[rac_i][1]
             })
         else:
-             factors.append({
+            factors.append({
                 "name": "Cancellations for RAC",
                 "value": "0 (Already in RAC range)",
                 "impact": "Guaranteed",
                 "color": "green"
             })
-            
-        return prob, factors
+
+        all_factors.append(factors)
+
+    return all_factors
@@ -0,0 +1,138 @@
+from html.parser import HTMLParser
+
+# Parser used by extract_train_details() unless told otherwise
+DEFAULT_PARSER = 'fast'
+
+
+class StopParsing(Exception):
+    pass
+
+
+class MalformedDescription(Exception):
+    """
+    The page's first description meta tag has no content, or is a route
+    description without its " from ... to ..." part. The original scraper
+    failed with an exception on these, unlike on pages with no description
+    or a non-route one.
+    """
+
+
+class HeadMetaParser(HTMLParser):
+    """
+    Streaming parser that records <meta name=... content=...> tags and
+    stops at the end of <head>, never building a tree.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.meta = {}
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'meta':
+            attrs = dict(attrs)
+            name = attrs.get('name')
+            # Names are matched case-sensitively and the first tag wins, as
+            # with soup.find(); a tag without content is kept as None
+            if name:
+                self.meta.setdefault(name, (attrs['content'] or '') if 'content' in attrs else None)
+        elif tag == 'body':
+            raise StopParsing()
+
+    handle_startendtag = handle_starttag
+
+    def handle_endtag(self, tag):
+        if tag == 'head':
+            raise StopParsing()
+
+
+def meta_description_fast(content):
+    """
+    Reads the description meta tag from the document head only.
+    Returns None if the head has none, raises MalformedDescription if it
+    has no content.
+    """
+    if isinstance(content, bytes):
+        # Only the head matters, skip decoding the (much larger) body
+        end = content.find(b'</head>')
+        if end == -1:
+            end = content.find(b'</HEAD>')
+        if end != -1:
+            content = content[:end + len(b'</head>')]
+        content = content.decode('utf-8', errors='replace')
+
+    parser = HeadMetaParser()
+    try:
+        parser.feed(content)
+        parser.close()
+    except StopParsing:
+        pass
+    if 'description' not in parser.meta:
+        return None
+    if parser.meta['description'] is None:
+        raise MalformedDescription("description meta tag has no content")
+    return parser.meta['description']
+
+
+def meta_description_soup(content):
+    """
+    Full BeautifulSoup parse, finds the description anywhere in the page.
+    """
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(content, 'html.parser')
+    desc_tag = soup.find('meta', attrs={'name': 'description'})
+    if desc_tag is None:
+        return None
+    if not desc_tag.has_attr('content'):
+        raise MalformedDescription("description meta tag has no content")
+    return desc_tag['content']
+
+
+PARSERS = {
+    'fast': meta_description_fast,
+    'soup': meta_description_soup,
+}
+
+
+def parse_route_description(desc, train_number):
+    """
+    "Route details of 12951 NDLS TEJAS RAJ from Mumbai Central to New Delhi"
+    -> ("NDLS TEJAS RAJ", "Mumbai Central", "New Delhi"), None if the
+    description is in another format, MalformedDescription if it is a
+    route description missing the route.
+    """
+    if not desc or "Route details of" not in desc:
+        return None
+    parts = desc.split(" from ")
+    if len(parts) < 2 or " to " not in parts[1]:
+        raise MalformedDescription(f"no route in {desc!r}")
+    left_part = parts[0].replace("Route details of ", "").strip()
+    # left_part is "12951 NDLS TEJAS RAJ"
+
+    train_name = left_part.replace(str(train_number), "").strip()
+
+    right_part = parts[1] # "Mumbai Central to New Delhi"
+    route_parts = right_part.split(" to ")
+    src = route_parts[0].strip()
+    dest = route_parts[1].strip()
+    return train_name, src, dest
+
+
+def extract_train_details(content, train_number, parser=DEFAULT_PARSER):
+    """
+    Returns (train_name, source, destination) from an erail.in page, or
+    None. The fast path is tried first; if the head has no description
+    (or it chokes on the markup) the full soup parse gets a go.
+    Raises MalformedDescription for an unusable description tag.
+    """
+    chain = [parser] if parser == 'soup' else [parser, 'soup']
+    for name in chain:
+        try:
+            desc = PARSERS[name](content)
+        except (StopParsing, ValueError, IndexError, AssertionError):
+            continue
+        details = parse_route_description(desc, train_number)
+        # A description that isn't a route, e.g. "Train not found", is the
+        # same first tag the soup parse would find, so stop here
+        if details is not None or desc is not None:
+            return details
+    return None
@@ -0,0 +1,97 @@
+import os
+import json
+import hashlib
+import numpy as np
+from .compiled_model import file_sha256
+
+# Probability of every in-domain feature combination, rebuilt by export()
+GRID_DIR = "wl_prediction_grid"
+
+# Feature domain covered by the grid (inclusive). Anything outside is scored
+# by the live model.
+MAX_DAYS = 120
+MAX_WL = 400
+
+GRID_DTYPE = np.float16
+
+
+def grid_features():
+    """
+    Returns every grid cell as a feature row, in the grid's C order:
+    [is_weekend, is_holiday, days_to_journey, current_wl].
+    """
+    weekend, holiday, days, wl = np.meshgrid(
+        np.arange(2), np.arange(2), np.arange(MAX_DAYS + 1), np.arange(MAX_WL + 1), indexing='ij')
+    return np.column_stack([days.ravel(), wl.ravel(), weekend.ravel(), holiday.ravel()])
+
+
+def build_grid(model, out_dir=GRID_DIR, source_path=None):
+    """
+    Scores the whole feature domain once and stores it as float16.
+    The checksum of the array and of the source pickle go into meta.json,
+    so a grid from an older model is never served.
+    """
+    features = grid_features()
+    exact = model.predict_proba(features)[:, 1]
+    grid = exact.astype(GRID_DTYPE).reshape(2, 2, MAX_DAYS + 1, MAX_WL + 1)
+
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, 'grid.npy'), grid)
+
+    meta = {
+        'shape': list(grid.shape),
+        'dtype': np.dtype(GRID_DTYPE).name,
+        'max_abs_error': float(np.abs(grid.ravel().astype(np.float64) - exact).max()),
+        'grid_sha256': hashlib.sha256(grid.tobytes()).hexdigest(),
+        'source_sha256': file_sha256(source_path) if source_path else None,
+    }
+    with open(os.path.join(out_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    print(f"Built probability grid {tuple(grid.shape)} in {out_dir} (max error {meta['max_abs_error']:.5f})")
+    return meta
+
+
+class ProbabilityGrid:
+    """
+    O(1) probability lookup for in-domain features.
+    """
+
+    def __init__(self, grid_dir=GRID_DIR, mmap_mode='r'):
+        with open(os.path.join(grid_dir, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.grid = np.load(os.path.join(grid_dir, 'grid.npy'), mmap_mode=mmap_mode)
+
+    @classmethod
+    def load_if_fresh(cls, grid_dir=GRID_DIR, source_path=None):
+        """
+        Returns the grid, or None if it is missing, corrupt, or was built
+        from a different pickle than the one at source_path.
+        """
+        if not os.path.exists(os.path.join(grid_dir, 'meta.json')):
+            return None
+        grid = cls(grid_dir)
+        if hashlib.sha256(np.ascontiguousarray(grid.grid).tobytes()).hexdigest() != grid.meta['grid_sha256']:
+            print(f"Probability grid in {grid_dir} failed its checksum, ignoring it.")
+            return None
+        if source_path and os.path.exists(source_path):
+            if grid.meta.get('source_sha256') != file_sha256(source_path):
+                print(f"Probability grid in {grid_dir} is stale, ignoring it.")
+                return None
+        return grid
+
+    def lookup(self, features):
+        """
+        Returns (probabilities, in_grid) for an (n, 4) feature matrix.
+        Rows where in_grid is False are left as NaN for the caller to fill;
+        the grid only holds whole-number inputs, so fractional rows are too.
+        """
+        features = np.asarray(features)
+        whole = (features == np.round(features)).all(axis=1)
+        days, wl, weekend, holiday = features.astype(np.int64).T
+        in_grid = whole & ((days >= 0) & (days <= MAX_DAYS) & (wl >= 0) & (wl <= MAX_WL)
+                   & ((weekend == 0) | (weekend == 1)) & ((holiday == 0) | (holiday == 1)))
+
+        probs = np.full(len(days), np.nan)
+        probs[in_grid] = self.grid[weekend[in_grid], holiday[in_grid], days[in_grid], wl[in_grid]]
+        return probs, in_grid
@@ -0,0 +1,59 @@
+import os
+
+# smaps_rollup fields reported by memory_mb(), in kB
+SMAPS_FIELDS = {
+    'Rss': 'rss',
+    'Pss': 'pss',
+    'Shared_Clean': 'shared',
+    'Shared_Dirty': 'shared',
+    'Private_Clean': 'private',
+    'Private_Dirty': 'private',
+}
+
+
+def memory_mb(pid=None):
+    """
+    Returns {'rss', 'pss', 'shared', 'private'} in MB for a process. PSS
+    splits shared pages between the processes mapping them, so summing it
+    over gunicorn's master and workers gives their real footprint.
+    Empty on platforms without /proc/<pid>/smaps_rollup (Linux 4.14+).
+    """
+    path = f"/proc/{pid or os.getpid()}/smaps_rollup"
+    totals = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                parts = line.split()
+                key = SMAPS_FIELDS.get(parts[0].rstrip(':'))
+                if key:
+                    totals[key] = totals.get(key, 0) + int(parts[1]) / 1024
+    except OSError:
+        return {}
+    return {k: round(v, 1) for k, v in totals.items()}
+
+
+def child_pids(pid):
+    """
+    Direct children of pid, found by scanning /proc.
+    """
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name is parenthesised and may contain spaces
+        fields = stat.rsplit(')', 1)[1].split()
+        if int(fields[1]) == pid:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def format_memory(pid=None):
+    mem = memory_mb(pid)
+    if not mem:
+        return "memory n/a"
+    return ", ".join(f"{k} {mem[k]:.1f} MB" for k in ('rss', 'pss', 'private') if k in mem)
@@ -0,0 +1,259 @@
+"""
+Versioned model registry. Every export() publishes the pickle, its
+compiled forest and probability grid as an immutable version:
+
+    model_registry/
+        CURRENT                          name of the served version
+        history.jsonl                    one line per activation
+        versions/0003-20261018T101500/
+            model.pkl  forest/  grid/
+            meta.json                    sha256 of every file, training and latency stats
+
+A version is assembled in a temp directory and renamed into place, and
+CURRENT is replaced with os.replace(), so readers only ever see complete
+versions and a whole pointer. Serving processes stat CURRENT to notice a
+new version (see ModelWatcher) and load it without restarting.
+"""
+import os
+import json
+import time
+import shutil
+import tempfile
+import threading
+from .compiled_model import file_sha256
+
+# RAILPREDICT_REGISTRY points serving and training at another registry
+REGISTRY_DIR = os.environ.get("RAILPREDICT_REGISTRY", "model_registry")
+
+MODEL_FILE = 'model.pkl'
+FOREST_SUBDIR = 'forest'
+GRID_SUBDIR = 'grid'
+
+# Serving processes stat CURRENT at most this often
+DEFAULT_POLL_SECONDS = 2.0
+
+
+class RegistryError(Exception):
+    pass
+
+
+class ModelRegistry:
+    def __init__(self, registry_dir=None):
+        self.registry_dir = registry_dir or REGISTRY_DIR
+        self.versions_dir = os.path.join(self.registry_dir, 'versions')
+        self.current_path = os.path.join(self.registry_dir, 'CURRENT')
+        self.history_path = os.path.join(self.registry_dir, 'history.jsonl')
+
+    def version_dir(self, version):
+        return os.path.join(self.versions_dir, version)
+
+    def paths(self, version):
+        """
+        (pickle path, forest dir, grid dir) of a version.
+        """
+        path = self.version_dir(version)
+        return (os.path.join(path, MODEL_FILE), os.path.join(path, FOREST_SUBDIR),
+                os.path.join(path, GRID_SUBDIR))
+
+    def versions(self):
+        if not os.path.isdir(self.versions_dir):
+            return []
+        # Dot-prefixed directories are versions still being assembled
+        return sorted(name for name in os.listdir(self.versions_dir) if not name.startswith('.')
+                      and os.path.exists(os.path.join(self.versions_dir, name, 'meta.json')))
+
+    def meta(self, version):
+        with open(os.path.join(self.version_dir(version), 'meta.json')) as f:
+            return json.load(f)
+
+    def current(self):
+        """
+        Name of the active version, None if nothing has been activated.
+        """
+        try:
+            with open(self.current_path) as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return version or None
+
+    def find(self, model_sha256):
+        for version in self.versions():
+            if self.meta(version)['files'].get(MODEL_FILE) == model_sha256:
+                return version
+        return None
+
+    def publish(self, model_path, forest_dir, grid_dir=None, metadata=None):
+        """
+        Copies the artifacts into a new immutable version and returns its
+        name. Publishing a pickle that is already registered returns the
+        existing version instead.
+        """
+        model_sha256 = file_sha256(model_path)
+        existing = self.find(model_sha256)
+        if existing:
+            return existing
+
+        os.makedirs(self.versions_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix='.publish-', dir=self.versions_dir)
+        # mkdtemp makes it owner-only, serving users may differ
+        os.chmod(tmp_dir, 0o755)
+        try:
+            shutil.copyfile(model_path, os.path.join(tmp_dir, MODEL_FILE))
+            shutil.copytree(forest_dir, os.path.join(tmp_dir, FOREST_SUBDIR))
+            if grid_dir and os.path.isdir(grid_dir):
+                shutil.copytree(grid_dir, os.path.join(tmp_dir, GRID_SUBDIR))
+
+            files = {}
+            for root, _, names in os.walk(tmp_dir):
+                for name in names:
+                    path = os.path.join(root, name)
+                    files[os.path.relpath(path, tmp_dir)] = file_sha256(path)
+            meta = dict(metadata or {}, files=files, published_at=time.strftime('%Y-%m-%dT%H:%M:%S'))
+
+            versions = self.versions()
+            number = int(versions[-1].split('-')[0]) + 1 if versions else 1
+            version = f"{number:04d}-{time.strftime('%Y%m%dT%H%M%S')}"
+            meta['version'] = version
+            with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+                json.dump(meta, f, indent=2)
+            # Published versions are never written again
+            for root, _, names in os.walk(tmp_dir):
+                for name in names:
+                    os.chmod(os.path.join(root, name), 0o444)
+            os.rename(tmp_dir, self.version_dir(version))
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        print(f"Published model version {version} to {self.registry_dir}")
+        return version
+
+    def verify(self, version):
+        """
+        Returns the files of a version whose checksum no longer matches.
+        """
+        path = self.version_dir(version)
+        bad = []
+        for name, sha256 in self.meta(version)['files'].items():
+            file_path = os.path.join(path, name)
+            if not os.path.exists(file_path) or file_sha256(file_path) != sha256:
+                bad.append(name)
+        return bad
+
+    def activate(self, version, reason='activate'):
+        """
+        Points CURRENT at a verified version.
+        """
+        if version not in self.versions():
+            raise RegistryError(f"unknown model version {version}")
+        bad = self.verify(version)
+        if bad:
+            raise RegistryError(f"version {version} failed its checksum: {', '.join(bad)}")
+        previous = self.current()
+
+        tmp_path = f"{self.current_path}.tmp-{os.getpid()}"
+        with open(tmp_path, 'w') as f:
+            f.write(version + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.current_path)
+
+        with open(self.history_path, 'a') as f:
+            f.write(json.dumps({'at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'version': version,
+                                'previous': previous, 'reason': reason}) + '\n')
+        print(f"Model version {version} is now current (was {previous})")
+        return version
+
+    def history(self):
+        if not os.path.exists(self.history_path):
+            return []
+        with open(self.history_path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def rollback(self):
+        """
+        Re-activates the version that was current before the active one.
+        Activations are replayed as a stack, each rollback popping the
+        version it left, so repeated rollbacks keep walking back instead
+        of returning to the version just rolled away from.
+        """
+        current = self.current()
+        if current is None:
+            raise RegistryError("no model version is active")
+        stack = []
+        for entry in self.history():
+            if entry['reason'].startswith('rollback'):
+                while stack and stack[-1] != entry['version']:
+                    stack.pop()
+                if not stack:
+                    stack.append(entry['version'])
+            elif not stack or stack[-1] != entry['version']:
+                stack.append(entry['version'])
+        # CURRENT may have been changed by hand since
+        while stack and stack[-1] != current:
+            stack.pop()
+        if len(stack) < 2:
+            raise RegistryError(f"nothing to roll back to from {current}")
+        return self.activate(stack[-2], reason=f'rollback from {current}')
+
+    def pointer_state(self):
+        """
+        Cheap change marker for CURRENT: (inode, mtime_ns), None if missing.
+        os.replace() gives the pointer a new inode on every activation.
+        """
+        try:
+            st = os.stat(self.current_path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns
+
+
+class ModelWatcher:
+    """
+    Polls a registry's CURRENT pointer from the request path. check() costs
+    a clock read, plus a stat every poll_seconds; when the pointer moved it
+    starts a background thread that calls load(version) and hands the
+    result to swap(), so requests keep being served by the old model
+    until the new one is fully loaded.
+    """
+
+    def __init__(self, registry, load, swap, version=None, poll_seconds=DEFAULT_POLL_SECONDS):
+        self.registry = registry
+        self.load = load
+        self.swap = swap
+        self.version = version
+        self.poll_seconds = poll_seconds
+        self.state = registry.pointer_state()
+        self.next_check = time.monotonic() + poll_seconds
+        self.lock = threading.Lock()
+        self.loading = False
+
+    def check(self):
+        now = time.monotonic()
+        if now < self.next_check or self.loading:
+            return False
+        self.next_check = now + self.poll_seconds
+        state = self.registry.pointer_state()
+        if state == self.state:
+            return False
+        with self.lock:
+            if self.loading:
+                return False
+            self.loading = True
+        threading.Thread(target=self.reload, args=(state,), daemon=True).start()
+        return True
+
+    def reload(self, state):
+        try:
+            version = self.registry.current()
+            if version and version != self.version:
+                loaded = self.load(version)
+                self.swap(loaded, version)
+                self.version = version
+                print(f"Reloaded model version {version} in process {os.getpid()}")
+            self.state = state
+        except Exception as e:
+            # Keep serving the old model, try again on the next poll
+            print(f"Model reload failed, keeping version {self.version}: {e}")
+        finally:
+            self.loading = False
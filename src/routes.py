@@ -0,0 +1,257 @@
+"""
+Station-pair route search over the schedules table.
+
+RouteIndex keeps, for every station code, the trains stopping there as
+sorted parallel arrays (train id, stop order, distance_km). Trains running
+from A to B are the intersection of A's and B's train ids where A's stop
+comes first, so a query costs O(len(A) + len(B)) whatever the table size.
+
+The index is built from SQLite on first use. The scraper pushes each
+schedule it writes in this process (see RailwayScraper.write_batch), and
+a full rebuild after max_age seconds picks up writes made by other
+processes.
+"""
+import time
+import threading
+import numpy as np
+from .database import get_db_connection, get_pooled_connection
+from .cache import get_train
+from .migrations import require_schema, parse_distance
+from .metrics import timed
+
+# Rebuild from SQLite after this many seconds, like the train cache TTL
+DEFAULT_MAX_AGE = 600
+
+DEFAULT_LIMIT = 50
+
+# distance_km of stops whose distance couldn't be parsed
+NO_DISTANCE = -1
+
+
+def empty_station():
+    return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+
+
+class RouteIndex:
+    def __init__(self, max_age=DEFAULT_MAX_AGE):
+        self.max_age = max_age
+        # (station code -> (train ids, stop orders, distances) sorted by
+        # train id, train numbers by id); replaced as one object so a search
+        # never pairs ids from one build with numbers from another
+        self.state = None
+        # Writer-side bookkeeping, only touched under lock
+        self.train_ids = {}
+        # train id -> station codes, to find the entries a re-scrape replaces
+        self.train_stops = {}
+        # Routes written while a build was reading SQLite, replayed onto it
+        self.pending = None
+        self.built_at = 0.0
+        self.rebuilding = False
+        self.lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self.state is not None
+
+    @property
+    def stations(self):
+        return self.state[0] if self.state is not None else None
+
+    @timed('route_index_build')
+    def build(self, conn=None):
+        """
+        Loads every schedule stop, numbering stops within a train by
+        distance. Station codes are matched case-insensitively. Returns the
+        number of stops indexed.
+        """
+        conn = conn or get_pooled_connection()
+        # Needs the typed distance_km column
+        require_schema(conn)
+        with self.lock:
+            self.pending = []
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        try:
+            # Sorted in NumPy rather than by an ORDER BY; a plain table scan
+            # returns rowid order and the sort is stable, so equal distances
+            # keep id order
+            rows = cursor.execute(
+                "SELECT train_number, upper(station_code), IFNULL(distance_km, ?) FROM schedules", (NO_DISTANCE,)
+            ).fetchall()
+        except BaseException:
+            with self.lock:
+                self.pending = None
+            raise
+
+        stations, train_numbers, train_stops = {}, [], {}
+        if rows:
+            trains, codes, distances = zip(*rows)
+            numbers, train_of_row = np.unique(np.array(trains, dtype=str), return_inverse=True)
+            train_of_row = np.ravel(train_of_row).astype(np.int32)
+            distance = np.array(distances, dtype=np.int32)
+            by_train = np.lexsort((distance, train_of_row))
+            train_of_row, distance = train_of_row[by_train], distance[by_train]
+            codes = np.array(codes, dtype=str)[by_train]
+            train_numbers = numbers.tolist()
+
+            # Rows are grouped by train, order is the position inside the group
+            starts = np.r_[0, np.flatnonzero(np.diff(train_of_row)) + 1]
+            lengths = np.diff(np.r_[starts, len(rows)])
+            order = (np.arange(len(rows)) - np.repeat(starts, lengths)).astype(np.int32)
+
+            station_codes, station_of_row = np.unique(codes, return_inverse=True)
+            station_of_row = np.ravel(station_of_row)
+            by_station = np.argsort(station_of_row, kind='stable')
+            bounds = np.searchsorted(station_of_row[by_station], np.arange(len(station_codes) + 1))
+            for i, code in enumerate(station_codes.tolist()):
+                rows_here = by_station[bounds[i]:bounds[i + 1]]
+                stations[code] = (train_of_row[rows_here], order[rows_here], distance[rows_here])
+
+            code_list = codes.tolist()
+            for train_id, first, n in zip(train_of_row[starts].tolist(), starts.tolist(), lengths.tolist()):
+                train_stops[train_id] = code_list[first:first + n]
+
+        with self.lock:
+            self.state = (stations, train_numbers)
+            self.train_ids = {number: i for i, number in enumerate(train_numbers)}
+            self.train_stops = train_stops
+            for train_number, stops in self.pending:
+                self._update(train_number, stops)
+            self.pending = None
+            self.built_at = time.monotonic()
+        return len(rows)
+
+    def ensure_fresh(self):
+        """
+        Builds the index on first use. Once it is older than max_age it is
+        rebuilt in the background while searches keep using the old one.
+        """
+        if self.state is None:
+            self.build()
+        elif time.monotonic() - self.built_at > self.max_age and not self.rebuilding:
+            with self.lock:
+                if self.rebuilding:
+                    return
+                self.rebuilding = True
+            threading.Thread(target=self.rebuild, daemon=True).start()
+
+    def rebuild(self):
+        conn = get_db_connection()
+        try:
+            self.build(conn)
+        except Exception as e:
+            print(f"Route index rebuild failed, keeping the old one: {e}")
+        finally:
+            conn.close()
+            self.rebuilding = False
+
+    def update_train(self, train_number, stops):
+        """
+        Replaces a train's entries with stops, [(station_code, distance_km)]
+        in route order. A no-op until the index has been built.
+        """
+        with self.lock:
+            if self.pending is not None:
+                self.pending.append((train_number, stops))
+            if self.state is not None:
+                self._update(train_number, stops)
+
+    def _update(self, train_number, stops):
+        stations, train_numbers = self.state
+        train_id = self.train_ids.get(train_number)
+        if train_id is None:
+            # New ids are the largest yet, so inserting keeps arrays sorted
+            train_id = self.train_ids[train_number] = len(train_numbers)
+            train_numbers.append(train_number)
+
+        for code in self.train_stops.pop(train_id, []):
+            ids, order, distance = stations[code]
+            keep = ids != train_id
+            stations[code] = (ids[keep], order[keep], distance[keep])
+
+        stops = [(code.upper(), distance_km) for code, distance_km in stops]
+        for i, (code, distance_km) in enumerate(stops):
+            ids, order, distance = stations.get(code) or empty_station()
+            at = int(np.searchsorted(ids, train_id))
+            # Each station's arrays are replaced whole, so a concurrent
+            # search sees either the old entry or the new one
+            stations[code] = (np.insert(ids, at, train_id), np.insert(order, at, i),
+                              np.insert(distance, at, NO_DISTANCE if distance_km is None else distance_km))
+        self.train_stops[train_id] = [code for code, _ in stops]
+
+    def update_schedules(self, schedule_rows):
+        """
+        Applies schedules rows as written by RailwayScraper.write_batch(),
+        each batch holding a train's complete route.
+        """
+        if self.state is None and self.pending is None:
+            return
+        routes = {}
+        for row in schedule_rows:
+            routes.setdefault(row[0], []).append((row[1], parse_distance(row[5])))
+        for train_number, stops in routes.items():
+            # Same order build() gives: by distance, unparsed distances first
+            stops.sort(key=lambda stop: NO_DISTANCE if stop[1] is None else stop[1])
+            self.update_train(train_number, stops)
+
+    def search(self, from_station, to_station):
+        """
+        Returns [(train_number, from_order, to_order, distance_km)] for the
+        trains stopping at from_station and later at to_station, shortest
+        first. distance_km is None if either stop has no parsed distance.
+        """
+        self.ensure_fresh()
+        stations, numbers = self.state
+        a = stations.get(from_station.upper())
+        b = stations.get(to_station.upper())
+        if a is None or b is None or from_station.upper() == to_station.upper():
+            return []
+
+        # Both id lists are sorted and unique per station
+        _, in_a, in_b = np.intersect1d(a[0], b[0], assume_unique=True, return_indices=True)
+        forward = a[1][in_a] < b[1][in_b]
+        in_a, in_b = in_a[forward], in_b[forward]
+        ids = a[0][in_a]
+        from_distance, to_distance = a[2][in_a], b[2][in_b]
+        known = (from_distance != NO_DISTANCE) & (to_distance != NO_DISTANCE)
+        distance = np.where(known, to_distance - from_distance, NO_DISTANCE)
+
+        # Unknown distances sort last
+        ranked = np.lexsort((ids, np.where(known, distance, np.iinfo(np.int32).max)))
+        return [
+            (numbers[i], int(f), int(t), None if d == NO_DISTANCE else int(d))
+            for i, f, t, d in zip(ids[ranked].tolist(), a[1][in_a][ranked].tolist(),
+                                  b[1][in_b][ranked].tolist(), distance[ranked].tolist())
+        ]
+
+    def stats(self):
+        if self.state is None:
+            return {'loaded': False}
+        stations = self.state[0]
+        return {
+            'loaded': True,
+            'stations': len(stations),
+            'trains': len(self.train_stops),
+            'stops': sum(len(entry[0]) for entry in stations.values()),
+        }
+
+
+# Shared by app.py, the CLI and the scraper's write hook
+route_index = RouteIndex()
+
+
+def search_routes(from_station, to_station, limit=DEFAULT_LIMIT, with_names=True):
+    """
+    JSON-ready search result, train names looked up for the returned rows.
+    """
+    with timed('route_search'):
+        matches = route_index.search(from_station, to_station)
+    results = []
+    for train_number, from_order, to_order, distance_km in matches[:limit]:
+        result = {'train_number': train_number, 'from_stop': from_order, 'to_stop': to_order,
+                  'distance_km': distance_km}
+        if with_names:
+            train = get_train(train_number)
+            result['train_name'] = train['train_name'] if train else None
+        results.append(result)
+    return {'from': from_station.upper(), 'to': to_station.upper(), 'total': len(matches), 'trains': results}
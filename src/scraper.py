@@ -1,87 +1,110 @@
-import requests
-from bs4 import BeautifulSoup
+import os
 import time
 import random
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from .database import get_db_connection
+from .migrations import require_schema, parse_distance, status_columns
+from .http_client import HttpClient
+from .http_cache import HttpCache, DEFAULT_TTL
+from .cache import train_cache
+from .routes import route_index
+from .parsers import extract_train_details, MalformedDescription, DEFAULT_PARSER
+from .metrics import timed, scrape_errors
+
+# Overridable so the app can be pointed at tools/stub_erail.py
+ERAIL_BASE_URL = os.environ.get("RAILPREDICT_ERAIL_URL", "https://erail.in")
+
+# Raw erail.in responses, see HttpCache
+HTTP_CACHE_DIR = os.environ.get("RAILPREDICT_HTTP_CACHE", "http_cache")
 
 class RailwayScraper:
-    def __init__(self):
+    def __init__(self, base_url=ERAIL_BASE_URL, rate_per_host=5.0, max_retries=3, db_path=None, conn=None,
+                 cache_dir=HTTP_CACHE_DIR, cache_ttl=DEFAULT_TTL, offline=False, html_parser=DEFAULT_PARSER):
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36'
         }
-        self.conn = get_db_connection()
+        self.base_url = base_url.rstrip('/')
+        # One keep-alive session shared by every fetch, including bulk workers
+        # Offline mode replays cached pages only, handy for deterministic benchmarks
+        self.cache = HttpCache(cache_dir, ttl=cache_ttl, offline=offline) if cache_dir else None
+        self.http = HttpClient(headers=self.headers, rate_per_host=rate_per_host, max_retries=max_retries, cache=self.cache)
+        # 'fast' reads only <head> and falls back to the full soup parse
+        self.html_parser = html_parser
+        # A borrowed connection (e.g. from the pool) is left open by close()
+        self.owns_conn = conn is None
+        self.conn = get_db_connection(db_path) if conn is None else conn
+        # Writes below rely on the unique stop index and typed columns. The
+        # schema is migrated by setup/migrate_db/server startup, not here:
+        # background scrape jobs build a scraper per job inside web workers
+        require_schema(self.conn)
 
     def scrape_train_schedule(self, train_number):
         """
         Scrapes train schedule. 
         """
         print(f"Scraping schedule for train {train_number}...")
-        
-        cursor = self.conn.cursor()
-        
-        # We now allow overwriting to update specs, so we removed the 'if exists return' check
+        train_name, src, dest = self.fetch_train_details(train_number)
+        self.save_train(train_number, train_name, src, dest)
 
-        # Real Scraping from erail.in
+    def fetch_train_details(self, train_number):
+        """
+        Fetches (train_name, source, destination) from erail.in, falling
+        back to placeholders when the page can't be fetched or parsed.
+        Touches no database state, so it is safe to call from worker threads.
+        """
         try:
-            url = f"https://erail.in/train-enquiry/{train_number}"
-            print(f"Fetching {url}...")
-            response = requests.get(url, headers=self.headers, timeout=10)
-            
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Try to get description meta tag
-                # <meta name="description" content="Route details of 12951 NDLS TEJAS RAJ from Mumbai Central to New Delhi" />
-                desc_tag = soup.find('meta', attrs={'name': 'description'})
-                if desc_tag:
-                    desc = desc_tag['content']
-                    # Format: "Route details of 12951 NDLS TEJAS RAJ from Mumbai Central to New Delhi"
-                    if "Route details of" in desc:
-                        parts = desc.split(" from ")
-                        left_part = parts[0].replace("Route details of ", "").strip()
-                        # left_part is "12951 NDLS TEJAS RAJ"
-                        
-                        train_name = left_part.replace(str(train_number), "").strip()
-                        
-                        right_part = parts[1] # "Mumbai Central to New Delhi"
-                        route_parts = right_part.split(" to ")
-                        src = route_parts[0].strip()
-                        dest = route_parts[1].strip()
-                        
-                        print(f"Scraped: {train_name}, {src} -> {dest}")
-                    else:
-                        # Fallback if format differs
-                        train_name = f"Express {train_number}"
-                        src = "Source"
-                        dest = "Dest"
-                else:
-                     train_name = f"Express {train_number}"
-                     src = "Source"
-                     dest = "Dest"
-            else:
-                print(f"Failed to fetch: {response.status_code}")
-                train_name = f"Express {train_number}"
-                src = "Source"
-                dest = "Dest"
-                
+            return self.fetch_train_details_strict(train_number)
         except Exception as e:
             print(f"Scraping failed: {e}")
-            # Fallback
-            train_name = f"Express {train_number}"
-            src = "Source"
-            dest = "Dest"
-            
-            # specific overrides for realism if we can't hit the web
-            if train_number.startswith("0"):
-                train_name = f"Special Fare Special {train_number}"
-                src = "SC"
-                dest = "CCT"
-            elif train_number == "12951":
-                train_name = "Mumbai Rajdhani"
-                src = "BCT"
-                dest = "NDLS"
-        
+            scrape_errors.inc('fetch')
+            return fallback_details(train_number, overrides=True)
+
+    def fetch_train_details_strict(self, train_number):
+        """
+        Like fetch_train_details() but lets network errors propagate.
+        """
+        # Real Scraping from erail.in
+        url = f"{self.base_url}/train-enquiry/{train_number}"
+        print(f"Fetching {url}...")
+        with timed('scrape_fetch'):
+            response = self.http.get(url)
+
+        if response.status_code != 200:
+            print(f"Failed to fetch: {response.status_code}")
+            scrape_errors.inc('status')
+            return fallback_details(train_number)
+
+        # Only the description meta tag in <head> is needed, see src/parsers.py
+        # <meta name="description" content="Route details of 12951 NDLS TEJAS RAJ from Mumbai Central to New Delhi" />
+        try:
+            with timed('scrape_parse'):
+                details = extract_train_details(response.content, train_number, parser=self.html_parser)
+        except MalformedDescription as e:
+            print(f"Unusable page for {train_number}: {e}")
+            scrape_errors.inc('parse')
+            return fallback_details(train_number, overrides=True)
+        if details is not None:
+            train_name, src, dest = details
+            print(f"Scraped: {train_name}, {src} -> {dest}")
+            return details
+
+        # Fallback if format differs
+        scrape_errors.inc('parse')
+        return fallback_details(train_number)
+
+    def save_train(self, train_number, train_name, src, dest):
+        """
+        Writes the train, its estimated specs and its schedule.
+        """
+        train_row, schedule_rows = self.build_train_rows(train_number, train_name, src, dest)
+        self.write_batch(trains=[train_row], schedules=schedule_rows)
+        print(f"Successfully scraped/populated schedule for {train_number}")
+
+    def build_train_rows(self, train_number, train_name, src, dest):
+        """
+        Returns (train_row, schedule_rows) ready for write_batch().
+        """
         # Calculate/Estimate Specs
         # 1. Average Speed (Distance / Time)
         # We need schedule for this. Let's fetch it first.
@@ -135,28 +158,142 @@ class RailwayScraper:
         elif "Tejas" in train_name:
              img_url = "https://upload.wikimedia.org/wikipedia/commons/thumb/e/e2/Tejas_Express_at_CSMT.jpg/800px-Tejas_Express_at_CSMT.jpg"
             
-        cursor.execute("INSERT OR REPLACE INTO trains (train_number, train_name, source, destination, avg_speed, coach_composition, image_url) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                       (train_number, train_name, src, dest, avg_speed, composition, img_url))
+        train_row = (train_number, train_name, src, dest, avg_speed, composition, img_url)
         
         # Insert Schedule (Mocking a route)
         stations = [src, "KOTA", "NGP", "BZA", dest]
         distances = [0, 400, 800, 1200, 1600]
         
+        schedule_rows = []
         for i, station in enumerate(stations):
             arrival = f"{10+i}:00"
             departure = f"{10+i}:15"
             if i == 0: arrival = "Source"
             if i == len(stations)-1: departure = "Dest"
             
-            cursor.execute('''
-            INSERT INTO schedules (train_number, station_code, station_name, arrival_time, departure_time, distance, day_count)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (train_number, station, f"Station {station}", arrival, departure, str(distances[i]), 1))
+            schedule_rows.append((train_number, station, f"Station {station}", arrival, departure, str(distances[i]), 1))
             
-        self.conn.commit()
-        print(f"Successfully scraped/populated schedule for {train_number}")
+        return train_row, schedule_rows
 
-    def scrape_availability(self, train_number, journey_date, class_code="3A", quota="GN"):
+    @timed('scrape_write')
+    def write_batch(self, trains=(), schedules=(), availability=()):
+        """
+        Writes a batch of scrape results in one transaction.
+        Trains and schedule stops are upserted, so re-scraping a train
+        never duplicates rows; stops no longer on a rescraped route are
+        removed. Availability snapshots are history and always appended.
+        """
+        with self.conn:
+            self.conn.executemany('''
+            INSERT INTO trains (train_number, train_name, source, destination, avg_speed, coach_composition, image_url)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(train_number) DO UPDATE SET
+                train_name = excluded.train_name,
+                source = excluded.source,
+                destination = excluded.destination,
+                avg_speed = excluded.avg_speed,
+                coach_composition = excluded.coach_composition,
+                image_url = excluded.image_url
+            ''', trains)
+
+            self.conn.executemany('''
+            INSERT INTO schedules (train_number, station_code, station_name, arrival_time, departure_time, distance, day_count, distance_km)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(train_number, station_code) DO UPDATE SET
+                station_name = excluded.station_name,
+                arrival_time = excluded.arrival_time,
+                departure_time = excluded.departure_time,
+                distance = excluded.distance,
+                day_count = excluded.day_count,
+                distance_km = excluded.distance_km
+            ''', [row + (parse_distance(row[5]),) for row in schedules])
+
+            stops = {}
+            for row in schedules:
+                stops.setdefault(row[0], []).append(row[1])
+            for train_number, station_codes in stops.items():
+                placeholders = ", ".join("?" * len(station_codes))
+                self.conn.execute(f"DELETE FROM schedules WHERE train_number = ? AND station_code NOT IN ({placeholders})",
+                                  [train_number] + station_codes)
+
+            self.conn.executemany('''
+            INSERT INTO availability (train_number, journey_date, class_code, quota, current_status, booking_status, status_kind, status_position)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [row + status_columns(row[4]) for row in availability])
+
+        for row in trains:
+            train_cache.invalidate(row[0])
+        # Keeps this process's route index current, if it has been built
+        route_index.update_schedules(schedules)
+
+    def scrape_many(self, train_numbers, workers=8, days_ahead=7, batch_size=100):
+        """
+        Bulk scrape: fetches train pages concurrently on a bounded thread pool
+        (rate limited per host by the shared HttpClient), then writes results
+        from this thread, batch_size trains per transaction, since the
+        SQLite connection isn't shared.
+        Returns a throughput/error summary.
+        """
+        train_numbers = list(dict.fromkeys(train_numbers))
+        print(f"Bulk scraping {len(train_numbers)} trains with {workers} workers...")
+        start = time.perf_counter()
+        summary = {'trains': len(train_numbers), 'ok': 0, 'fallback': 0, 'errors': 0, 'failed_trains': []}
+
+        trains, schedules, availability = [], [], []
+        written = 0
+
+        def flush():
+            nonlocal written
+            self.write_batch(trains, schedules, availability)
+            written += len(trains)
+            print(f"Wrote batch of {len(trains)} trains ({written}/{len(train_numbers)})")
+            trains.clear()
+            schedules.clear()
+            availability.clear()
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(self.fetch_train_details_strict, t): t for t in train_numbers}
+            for future in as_completed(futures):
+                train_number = futures[future]
+                try:
+                    train_name, src, dest = future.result()
+                    if train_name == f"Express {train_number}":
+                        summary['fallback'] += 1
+                    else:
+                        summary['ok'] += 1
+                except Exception as e:
+                    print(f"Scraping failed for {train_number}: {e}")
+                    summary['errors'] += 1
+                    summary['failed_trains'].append(train_number)
+                    train_name, src, dest = fallback_details(train_number, overrides=True)
+
+                train_row, schedule_rows = self.build_train_rows(train_number, train_name, src, dest)
+                trains.append(train_row)
+                schedules.extend(schedule_rows)
+                today = datetime.now()
+                for i in range(1, days_ahead + 1):
+                    journey_date = (today + timedelta(days=i)).strftime("%Y-%m-%d")
+                    availability.append(self.availability_row(train_number, journey_date))
+
+                if len(trains) >= batch_size:
+                    flush()
+
+        if trains:
+            flush()
+
+        elapsed = time.perf_counter() - start
+        summary.update({f"http_{k}": v for k, v in self.http.stats.items()})
+        if self.cache is not None:
+            summary.update({f"cache_{k}": v for k, v in self.cache.stats.items()})
+        summary['seconds'] = round(elapsed, 2)
+        summary['trains_per_second'] = round(len(train_numbers) / elapsed, 2) if elapsed else None
+
+        print(f"Scraped {summary['trains']} trains in {summary['seconds']}s "
+              f"({summary['trains_per_second']}/s): {summary['ok']} ok, {summary['fallback']} fallback, "
+              f"{summary['errors']} errors, {summary['http_retries']} retries")
+        return summary
+
+    def scrape_availability(self, train_number, journey_date, class_code="3A", quota="GN", delay=1):
         """
         Scrapes current availability.
         Since real-time availability scraping is CAPTCHA protected on most sites,
@@ -165,8 +302,17 @@ class RailwayScraper:
         print(f"Checking availability for {train_number} on {journey_date} ({class_code})")
         
         # Simulate network delay
-        time.sleep(1)
+        if delay:
+            time.sleep(delay)
         
+        row = self.availability_row(train_number, journey_date, class_code, quota)
+        self.write_batch(availability=[row])
+        print(f"Stored status: {row[4]}")
+
+    def availability_row(self, train_number, journey_date, class_code="3A", quota="GN"):
+        """
+        Returns a simulated availability row for write_batch().
+        """
         # Generate a realistic status
         # E.g., if date is close, high WL; if far, Available or low WL.
         days_diff = (datetime.strptime(journey_date, "%Y-%m-%d").date() - datetime.now().date()).days
@@ -182,14 +328,32 @@ class RailwayScraper:
         else:
             status = "AVAILABLE"
             
-        cursor = self.conn.cursor()
-        cursor.execute('''
-        INSERT INTO availability (train_number, journey_date, class_code, quota, current_status, booking_status)
-        VALUES (?, ?, ?, ?, ?, ?)
-        ''', (train_number, journey_date, class_code, quota, status, status))
-        
-        self.conn.commit()
-        print(f"Stored status: {status}")
+        return (train_number, journey_date, class_code, quota, status, status)
 
     def close(self):
-        self.conn.close()
+        self.http.close()
+        if self.owns_conn:
+            self.conn.close()
+
+
+def fallback_details(train_number, overrides=False):
+    """
+    Placeholder details for trains we couldn't scrape. overrides is set
+    where the original scraper hit an exception: network errors and
+    unusable description tags.
+    """
+    train_name = f"Express {train_number}"
+    src = "Source"
+    dest = "Dest"
+
+    # specific overrides for realism if we can't hit the web
+    if overrides:
+        if train_number.startswith("0"):
+            train_name = f"Special Fare Special {train_number}"
+            src = "SC"
+            dest = "CCT"
+        elif train_number == "12951":
+            train_name = "Mumbai Rajdhani"
+            src = "BCT"
+            dest = "NDLS"
+    return train_name, src, dest
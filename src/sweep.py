@@ -0,0 +1,61 @@
+"""
+Journey-date sweep: the confirmation probability for one WL position on
+every date in a range, scored with a single predict_batch call.
+"""
+from datetime import date, datetime
+import numpy as np
+from .travel_calendar import get_calendar
+
+# Longest range one sweep may cover, inclusive of both ends
+MAX_SWEEP_DAYS = 120
+
+
+def parse_date(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a date as YYYY-MM-DD")
+
+
+def date_features(start, end, today=None):
+    """
+    Returns (dates, days_to_journey, is_weekend, is_holiday) arrays for
+    every date from start to end inclusive.
+    """
+    dates = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D') + 1)
+    return (dates,) + get_calendar().date_features(dates, today)
+
+
+def sweep(predictor, current_wl, start, end=None, today=None):
+    """
+    Scores current_wl for every journey date from start to end (default
+    start, inclusive). Dates must not be in the past and the range may
+    cover at most MAX_SWEEP_DAYS. Returns a JSON-ready dict with parallel
+    dates/probabilities lists and the best date.
+    """
+    today = today or date.today()
+    end = end or start
+    if end < start:
+        raise ValueError("end date is before start date")
+    if start < today:
+        raise ValueError("Journey date cannot be in the past!")
+    if (end - start).days + 1 > MAX_SWEEP_DAYS:
+        raise ValueError(f"a sweep covers at most {MAX_SWEEP_DAYS} days")
+    if current_wl < 1:
+        raise ValueError("WL must be a positive number")
+
+    dates, days_to_journey, is_weekend, is_holiday = date_features(start, end, today)
+    probs, _ = predictor.predict_batch(days_to_journey, current_wl, is_weekend, is_holiday, with_factors=False)
+    probs = np.round(np.asarray(probs, dtype=np.float64), 4)
+    best = int(np.argmax(probs))
+    return {
+        'wl': int(current_wl),
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'dates': [str(d) for d in dates],
+        'days_to_journey': days_to_journey.tolist(),
+        'is_weekend': is_weekend.tolist(),
+        'is_holiday': is_holiday.tolist(),
+        'probabilities': probs.tolist(),
+        'best': {'date': str(dates[best]), 'probability': float(probs[best])},
+    }
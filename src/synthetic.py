@@ -0,0 +1,74 @@
+import os
+import numpy as np
+
+# Column order of the feature block, matches FEATURE_COLUMNS in model.py
+FEATURE_DTYPE = np.int16
+LABEL_DTYPE = np.uint8
+
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+
+def generate_arrays(num_samples, rng):
+    """
+    Vectorized synthetic rows. Returns (X, y) with X in training column order.
+    """
+    days_to_journey = rng.integers(1, 121, num_samples)
+    current_wl = rng.integers(1, 401, num_samples)
+    is_weekend = rng.integers(0, 2, num_samples)
+    is_holiday = rng.integers(0, 2, num_samples)
+
+    # Probability decreases as WL increases and Days decrease
+    prob = (1.0
+            - current_wl / 200 # Higher WL -> Lower prob
+            + days_to_journey / 100 # More time -> Higher prob
+            - 0.1 * is_weekend
+            - 0.2 * is_holiday)
+    prob = np.clip(prob, 0, 1)
+
+    is_confirmed = (rng.random(num_samples) < prob).astype(LABEL_DTYPE)
+
+    X = np.column_stack([days_to_journey, current_wl, is_weekend, is_holiday]).astype(FEATURE_DTYPE)
+    return X, is_confirmed
+
+
+def iter_chunks(num_samples, chunk_size=DEFAULT_CHUNK_SIZE, seed=None):
+    """
+    Yields (X, y) blocks of at most chunk_size rows until num_samples are produced.
+    """
+    rng = np.random.default_rng(seed)
+    remaining = num_samples
+    while remaining > 0:
+        size = min(chunk_size, remaining)
+        yield generate_arrays(size, rng)
+        remaining -= size
+
+
+def spill_to_disk(out_dir, num_samples, chunk_size=DEFAULT_CHUNK_SIZE, seed=None):
+    """
+    Streams chunks into features.npy / labels.npy without holding the full
+    dataset in memory. Returns both files reopened as read-only memmaps.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    features_path = os.path.join(out_dir, 'features.npy')
+    labels_path = os.path.join(out_dir, 'labels.npy')
+
+    X_out = np.lib.format.open_memmap(features_path, mode='w+', dtype=FEATURE_DTYPE, shape=(num_samples, 4))
+    y_out = np.lib.format.open_memmap(labels_path, mode='w+', dtype=LABEL_DTYPE, shape=(num_samples,))
+
+    start = 0
+    for X, y in iter_chunks(num_samples, chunk_size, seed):
+        X_out[start:start + len(y)] = X
+        y_out[start:start + len(y)] = y
+        start += len(y)
+    X_out.flush()
+    y_out.flush()
+    del X_out, y_out
+
+    print(f"Wrote {num_samples} synthetic records to {out_dir}")
+    return load_spilled(out_dir)
+
+
+def load_spilled(out_dir):
+    X = np.load(os.path.join(out_dir, 'features.npy'), mmap_mode='r')
+    y = np.load(os.path.join(out_dir, 'labels.npy'), mmap_mode='r')
+    return X, y
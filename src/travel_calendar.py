@@ -0,0 +1,151 @@
+"""
+Date-indexed travel calendar for the is_weekend/is_holiday model features.
+
+data/travel_calendar.csv is expanded once into one uint8 of bit flags per
+day over the years it covers, so a lookup is an index into that array:
+
+    flags = calendar.flags(date(2026, 11, 8))       # scalar
+    flags = calendar.lookup(np.array([...], 'datetime64[D]'))   # vectorized
+
+Dates outside the covered range still get the weekend flag.
+"""
+import os
+import csv
+import threading
+from datetime import date, datetime
+import numpy as np
+
+CALENDAR_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'travel_calendar.csv')
+
+WEEKEND = 1
+HOLIDAY = 2
+PEAK = 4
+
+KIND_FLAGS = {'holiday': HOLIDAY, 'peak': PEAK}
+
+# Rush the model's is_holiday feature stands for: the day itself or a
+# peak travel season around it
+HOLIDAY_FEATURE_FLAGS = HOLIDAY | PEAK
+
+
+def to_days(dates):
+    """
+    Days since 1970-01-01 for a date, an ISO string or an array of either.
+    """
+    return np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+
+
+def weekend_flags(epoch_days):
+    # 1970-01-01 was a Thursday, weekday() 3
+    return np.where((epoch_days + 3) % 7 >= 5, WEEKEND, 0).astype(np.uint8)
+
+
+class TravelCalendar:
+    def __init__(self, path=CALENDAR_PATH):
+        self.path = path
+        spans = list(read_spans(path))
+        if not spans:
+            raise ValueError(f"{path} has no calendar rows")
+        # Whole years, so weekend flags for the covered range come from the table too
+        self.first = date(min(start for start, _, _ in spans).year, 1, 1)
+        last = date(max(end for _, end, _ in spans).year, 12, 31)
+        self.offset = int(to_days(self.first))
+        epoch_days = np.arange(self.offset, int(to_days(last)) + 1, dtype=np.int64)
+        self.table = weekend_flags(epoch_days)
+        for start, end, flag in spans:
+            self.table[int(to_days(start)) - self.offset:int(to_days(end)) - self.offset + 1] |= flag
+
+    def flags(self, day):
+        """
+        Flags for one datetime.date.
+        """
+        i = day.toordinal() - self.first.toordinal()
+        if 0 <= i < len(self.table):
+            return int(self.table[i])
+        return WEEKEND if day.weekday() >= 5 else 0
+
+    def lookup(self, dates):
+        """
+        Flags for an array of dates (anything numpy turns into datetime64[D]).
+        """
+        return self.lookup_days(to_days(dates))
+
+    def lookup_days(self, epoch_days):
+        index = epoch_days - self.offset
+        inside = (index >= 0) & (index < len(self.table))
+        flags = weekend_flags(epoch_days)
+        flags[inside] = self.table.take(index[inside])
+        return flags
+
+    def features(self, day):
+        """
+        (is_weekend, is_holiday) for one date.
+        """
+        flags = self.flags(day)
+        return int(bool(flags & WEEKEND)), int(bool(flags & HOLIDAY_FEATURE_FLAGS))
+
+    def date_features(self, dates, today=None):
+        """
+        (days_to_journey, is_weekend, is_holiday) int64 arrays for an array
+        of journey dates.
+        """
+        epoch_days = to_days(dates)
+        flags = self.lookup_days(epoch_days)
+        days_to_journey = epoch_days - int(to_days(today or date.today()))
+        return (days_to_journey,
+                (flags & WEEKEND != 0).astype(np.int64),
+                (flags & HOLIDAY_FEATURE_FLAGS != 0).astype(np.int64))
+
+
+def read_spans(path):
+    """
+    Yields (start, end, flag) per row of the calendar CSV; '#' lines are comments.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = csv.DictReader(line for line in f if not line.startswith('#'))
+        for i, row in enumerate(rows, start=1):
+            # DictReader files surplus fields under None, e.g. an unquoted comma
+            if None in row:
+                raise ValueError(f"{path} row {i}: more columns than the header, quote names with commas")
+            if row['kind'] not in KIND_FLAGS:
+                raise ValueError(f"{path} row {i}: unknown kind {row['kind']!r}")
+            start = datetime.strptime(row['start'], '%Y-%m-%d').date()
+            end = datetime.strptime(row['end'] or row['start'], '%Y-%m-%d').date()
+            yield start, end, KIND_FLAGS[row['kind']]
+
+
+_calendar = None
+_calendar_lock = threading.Lock()
+
+
+def get_calendar():
+    """
+    The process-wide calendar, loaded on first use.
+    """
+    global _calendar
+    if _calendar is None:
+        with _calendar_lock:
+            if _calendar is None:
+                _calendar = TravelCalendar()
+    return _calendar
+
+
+def add_date_features(records, today=None):
+    """
+    For records with a journey_date, fills in whichever of days_to_journey,
+    is_weekend and is_holiday they don't already set, with one vectorized
+    lookup for the whole list. Returns records.
+    """
+    dated = [r for r in records if r.get('journey_date') not in (None, '')]
+    if not dated:
+        return records
+    try:
+        dates = np.array([r['journey_date'] for r in dated], dtype='datetime64[D]')
+    except ValueError as e:
+        raise ValueError(f"journey_date must be YYYY-MM-DD: {e}")
+    columns = get_calendar().date_features(dates, today)
+    for name, values in zip(('days_to_journey', 'is_weekend', 'is_holiday'), columns):
+        for record, value in zip(dated, values.tolist()):
+            if record.get(name) in (None, ''):
+                record[name] = value
+    return records
@@ -0,0 +1,136 @@
+import os
+import json
+import time
+import shutil
+import itertools
+import resource
+import multiprocessing
+import numpy as np
+import joblib
+from . import synthetic
+from .compiled_model import CompiledForest
+from .model import serving_latency
+
+# Hyperparameters swept by run_sweep(), every combination is one candidate
+DEFAULT_GRID = {
+    'n_estimators': [25, 50, 100, 200],
+    'max_depth': [None, 8, 12, 16],
+    'min_samples_leaf': [1, 5, 20],
+    'max_features': ['sqrt', None],
+}
+
+SWEEP_DIR = "tuning_runs"
+
+# Training rows every candidate is fitted on
+DEFAULT_SWEEP_ROWS = 20000
+
+
+def candidate_grid(grid=None):
+    grid = grid or DEFAULT_GRID
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def evaluate_candidate(index, params, num_samples, seed, out_dir):
+    """
+    Fits one candidate and measures its serving costs.
+    Runs in a fresh worker process so peak RSS belongs to this candidate.
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import accuracy_score
+
+    # Every candidate sees the same data
+    X, y = synthetic.generate_arrays(num_samples, np.random.default_rng(seed))
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    model = RandomForestClassifier(random_state=42, n_jobs=1, **params)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    accuracy = accuracy_score(y_test, model.predict(X_test))
+
+    # Budgets apply to what serving runs, the compiled forest
+    latency = serving_latency(CompiledForest.from_model(model))
+
+    model_path = os.path.join(out_dir, f"candidate_{index:03d}.pkl")
+    joblib.dump(model, model_path)
+
+    return {
+        'index': index,
+        'params': params,
+        'accuracy': float(accuracy),
+        'fit_seconds': fit_seconds,
+        'predict_row_ms': latency['predict_row_ms'],
+        'predict_1k_ms': latency['predict_1k_ms'],
+        'pickle_bytes': os.path.getsize(model_path),
+        'peak_rss_mb': peak_rss_mb(),
+        'model_path': model_path,
+    }
+
+
+def _evaluate_task(task):
+    return evaluate_candidate(*task)
+
+
+def run_sweep(num_samples=DEFAULT_SWEEP_ROWS, seed=42, grid=None, workers=None, out_dir=SWEEP_DIR):
+    """
+    Evaluates every grid candidate on a process pool using all cores.
+    Returns the result dicts in candidate order.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    candidates = candidate_grid(grid)
+    workers = workers or os.cpu_count()
+    print(f"Sweeping {len(candidates)} candidates on {workers} processes...")
+
+    # One task per child keeps each candidate's peak RSS separate
+    context = multiprocessing.get_context('spawn')
+    tasks = [(i, params, num_samples, seed, out_dir) for i, params in enumerate(candidates)]
+    results = []
+    with context.Pool(processes=workers, maxtasksperchild=1) as pool:
+        for result in pool.imap_unordered(_evaluate_task, tasks):
+            results.append(result)
+            print(f"[{len(results)}/{len(candidates)}] {result['params']} "
+                  f"acc={result['accuracy']:.3f} row={result['predict_row_ms']:.2f}ms "
+                  f"size={result['pickle_bytes'] / 1e6:.1f}MB")
+    return sorted(results, key=lambda r: r['index'])
+
+
+def pick_best(results, max_row_ms=None, max_1k_ms=None, max_bytes=None):
+    """
+    Most accurate candidate within the latency/size budgets, ties go to the
+    faster one. Returns None if nothing fits.
+    """
+    eligible = [
+        r for r in results
+        if (max_row_ms is None or r['predict_row_ms'] <= max_row_ms)
+        and (max_1k_ms is None or r['predict_1k_ms'] <= max_1k_ms)
+        and (max_bytes is None or r['pickle_bytes'] <= max_bytes)
+    ]
+    if not eligible:
+        return None
+    return max(eligible, key=lambda r: (round(r['accuracy'], 3), -r['predict_row_ms']))
+
+
+def save_results(results, path, best=None):
+    with open(path, 'w') as f:
+        json.dump({'results': results, 'best': best}, f, indent=2)
+    print(f"Wrote {len(results)} results to {path}")
+
+
+def promote(result, model_path):
+    """
+    Installs a candidate's pickle as the served model. The copy is renamed
+    into place so nothing ever loads a partial file; export() then
+    publishes it to the registry.
+    """
+    tmp_path = f"{model_path}.tmp-{os.getpid()}"
+    shutil.copyfile(result['model_path'], tmp_path)
+    os.replace(tmp_path, model_path)
+    print(f"Promoted candidate {result['index']} {result['params']} to {model_path}")
@@ -0,0 +1,54 @@
+import io
+import csv
+import json
+import numpy as np
+import pytest
+from src import batch_io
+
+
+class ConstantPredictor:
+    def predict_batch(self, records, with_factors=False):
+        return np.full(len(records), 0.5), None
+
+
+def score(lines, fmt_in='jsonl', fmt_out='csv', chunk_size=2):
+    out = io.StringIO()
+    writer = batch_io.ChunkWriter(out, fmt_out)
+    rows = batch_io.read_rows(io.StringIO(''.join(lines)), fmt_in)
+    for chunk in batch_io.score_chunks(ConstantPredictor(), batch_io.chunked(rows, chunk_size)):
+        writer.write(chunk)
+    return out.getvalue()
+
+
+@pytest.mark.parametrize('line, kind', [('[12, 40]', 'list'), ('"12,40"', 'str'), ('null', 'NoneType')])
+def test_jsonl_line_must_be_an_object(line, kind):
+    lines = ['{"days_to_journey": 12, "current_wl": 40}\n', '\n', line + '\n']
+    with pytest.raises(ValueError, match=f"Line 3: expected a JSON object, got {kind}"):
+        score(lines)
+
+
+def test_csv_header_covers_columns_of_later_rows():
+    lines = [json.dumps(row) + '\n' for row in [
+        {'days_to_journey': 12, 'current_wl': 40},
+        {'current_wl': 7, 'journey_date': '2030-01-07', 'train_no': '12951'},
+    ]]
+    rows = list(csv.DictReader(io.StringIO(score(lines))))
+    assert [row['train_no'] for row in rows] == ['', '12951']
+    assert rows[1]['journey_date'] == '2030-01-07'
+    assert rows[1]['is_weekend'] == '0' and rows[1]['days_to_journey'] != ''
+    assert [row['probability'] for row in rows] == ['0.5', '0.5']
+
+
+def test_csv_rejects_column_first_seen_after_header():
+    lines = [json.dumps(row) + '\n' for row in [
+        {'days_to_journey': 12, 'current_wl': 40},
+        {'days_to_journey': 3, 'current_wl': 7},
+        {'days_to_journey': 3, 'current_wl': 7, 'quota': 'TQ'},
+    ]]
+    with pytest.raises(ValueError, match="Row 3: quota not in the CSV header"):
+        score(lines)
+
+
+def test_csv_input_rejects_surplus_fields():
+    with pytest.raises(ValueError, match="Line 3: more fields than the header"):
+        score(['days_to_journey,current_wl\n', '12,40\n', '3,7,9\n'], fmt_in='csv')
@@ -0,0 +1,32 @@
+import sqlite3
+import pytest
+from src import cache
+
+
+@pytest.fixture
+def trains_db(monkeypatch):
+    conn = sqlite3.connect(':memory:', check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("CREATE TABLE trains (train_number TEXT PRIMARY KEY, train_name TEXT, avg_speed REAL)")
+    monkeypatch.setattr(cache, 'get_pooled_connection', lambda: conn)
+    cache.train_cache.clear()
+    yield conn
+    cache.train_cache.clear()
+    conn.close()
+
+
+def test_incomplete_train_is_reread_until_scraped(trains_db):
+    trains_db.execute("INSERT INTO trains VALUES ('12951', 'Mumbai Rajdhani', NULL)")
+    assert cache.get_train('12951')['avg_speed'] is None
+    # Another worker's scrape fills in the details; no invalidation here
+    trains_db.execute("UPDATE trains SET avg_speed = 88.5 WHERE train_number = '12951'")
+    assert cache.get_train('12951')['avg_speed'] == 88.5
+
+    trains_db.execute("UPDATE trains SET avg_speed = 90 WHERE train_number = '12951'")
+    assert cache.get_train('12951')['avg_speed'] == 88.5
+
+
+def test_missing_train_is_not_cached(trains_db):
+    assert cache.get_train('11301') is None
+    trains_db.execute("INSERT INTO trains VALUES ('11301', 'Udyan Express', 61.2)")
+    assert cache.get_train('11301')['train_name'] == 'Udyan Express'
@@ -0,0 +1,61 @@
+import time
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from src.compiled_model import CompiledForest, build_top_table, ARRAY_NAMES, CHUNK_ROWS
+
+
+def make_rows(n, seed):
+    rng = np.random.default_rng(seed)
+    # Same shape as the model's features, plus off-grid values that land
+    # between float32 and float64 thresholds
+    return np.column_stack([
+        rng.integers(0, 120, n) + rng.choice([0.0, 0.3], n),
+        rng.integers(1, 300, n) + rng.normal(0, 1e-3, n),
+        rng.integers(0, 2, n),
+        rng.integers(0, 2, n),
+    ])
+
+
+@pytest.fixture(scope='module')
+def model():
+    X = make_rows(4000, seed=1)
+    y = (X[:, 1] / 3 - X[:, 0] + 20 * X[:, 3] + np.random.default_rng(2).normal(0, 15, len(X)) < 0).astype(int)
+    return RandomForestClassifier(n_estimators=30, min_samples_leaf=2, random_state=0).fit(X, y)
+
+
+@pytest.mark.parametrize('n', [1, CHUNK_ROWS + 7, 5000])
+def test_matches_sklearn(model, n):
+    forest = CompiledForest.from_model(model)
+    X = make_rows(n, seed=3)
+    assert forest.top_table is not None
+    assert np.array_equal(forest.predict_proba(X), model.predict_proba(X))
+    offsets = np.asarray(forest.roots)[:, None]
+    expected = np.array([tree.apply(X.astype(np.float32)) for tree in model.estimators_])
+    assert np.array_equal(forest.apply(X) - offsets, expected)
+
+
+@pytest.mark.parametrize('max_tree_cells', [None, 1, 16])
+def test_walk_resumes_below_top_table(model, max_tree_cells):
+    forest = CompiledForest.from_model(model)
+    X = make_rows(3000, seed=4)
+    expected = forest.apply(X)
+    # No table, or tables too small to hold any tree whole
+    arrays = {name: getattr(forest, name) for name in ARRAY_NAMES}
+    forest.top_table = build_top_table(arrays, 4, max_tree_cells) if max_tree_cells else None
+    assert np.array_equal(forest.apply(X), expected)
+
+
+def test_large_batch_not_slower_than_sklearn(model):
+    forest = CompiledForest.from_model(model)
+    X = make_rows(10000, seed=5)
+
+    def best(fn):
+        times = []
+        for _ in range(3):
+            started = time.perf_counter()
+            fn(X)
+            times.append(time.perf_counter() - started)
+        return min(times)
+
+    assert best(forest.predict_proba) < best(model.predict_proba)
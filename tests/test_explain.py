@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from src.compiled_model import CompiledForest
+from src.explain import TreeExplainer
+
+
+@pytest.fixture(scope='module')
+def forest():
+    rng = np.random.default_rng(0)
+    X = np.column_stack([rng.integers(0, 120, 2000), rng.integers(1, 300, 2000),
+                         rng.integers(0, 2, 2000), rng.integers(0, 2, 2000)])
+    y = (X[:, 1] / 3 - X[:, 0] + rng.normal(0, 15, len(X)) < 0).astype(int)
+    model = RandomForestClassifier(n_estimators=20, random_state=0).fit(X, y)
+    return CompiledForest.from_model(model)
+
+
+def walked_contributions(forest, row):
+    # One row down every tree, crediting each split to its feature
+    contributions = np.zeros(forest.n_features_in_)
+    for node in forest.roots:
+        while forest.left[node] != -1:
+            f = forest.feature[node]
+            child = forest.left[node] if row[f] <= forest.threshold[node] else forest.right[node]
+            contributions[f] += forest.value[child, 1] - forest.value[node, 1]
+            node = child
+    return contributions / len(forest.roots)
+
+
+def test_contributions_match_walk_and_add_up(forest):
+    explainer = TreeExplainer(forest)
+    X = np.array([[0, 1, 0, 0], [12, 45, 1, 0], [90, 250, 0, 1], [200, 500, 1, 1]])
+    contributions = explainer.contributions(X)
+    for row, got in zip(X, contributions):
+        assert np.allclose(got, walked_contributions(forest, row))
+    assert np.allclose(explainer.bias + contributions.sum(axis=1), forest.predict_proba(X)[:, 1])
+
+
+def test_from_leaves_reuses_apply(forest):
+    explainer = TreeExplainer(forest)
+    X = np.random.default_rng(1).integers(0, 300, (5000, 4))
+    assert np.array_equal(explainer.from_leaves(forest.apply(X)), explainer.contributions(X))
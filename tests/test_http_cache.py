@@ -0,0 +1,44 @@
+import os
+import time
+from src.http_cache import HttpCache, CachedResponse, BODY_GRACE_SECONDS
+
+
+def page(body):
+    return CachedResponse(200, body, {'Content-Type': 'text/html'})
+
+
+def age(path, seconds):
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_evict_keeps_bodies_a_store_may_still_be_indexing(tmp_path):
+    cache = HttpCache(str(tmp_path), max_bytes=10 ** 6)
+    cache.store('https://example.test/old', page(b'old page'))
+    # Written by a store() in another process that hasn't written its index yet
+    cache.store('https://example.test/pending', page(b'pending page'))
+    os.remove(cache.index_path('https://example.test/pending'))
+    old_digest = cache.lookup('https://example.test/old')[0]['body_sha256']
+    os.remove(cache.index_path('https://example.test/old'))
+    age(cache.body_path(old_digest), BODY_GRACE_SECONDS + 5)
+
+    cache.evict()
+    bodies = os.listdir(cache.body_dir)
+    assert old_digest not in bodies
+    assert len(bodies) == 1
+    assert cache.total_bytes == len(b'pending page')
+
+
+def test_store_touches_an_existing_body(tmp_path):
+    cache = HttpCache(str(tmp_path), max_bytes=10 ** 6)
+    cache.store('https://example.test/a', page(b'same body'))
+    digest = cache.lookup('https://example.test/a')[0]['body_sha256']
+    age(cache.body_path(digest), BODY_GRACE_SECONDS + 5)
+    os.remove(cache.index_path('https://example.test/a'))
+
+    # A second URL with the same body reuses it; it must not look stale
+    cache.store('https://example.test/b', page(b'same body'))
+    cache.evict()
+    entry, body = cache.lookup('https://example.test/b')
+    assert body == b'same body'
+    assert cache.total_bytes == len(b'same body')
@@ -0,0 +1,107 @@
+import sqlite3
+import pytest
+from src import database
+from src.migrations import migrate, schema_version, check_query_plans, HOT_QUERIES, LATEST_VERSION
+from src.scraper import RailwayScraper
+
+# Tables as the first release created them, before any migration
+BASELINE_SCHEMA = '''
+CREATE TABLE trains (
+    train_number TEXT PRIMARY KEY,
+    train_name TEXT,
+    source TEXT,
+    destination TEXT
+);
+CREATE TABLE schedules (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    train_number TEXT,
+    station_code TEXT,
+    station_name TEXT,
+    arrival_time TEXT,
+    departure_time TEXT,
+    distance TEXT,
+    day_count INTEGER
+);
+CREATE TABLE availability (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    train_number TEXT,
+    journey_date DATE,
+    class_code TEXT,
+    quota TEXT,
+    current_status TEXT,
+    booking_status TEXT,
+    scrape_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+'''
+
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    path = str(tmp_path / 'fresh.db')
+    monkeypatch.setattr(database, 'DB_PATH', path)
+    database.init_db()
+    conn = database.get_db_connection(path)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def baseline_db(tmp_path):
+    path = str(tmp_path / 'baseline.db')
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.execute("INSERT INTO trains VALUES ('12951', 'Rajdhani', 'MMCT', 'NDLS')")
+    # Older scrapes stored a stop again on every re-scrape
+    conn.executemany("INSERT INTO schedules (train_number, station_code, distance) VALUES (?, ?, ?)",
+                     [('12951', 'MMCT', '0'), ('12951', 'KOTA', '900 km'), ('12951', 'KOTA', '900 km'),
+                      ('12951', 'NDLS', '1386')])
+    conn.executemany("INSERT INTO availability (train_number, journey_date, class_code, current_status) "
+                     "VALUES (?, ?, ?, ?)",
+                     [('12951', '2025-11-03', '3A', 'GNWL45/WL12'), ('12951', '2025-11-03', '3A', 'RAC 4'),
+                      ('12951', '2025-11-03', '3A', 'CNF/B1/32')])
+    conn.commit()
+    conn.close()
+    conn = database.get_db_connection(path)
+    yield conn
+    conn.close()
+
+
+def assert_plans_use_indexes(conn):
+    results = check_query_plans(conn)
+    assert [name for name, _, _ in results] == [name for name, _, _, _ in HOT_QUERIES]
+    for name, plan, ok in results:
+        assert ok, f"{name}: {plan}"
+
+
+def test_fresh_database_is_at_latest_version(fresh_db):
+    assert schema_version(fresh_db) == LATEST_VERSION
+    assert migrate(fresh_db) == []
+    assert_plans_use_indexes(fresh_db)
+
+
+def test_baseline_database_migrates(baseline_db):
+    assert schema_version(baseline_db) == 0
+    assert migrate(baseline_db) == list(range(1, LATEST_VERSION + 1))
+    assert schema_version(baseline_db) == LATEST_VERSION
+    assert migrate(baseline_db) == []
+    assert_plans_use_indexes(baseline_db)
+
+    # Duplicate stops collapsed, typed columns backfilled
+    stops = baseline_db.execute("SELECT station_code, distance_km FROM schedules ORDER BY distance_km").fetchall()
+    assert [tuple(r) for r in stops] == [('MMCT', 0), ('KOTA', 900), ('NDLS', 1386)]
+    kinds = baseline_db.execute("SELECT status_kind, status_position FROM availability ORDER BY id").fetchall()
+    assert [tuple(r) for r in kinds] == [(1, 12), (2, 4), (4, None)]
+
+
+def test_rescrape_upsert_keeps_row_counts(fresh_db):
+    scraper = RailwayScraper(conn=fresh_db, cache_dir=None)
+    train, schedule = scraper.build_train_rows('12951', 'Mumbai Rajdhani', 'MMCT', 'NDLS')
+
+    def counts():
+        return [fresh_db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in ('trains', 'schedules')]
+
+    scraper.write_batch(trains=[train], schedules=schedule)
+    first = counts()
+    assert first == [1, len(schedule)]
+    scraper.write_batch(trains=[train], schedules=schedule)
+    assert counts() == first
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from src.compiled_model import CompiledForest
+from src.model import WaitlistPredictor, build_feature_matrix
+from src.prob_grid import ProbabilityGrid, MAX_DAYS, MAX_WL
+from src.registry import ModelRegistry
+
+
+def test_parallel_arrays_broadcast():
+    features = build_feature_matrix([10, 20], 40, 1, 0)
+    assert features.dtype == np.int64
+    assert features.tolist() == [[10, 40, 1, 0], [20, 40, 1, 0]]
+
+
+def test_records_accept_integral_floats_and_strings():
+    records = [{'days_to_journey': 10.0, 'current_wl': '40'}, {'days_to_journey': 3, 'current_wl': 7, 'is_holiday': 1}]
+    assert build_feature_matrix(records).tolist() == [[10, 40, 0, 0], [3, 7, 0, 1]]
+
+
+@pytest.mark.parametrize('records', [
+    [{'days_to_journey': 10}],
+    [{'current_wl': 40, 'days_to_journey': ''}],
+    [{'days_to_journey': 10, 'current_wl': 'forty'}],
+    [{'days_to_journey': float('nan'), 'current_wl': 40}],
+])
+def test_records_reject_missing_or_non_numeric_values(records):
+    with pytest.raises(ValueError):
+        build_feature_matrix(records)
+
+
+def test_fractional_values_are_kept_not_truncated():
+    features = build_feature_matrix(np.array([1.5, 2.0]), [40, 40])
+    assert features.dtype == np.float64
+    assert features.tolist() == [[1.5, 40, 0, 0], [2.0, 40, 0, 0]]
+    assert build_feature_matrix([{'days_to_journey': '10.5', 'current_wl': 40}]).tolist() == [[10.5, 40, 0, 0]]
+
+
+def test_fractional_rows_bypass_the_grid(tmp_path):
+    np.save(str(tmp_path / 'grid.npy'), np.full((2, 2, MAX_DAYS + 1, MAX_WL + 1), 0.25))
+    (tmp_path / 'meta.json').write_text('{}')
+    probs, in_grid = ProbabilityGrid(str(tmp_path)).lookup(build_feature_matrix([10.5, 10], 40))
+    assert in_grid.tolist() == [False, True]
+    assert probs[1] == 0.25
+
+
+def test_predict_scores_fractional_inputs_with_the_model(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    predictor = WaitlistPredictor(registry=ModelRegistry(str(tmp_path / 'registry')))
+    predictor.model = CompiledForest.from_model(RandomForestClassifier(n_estimators=5, random_state=0).fit(
+        [[1, 40, 0, 0], [30, 5, 0, 0], [2, 200, 1, 1], [60, 10, 0, 1]], [0, 1, 0, 1]))
+    prob, factors = predictor.predict(10.5, 40)
+    assert prob == predictor.model.predict_proba([[10.5, 40, 0, 0]])[0, 1]
+    assert factors[1]['value'] == '10.5 Days' and factors[0]['value'] == '40'
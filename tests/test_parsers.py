@@ -0,0 +1,90 @@
+import pytest
+from src import parsers, database
+from src.http_cache import CachedResponse
+from src.parsers import extract_train_details, meta_description_fast, meta_description_soup, MalformedDescription
+from src.scraper import RailwayScraper
+from benchmarks.bench_parsers import load_fixtures, stub_pages
+
+PAGES = load_fixtures() + stub_pages(5)
+BODIES = {name: body for name, _, body in PAGES}
+
+
+@pytest.mark.parametrize('name, train_number, body', PAGES, ids=[page[0] for page in PAGES])
+def test_fast_parser_matches_soup(name, train_number, body):
+    assert extract_train_details(body, train_number, parser='fast') == \
+        extract_train_details(body, train_number, parser='soup')
+
+
+@pytest.mark.parametrize('name, train_number, body', PAGES, ids=[page[0] for page in PAGES])
+def test_head_description_matches_soup(name, train_number, body):
+    fast = meta_description_fast(body)
+    # The head parse may miss a description placed in <body>, never disagree
+    if fast is not None:
+        assert fast == meta_description_soup(body)
+
+
+def test_not_found_page_skips_soup(monkeypatch):
+    body = BODIES['99999_not_found.html']
+    calls = []
+    monkeypatch.setitem(parsers.PARSERS, 'soup', lambda content: calls.append(content))
+    assert extract_train_details(body, '99999') is None
+    assert calls == []
+
+
+def test_body_description_falls_back_to_soup():
+    body = BODIES['11301_meta_in_body.html']
+    assert meta_description_fast(body) is None
+    assert extract_train_details(body, '11301') == ('UDYAN EXPRESS', 'Mumbai CSMT', 'KSR Bengaluru')
+
+
+ROUTE = '<meta name="description" content="Route details of 12951 NDLS TEJAS RAJ from Mumbai Central to New Delhi">'
+NO_ROUTE = '<html><head><meta name="description" content="Route details of 12951 NDLS TEJAS RAJ"></head></html>'
+NO_CONTENT = f'<html><head><meta name="description">{ROUTE}</head></html>'
+EMPTY_CONTENT = f'<html><head><meta name="description" content="">{ROUTE}</head></html>'
+
+
+@pytest.mark.parametrize('parser', ['fast', 'soup'])
+def test_first_description_tag_wins(parser):
+    # soup.find() takes the first tag, the head parse must not skip ahead
+    with pytest.raises(MalformedDescription):
+        parsers.PARSERS[parser](NO_CONTENT)
+    assert parsers.PARSERS[parser](EMPTY_CONTENT) == ''
+    assert extract_train_details(EMPTY_CONTENT, '12951', parser=parser) is None
+
+
+@pytest.mark.parametrize('parser', ['fast', 'soup'])
+@pytest.mark.parametrize('body', [NO_ROUTE, NO_CONTENT], ids=['no_route', 'no_content'])
+def test_unusable_description_raises(parser, body):
+    with pytest.raises(MalformedDescription):
+        extract_train_details(body, '12951', parser=parser)
+
+
+class StaticHttp:
+    def __init__(self, body):
+        self.body = body
+
+    def get(self, url):
+        return CachedResponse(200, self.body.encode(), {})
+
+
+@pytest.fixture
+def scraper(tmp_path, monkeypatch):
+    path = str(tmp_path / 'scraper.db')
+    monkeypatch.setattr(database, 'DB_PATH', path)
+    database.init_db()
+    conn = database.get_db_connection(path)
+    yield RailwayScraper(conn=conn, cache_dir=None)
+    conn.close()
+
+
+@pytest.mark.parametrize('body', [NO_ROUTE, NO_CONTENT], ids=['no_route', 'no_content'])
+def test_unusable_description_gets_offline_overrides(scraper, body):
+    scraper.http = StaticHttp(body)
+    assert scraper.fetch_train_details('12951') == ('Mumbai Rajdhani', 'BCT', 'NDLS')
+    assert scraper.fetch_train_details('04152') == ('Special Fare Special 04152', 'SC', 'CCT')
+    assert scraper.fetch_train_details('11301') == ('Express 11301', 'Source', 'Dest')
+
+
+def test_non_route_description_gets_no_overrides(scraper):
+    scraper.http = StaticHttp('<html><head><meta name="description" content="Train not found"></head></html>')
+    assert scraper.fetch_train_details('12951') == ('Express 12951', 'Source', 'Dest')
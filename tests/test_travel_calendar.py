@@ -0,0 +1,65 @@
+import csv
+from datetime import date, timedelta
+import numpy as np
+import pytest
+from src import history
+from src.travel_calendar import (get_calendar, add_date_features, TravelCalendar, CALENDAR_PATH,
+                                 HOLIDAY, PEAK)
+
+
+def journey_dates():
+    # Every day the calendar covers, plus a margin outside it on both sides
+    calendar = get_calendar()
+    first = calendar.first - timedelta(days=30)
+    return [first + timedelta(days=i) for i in range(len(calendar.table) + 60)]
+
+
+def train_side_features(journey):
+    # A WL snapshot 5 days out, then the final status
+    rows = [
+        {'current_status': 'WL 12', 'journey_date': journey.isoformat(),
+         'scrape_date': f"{journey - timedelta(days=5)} 10:00:00"},
+        {'current_status': 'CNF', 'journey_date': journey.isoformat(),
+         'scrape_date': f"{journey - timedelta(days=1)} 10:00:00"},
+    ]
+    (features, _), = history.trajectory_examples(rows)
+    return features[2], features[3]
+
+
+def test_history_features_match_serving():
+    calendar = get_calendar()
+    dates = journey_dates()
+    train_side = [train_side_features(d) for d in dates]
+    # app.py /predict and main.py predict
+    assert train_side == [calendar.features(d) for d in dates]
+    # sweep and batch inputs
+    _, is_weekend, is_holiday = calendar.date_features(np.array(dates, dtype='datetime64[D]'))
+    assert train_side == list(zip(is_weekend.tolist(), is_holiday.tolist()))
+
+
+def test_training_sees_holidays():
+    flags = get_calendar().table
+    holiday = date.fromordinal(get_calendar().first.toordinal() + int(np.flatnonzero(flags & (HOLIDAY | PEAK))[0]))
+    assert train_side_features(holiday)[1] == 1
+
+
+@pytest.mark.parametrize('journey', ['2026-11-08', '2027-01-26', '2025-06-11'])
+def test_add_date_features_matches_scalar_lookup(journey):
+    record, = add_date_features([{'journey_date': journey, 'current_wl': 10}], today=date(2025, 1, 1))
+    day = date.fromisoformat(journey)
+    assert (record['is_weekend'], record['is_holiday']) == get_calendar().features(day)
+    assert record['days_to_journey'] == (day - date(2025, 1, 1)).days
+
+
+def test_calendar_names_are_whole():
+    with open(CALENDAR_PATH, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(line for line in f if not line.startswith('#')))
+    assert all(None not in row for row in rows)
+    assert 'Puja, Diwali and Chhath rush' in {row['name'] for row in rows}
+
+
+def test_rejects_rows_with_extra_columns(tmp_path):
+    path = tmp_path / 'calendar.csv'
+    path.write_text("start,end,kind,name\n2026-10-13,2026-11-18,peak,Puja, Diwali\n")
+    with pytest.raises(ValueError, match='more columns'):
+        TravelCalendar(str(path))
@@ -0,0 +1,325 @@
+"""
+End-to-end load test for /predict. Boots the app (Flask's threaded server
+or gunicorn) against a temp copy of the database and a local erail.in stub,
+then fires an open-loop request mix at one or more target rates.
+
+    python -m tools.loadtest --rps 20,50,100 --duration 15
+    python -m tools.loadtest --server gunicorn --workers 4 --rps 200 --output load.json
+    python -m tools.loadtest --mix cached=0.9,new=0.05,invalid=0.05
+
+Request kinds:
+    cached   a train already in the DB (model + cached lookup + render)
+    new      an unseen train, queues a background scrape against the stub
+    invalid  a journey date in the past, rejected before scoring
+
+/predict renders failures as the form page with a 200, so each response
+is classified by its body: the result page is a success, the invalid-date
+message is reported separately, anything else is an error.
+
+Latency is measured from each request's scheduled send time, so a server
+that falls behind shows up as growing latency instead of a lower send
+rate. A rate counts as saturated once achieved throughput drops below 95%
+of target or requests start failing.
+"""
+import os
+import sys
+import json
+import time
+import random
+import signal
+import shutil
+import argparse
+import tempfile
+import threading
+import contextlib
+import subprocess
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import requests
+from tools.stub_erail import start_in_thread
+from tools.startup_report import free_port
+from src.procstats import memory_mb, child_pids
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MIX = {'cached': 0.8, 'new': 0.1, 'invalid': 0.1}
+CACHED_TRAINS = 200
+
+# Achieved/target throughput below this marks the rate as saturated
+SATURATION_RATIO = 0.95
+
+# /predict answers every failure with index.html and a 200, so outcomes
+# come from the body: only the result page has this title
+RESULT_MARKER = '<title>Analysis Result | RailPredict</title>'
+INVALID_DATE_MARKER = 'Journey date cannot be in the past!'
+
+OK = 'ok'
+REJECTED = 'rejected'
+ERROR = 'error'
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        kind, _, weight = part.partition('=')
+        if kind not in DEFAULT_MIX:
+            raise ValueError(f"unknown request kind {kind!r}")
+        mix[kind] = float(weight)
+    total = sum(mix.values())
+    return {k: v / total for k, v in mix.items()}
+
+
+def prepare_db(workdir):
+    """
+    Creates a fresh database with CACHED_TRAINS complete trains, returns
+    (db_path, train numbers).
+    """
+    from src import database
+    from src.scraper import RailwayScraper
+
+    db_path = os.path.join(workdir, 'loadtest.db')
+    database.DB_PATH = db_path
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):
+        database.init_db()
+        scraper = RailwayScraper(db_path=db_path, cache_dir=None)
+        numbers = [str(12000 + i) for i in range(CACHED_TRAINS)]
+        rows = [scraper.build_train_rows(n, f"EXP {n}", "Howrah", "New Delhi") for n in numbers]
+        scraper.write_batch(trains=[r[0] for r in rows], schedules=[s for r in rows for s in r[1]])
+        scraper.close()
+    return db_path, numbers
+
+
+def start_server(kind, port, env, workers, threads):
+    if kind == 'gunicorn':
+        cmd = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--workers', str(workers),
+               '--threads', str(threads), '--bind', f'127.0.0.1:{port}', 'app:app']
+    else:
+        cmd = [sys.executable, '-c', f"from app import app; app.run(host='127.0.0.1', port={port}, threaded=True)"]
+    return subprocess.Popen(cmd, cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_until_ready(base_url, proc, timeout=60):
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with {proc.returncode}")
+        try:
+            if requests.get(base_url + '/', timeout=1).status_code == 200:
+                return time.perf_counter() - start
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError("server did not become ready")
+
+
+class RssSampler(threading.Thread):
+    """
+    Samples RSS of the server process tree until stopped, keeping the peak
+    per pid.
+    """
+
+    def __init__(self, pid, interval=0.5):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak = {}
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            for pid in [self.pid] + child_pids(self.pid):
+                rss = memory_mb(pid).get('rss')
+                if rss is not None:
+                    self.peak[pid] = max(self.peak.get(pid, 0), rss)
+            self.stop_event.wait(self.interval)
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
+
+
+class LoadGenerator:
+    def __init__(self, base_url, cached_trains, mix, seed=0):
+        self.base_url = base_url
+        self.cached_trains = cached_trains
+        self.mix = mix
+        self.rng = random.Random(seed)
+        self.local = threading.local()
+        self.new_train = 60000
+
+    def session(self):
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.local.session = requests.Session()
+        return session
+
+    def make_request(self):
+        kind = self.rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+        days = self.rng.randint(1, 90)
+        if kind == 'cached':
+            train = self.rng.choice(self.cached_trains)
+        elif kind == 'new':
+            self.new_train += 1
+            train = str(self.new_train)
+        else:
+            train = self.rng.choice(self.cached_trains)
+            days = -self.rng.randint(1, 30)
+        form = {
+            'train_no': train,
+            'wl_status': str(self.rng.randint(1, 300)),
+            'journey_date': (date.today() + timedelta(days=days)).isoformat(),
+        }
+        return kind, form
+
+    def send(self, kind, form, scheduled):
+        try:
+            response = self.session().post(self.base_url + '/predict', data=form, timeout=30)
+            outcome = classify(response)
+        except requests.RequestException:
+            outcome = ERROR
+        done = time.perf_counter()
+        return kind, outcome, done - scheduled
+
+    def run(self, rps, duration, concurrency):
+        """
+        Open-loop: request i is due at start + i / rps whatever happened to
+        earlier ones.
+        """
+        total = int(rps * duration)
+        requests_to_send = [self.make_request() for _ in range(total)]
+        futures = []
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            start = time.perf_counter()
+            for i, (kind, form) in enumerate(requests_to_send):
+                due = start + i / rps
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append(pool.submit(self.send, kind, form, due))
+            results = [f.result() for f in futures]
+        elapsed = time.perf_counter() - start
+        return results, elapsed
+
+
+def classify(response):
+    """
+    OK for a rendered result, REJECTED for the invalid-date form error,
+    ERROR for anything else.
+    """
+    if response.status_code >= 400:
+        return ERROR
+    if RESULT_MARKER in response.text:
+        return OK
+    if INVALID_DATE_MARKER in response.text:
+        return REJECTED
+    return ERROR
+
+
+def is_error(kind, outcome):
+    # Invalid-date requests are meant to be rejected, anything else should score
+    return outcome != (REJECTED if kind == 'invalid' else OK)
+
+
+def percentiles(latencies):
+    if not latencies:
+        return {}
+    ms = np.asarray(latencies) * 1000
+    stats = {f'p{p}_ms': round(float(np.percentile(ms, p)), 2) for p in (50, 90, 99)}
+    stats['max_ms'] = round(float(ms.max()), 2)
+    return stats
+
+
+def summarize(results, elapsed, target_rps):
+    errors = sum(1 for kind, outcome, _ in results if is_error(kind, outcome))
+    rejected = sum(1 for _, outcome, _ in results if outcome == REJECTED)
+    summary = {
+        'target_rps': target_rps,
+        'requests': len(results),
+        'achieved_rps': round(len(results) / elapsed, 1),
+        'error_rate': round(errors / len(results), 4) if results else 0,
+        'rejected_rate': round(rejected / len(results), 4) if results else 0,
+        'latency': percentiles([lat for _, _, lat in results]),
+        'by_kind': {},
+    }
+    for kind in sorted({k for k, _, _ in results}):
+        kind_results = [r for r in results if r[0] == kind]
+        summary['by_kind'][kind] = dict(percentiles([lat for _, _, lat in kind_results]),
+                                        requests=len(kind_results),
+                                        errors=sum(1 for _, outcome, _ in kind_results if is_error(kind, outcome)),
+                                        rejected=sum(1 for _, outcome, _ in kind_results if outcome == REJECTED))
+    summary['saturated'] = summary['achieved_rps'] < target_rps * SATURATION_RATIO or errors > 0
+    return summary
+
+
+def print_summary(s):
+    lat = s['latency']
+    print(f"target {s['target_rps']:>7} rps  achieved {s['achieved_rps']:>7} rps  "
+          f"p50 {lat.get('p50_ms', 0):8.1f} ms  p99 {lat.get('p99_ms', 0):8.1f} ms  "
+          f"errors {s['error_rate']:.2%}  invalid date {s['rejected_rate']:.2%}"
+          f"{'  SATURATED' if s['saturated'] else ''}")
+    for kind, k in s['by_kind'].items():
+        print(f"    {kind:8} {k['requests']:6} reqs  p50 {k.get('p50_ms', 0):8.1f} ms  p99 {k.get('p99_ms', 0):8.1f} ms  "
+              f"errors {k['errors']}  invalid date {k['rejected']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test /predict against a temp DB and a stub erail.in")
+    parser.add_argument('--server', choices=['flask', 'gunicorn'], default='flask')
+    parser.add_argument('--workers', type=int, default=2, help="gunicorn workers")
+    parser.add_argument('--threads', type=int, default=1, help="gunicorn threads per worker")
+    parser.add_argument('--rps', type=str, default='20', help="Target rate, comma separated to step through several")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds per rate step")
+    parser.add_argument('--concurrency', type=int, default=64, help="Client threads")
+    parser.add_argument('--mix', type=str, help="e.g. cached=0.8,new=0.1,invalid=0.1")
+    parser.add_argument('--stub-latency', type=float, default=0.05, help="Seconds the erail.in stub sleeps per page")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=str, help="Write the report as JSON")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix) if args.mix else DEFAULT_MIX
+    workdir = tempfile.mkdtemp(prefix='railpredict-load-')
+    stub, stub_url = start_in_thread(latency=args.stub_latency)
+    db_path, cached_trains = prepare_db(workdir)
+
+    port = free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    env = dict(os.environ, RAILPREDICT_DB=db_path, RAILPREDICT_ERAIL_URL=stub_url,
+               RAILPREDICT_HTTP_CACHE=os.path.join(workdir, 'http_cache'))
+    proc = start_server(args.server, port, env, args.workers, args.threads)
+    report = {'server': args.server, 'workers': args.workers if args.server == 'gunicorn' else 1,
+              'threads': args.threads, 'mix': mix, 'steps': []}
+    try:
+        report['startup_seconds'] = round(wait_until_ready(base_url, proc), 2)
+        print(f"{args.server} ready in {report['startup_seconds']}s on {base_url}, stub at {stub_url}")
+
+        sampler = RssSampler(proc.pid)
+        sampler.start()
+        generator = LoadGenerator(base_url, cached_trains, mix, seed=args.seed)
+        for rps in [float(r) for r in args.rps.split(',')]:
+            results, elapsed = generator.run(rps, args.duration, args.concurrency)
+            summary = summarize(results, elapsed, rps)
+            report['steps'].append(summary)
+            print_summary(summary)
+        sampler.stop()
+
+        report['peak_rss_mb'] = {('master' if pid == proc.pid else f'worker {pid}'): rss
+                                 for pid, rss in sorted(sampler.peak.items())}
+        report['stub_hits'] = stub.RequestHandlerClass.hits
+        print("Peak RSS: " + ", ".join(f"{name} {rss:.1f} MB" for name, rss in report['peak_rss_mb'].items()))
+        saturated = [s['target_rps'] for s in report['steps'] if s['saturated']]
+        if saturated:
+            print(f"Saturated at {saturated[0]} rps")
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        stub.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
@@ -0,0 +1,125 @@
+"""
+Startup time and memory report for the web app, for tracking regressions.
+
+    python -m tools.startup_report
+    python -m tools.startup_report --gunicorn 4 --output startup.json
+
+The import check runs `import app` in a fresh interpreter and reports the
+time taken, peak RSS and which heavy modules got pulled in. --gunicorn N
+also boots N workers with and without preload and sums their memory.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import signal
+import argparse
+import subprocess
+import urllib.request
+from src.procstats import memory_mb, child_pids
+
+# Modules serving should never need, see WaitlistPredictor
+HEAVY_MODULES = ['sklearn', 'scipy', 'pandas', 'joblib', 'bs4', 'requests']
+
+IMPORT_PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import app
+seconds = time.perf_counter() - start
+print(json.dumps({
+    'import_seconds': round(seconds, 3),
+    'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    'heavy_modules': [m for m in %r if m in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def measure_import(runs=3):
+    """
+    Best of `runs` cold imports of app.py, each in a new interpreter.
+    """
+    results = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', IMPORT_PROBE], check=True,
+                             capture_output=True, text=True).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+    return min(results, key=lambda r: r['import_seconds'])
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def measure_gunicorn(workers, preload, timeout=60):
+    """
+    Boots gunicorn, waits until every worker answers, then reports the time
+    to first response and per-process memory.
+    """
+    port = free_port()
+    env = dict(os.environ, GUNICORN_PRELOAD='1' if preload else '0')
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                             '--workers', str(workers), '--bind', f'127.0.0.1:{port}', 'app:app'],
+                            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        ready = None
+        while time.perf_counter() - start < timeout:
+            try:
+                urllib.request.urlopen(f'http://127.0.0.1:{port}/', timeout=1).read()
+                if ready is None:
+                    ready = time.perf_counter() - start
+                if len(child_pids(proc.pid)) >= workers:
+                    break
+            except OSError:
+                pass
+            time.sleep(0.1)
+        if ready is None:
+            raise RuntimeError("gunicorn did not start")
+        # Give the remaining workers a moment to finish booting
+        time.sleep(1.0)
+
+        master = memory_mb(proc.pid)
+        worker_mem = [memory_mb(pid) for pid in child_pids(proc.pid)]
+        processes = [master] + worker_mem
+        return {
+            'workers': workers,
+            'preload': preload,
+            'first_response_seconds': round(ready, 3),
+            'master': master,
+            'worker_rss_mb': [w.get('rss') for w in worker_mem],
+            'worker_private_mb': [w.get('private') for w in worker_mem],
+            'total_pss_mb': round(sum(p.get('pss', 0) for p in processes), 1),
+        }
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="App startup time/RSS report")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--gunicorn', type=int, default=0, metavar='WORKERS', help="Also measure a gunicorn boot with this many workers")
+    parser.add_argument('--output', help="Write the report as JSON")
+    args = parser.parse_args()
+
+    report = {'import': measure_import(args.runs)}
+    imp = report['import']
+    print(f"import app: {imp['import_seconds']:.3f}s, peak RSS {imp['peak_rss_mb']} MB, "
+          f"heavy modules: {', '.join(imp['heavy_modules']) or 'none'}")
+
+    if args.gunicorn:
+        report['gunicorn'] = []
+        for preload in (False, True):
+            result = measure_gunicorn(args.gunicorn, preload)
+            report['gunicorn'].append(result)
+            print(f"gunicorn preload={preload!s:5}: first response {result['first_response_seconds']:.2f}s, "
+                  f"total PSS {result['total_pss_mb']} MB, "
+                  f"worker private {result['worker_private_mb']} MB")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
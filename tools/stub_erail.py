@@ -0,0 +1,122 @@
+"""
+Local stand-in for erail.in, serves /train-enquiry/<train_number> pages with
+the same meta description format the scraper parses.
+
+    python -m tools.stub_erail --port 8099 --latency 0.05 --fail-rate 0.1
+    python main.py scrape --train-file trains.txt --base-url http://127.0.0.1:8099
+"""
+import sys
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{train_number} {train_name} Route</title>
+<meta name="description" content="Route details of {train_number} {train_name} from {source} to {destination}" />
+</head>
+<body>
+<h1>{train_number} {train_name}</h1>
+{filler}
+</body>
+</html>
+"""
+
+STATIONS = ["Mumbai Central", "New Delhi", "Howrah", "Chennai Central", "Secunderabad", "Bengaluru", "Pune", "Ahmedabad"]
+NAMES = ["RAJDHANI", "SHATABDI", "DURONTO", "MAIL", "EXPRESS", "SF EXP", "VANDE BHARAT"]
+
+
+def render_page(train_number, body_rows=200):
+    """
+    Deterministic page per train number, body padded like a real route table.
+    """
+    rng = random.Random(train_number)
+    source, destination = rng.sample(STATIONS, 2)
+    filler = "\n".join(f"<tr><td>{i}</td><td>Station {i}</td><td>{i * 37} km</td></tr>" for i in range(body_rows))
+    return PAGE_TEMPLATE.format(
+        train_number=train_number,
+        train_name=rng.choice(NAMES),
+        source=source,
+        destination=destination,
+        filler=f"<table>{filler}</table>",
+    )
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    fail_rate = 0.0
+    hits = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with StubHandler.lock:
+            StubHandler.hits += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail_rate and random.random() < self.fail_rate:
+            self.send_error(503)
+            return
+        if not self.path.startswith("/train-enquiry/"):
+            self.send_error(404)
+            return
+
+        body = render_page(self.path.rsplit("/", 1)[-1]).encode()
+        etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients going away mid-response (e.g. a load test shutting down) are expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def make_server(port=0, latency=0.0, fail_rate=0.0):
+    """
+    Returns a ThreadingHTTPServer bound to 127.0.0.1 (port 0 picks a free one).
+    """
+    handler = type("ConfiguredStubHandler", (StubHandler,), {"latency": latency, "fail_rate": fail_rate})
+    return StubServer(("127.0.0.1", port), handler)
+
+
+def start_in_thread(port=0, latency=0.0, fail_rate=0.0):
+    """
+    Starts the stub on a daemon thread and returns (server, base_url).
+    """
+    server = make_server(port, latency, fail_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local erail.in stub")
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds to sleep per request")
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="Fraction of requests answered with 503")
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.latency, args.fail_rate)
+    print(f"Stub erail.in listening on http://127.0.0.1:{server.server_address[1]}")
+    server.serve_forever()